@@ -0,0 +1,78 @@
+"""Benchmark for score cache keys: derivation speed and Redis memory per entry
+
+Usage:
+    python -m benchmarks.keys [-n 100000] [--host localhost --port 6379]
+
+Without a reachable redis-server the memory column falls back to raw key+value bytes.
+"""
+import random
+import time
+from argparse import ArgumentParser
+from datetime import datetime, timedelta
+
+import redis
+
+from src.keys import encode_score, legacy_score_key, score_key
+
+
+def make_profiles(n, seed=0):
+    """Random inputs shaped like real online_score requests"""
+    rnd = random.Random(seed)
+    base = datetime(1960, 1, 1)
+    profiles = []
+    for i in range(n):
+        profiles.append((
+            f"first{i}",
+            f"last{rnd.randrange(10 ** 6)}",
+            "7" + "".join(rnd.choice("0123456789") for _ in range(10)),
+            base + timedelta(days=rnd.randrange(20000)),
+        ))
+    return profiles
+
+
+def keys_per_second(func, profiles):
+    """Derive a key for every profile and return the achieved rate"""
+    started = time.perf_counter()
+    for profile in profiles:
+        func(*profile)
+    return len(profiles) / (time.perf_counter() - started)
+
+
+def memory_per_entry(client, entries):
+    """Average redis MEMORY USAGE per entry, or raw payload size if unsupported"""
+    try:
+        client.flushdb()
+        for key, value in entries:
+            client.set(key, value)
+        total = sum(client.memory_usage(key) for key, _ in entries)
+        client.flushdb()
+        return total / len(entries), "MEMORY USAGE"
+    except redis.RedisError:
+        total = sum(len(key) + len(value.encode("utf-8")) for key, value in entries)
+        return total / len(entries), "payload bytes"
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-n", type=int, default=100000)
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6379)
+    parser.add_argument("--db", type=int, default=15, help="Scratch database, flushed by the benchmark")
+    args = parser.parse_args()
+
+    profiles = make_profiles(args.n)
+    old_rate = keys_per_second(legacy_score_key, profiles)
+    new_rate = keys_per_second(score_key, profiles)
+    print(f"legacy md5 keys: {old_rate:12,.0f} keys/sec")
+    print(f"new keys:        {new_rate:12,.0f} keys/sec ({new_rate / old_rate:.2f}x)")
+
+    sample = profiles[:10000]
+    client = redis.Redis(host=args.host, port=args.port, db=args.db, socket_connect_timeout=1)
+    old_size, method = memory_per_entry(client, [(legacy_score_key(*p), repr(3.5)) for p in sample])
+    new_size, _ = memory_per_entry(client, [(score_key(*p), encode_score(3.5)) for p in sample])
+    print(f"memory per entry ({method}): {old_size:.1f} -> {new_size:.1f} bytes, "
+          f"saved {1 - new_size / old_size:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Load test for the scoring API running in-process against fakeredis
+
+Usage:
+    python -m benchmarks.load [-n 5000] [-c 16] [--interests-ratio 0.3] [--max-p99 0.05]
+
+Two phases are run:
+  * http    - a ThreadingHTTPServer with MainHTTPHandler driven by -c client threads,
+              reports RPS and p50/p95/p99 latency;
+  * handler - method_handler called directly under tracemalloc, reports calls/sec,
+              peak traced memory and blocks retained per call.
+"""
+import hashlib
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
+from http.server import ThreadingHTTPServer
+
+import fakeredis
+
+from src.api import SALT, MainHTTPHandler, method_handler
+from src.store import Store
+
+ACCOUNT = "horns&hoofs"
+LOGIN = "h&f"
+INTERESTS = ["cars", "pets", "travel", "hi-tech", "sport", "music", "books", "tv", "cinema", "geek", "otus"]
+
+
+class QuietHandler(MainHTTPHandler):
+    """MainHTTPHandler without the per-request access log on stderr"""
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+
+def make_store(clients=1000, seed=0):
+    """Store on top of a private fakeredis server, seeded with client interests"""
+    server = fakeredis.FakeServer()
+    store = Store(client_factory=lambda **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+    rnd = random.Random(seed)
+    for cid in range(clients):
+        store.redis.set(f"i:{cid}", json.dumps(rnd.sample(INTERESTS, 2)))
+    return store
+
+
+def make_requests(n, interests_ratio=0.3, clients=1000, seed=0):
+    """Mixed online_score / clients_interests request bodies"""
+    rnd = random.Random(seed)
+    token = hashlib.sha512((ACCOUNT + LOGIN + SALT).encode("utf-8")).hexdigest()
+    bodies = []
+    for i in range(n):
+        if rnd.random() < interests_ratio:
+            method = "clients_interests"
+            arguments = {"client_ids": rnd.sample(range(clients), rnd.randint(1, 10)), "date": "20.07.2017"}
+        else:
+            method = "online_score"
+            arguments = {"phone": "7" + str(rnd.randrange(10 ** 10)).zfill(10), "email": f"u{i}@otus.ru",
+                         "first_name": "a", "last_name": f"b{rnd.randrange(100)}", "gender": 1,
+                         "birthday": "01.01.1990"}
+        bodies.append({"account": ACCOUNT, "login": LOGIN, "method": method, "token": token,
+                       "arguments": arguments})
+    return bodies
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def run_http(store, bodies, concurrency):
+    """Drive the API over HTTP, return a report dict"""
+    QuietHandler.store = store
+    server = ThreadingHTTPServer(("localhost", 0), QuietHandler)
+    server.daemon_threads = True
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    port = server.server_address[1]
+    payloads = [json.dumps(body).encode("utf-8") for body in bodies]
+
+    def call(payload):
+        started = time.perf_counter()
+        conn = http.client.HTTPConnection("localhost", port, timeout=10)
+        try:
+            conn.request("POST", "/method", body=payload, headers={"Content-Type": "application/json"})
+            status = json.loads(conn.getresponse().read())["code"]
+        finally:
+            conn.close()
+        return time.perf_counter() - started, status
+
+    try:
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(call, payloads))
+        elapsed = time.perf_counter() - started
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    latencies = sorted(latency for latency, _ in results)
+    return {
+        "requests": len(results),
+        "errors": sum(1 for _, status in results if status != 200),
+        "rps": len(results) / elapsed,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def run_handler(store, bodies):
+    """Call method_handler directly under tracemalloc, return a report dict"""
+    requests = [{"body": body, "headers": {}} for body in bodies]
+    started = time.perf_counter()
+    for request in requests:
+        method_handler(request, {}, store)
+    elapsed = time.perf_counter() - started
+
+    # second pass under tracemalloc, kept out of the timing above
+    tracemalloc.start()
+    try:
+        blocks_before = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+        tracemalloc.reset_peak()
+        for request in requests:
+            method_handler(request, {}, store)
+        _, peak = tracemalloc.get_traced_memory()
+        blocks_after = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    finally:
+        tracemalloc.stop()
+    return {
+        "calls": len(requests),
+        "calls_per_sec": len(requests) / elapsed,
+        "peak_kib": peak / 1024,
+        "blocks_per_call": (blocks_after - blocks_before) / len(requests),
+    }
+
+
+def main():
+    parser = ArgumentParser()
+    parser.add_argument("-n", type=int, default=5000, help="Number of requests")
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--interests-ratio", type=float, default=0.3, help="Share of clients_interests requests")
+    parser.add_argument("--max-p99", type=float, default=None, help="Fail if HTTP p99 latency exceeds this (sec)")
+    args = parser.parse_args()
+
+    store = make_store()
+    bodies = make_requests(args.n, args.interests_ratio)
+
+    http_report = run_http(store, bodies, args.concurrency)
+    print(f"http:    {http_report['requests']} requests, {http_report['errors']} errors, "
+          f"{http_report['rps']:.0f} rps, p50 {http_report['p50'] * 1000:.2f} ms, "
+          f"p95 {http_report['p95'] * 1000:.2f} ms, p99 {http_report['p99'] * 1000:.2f} ms")
+
+    handler_report = run_handler(store, bodies)
+    print(f"handler: {handler_report['calls_per_sec']:.0f} calls/sec, "
+          f"peak {handler_report['peak_kib']:.1f} KiB, {handler_report['blocks_per_call']:.2f} blocks retained/call")
+
+    if http_report["errors"] or (args.max_p99 is not None and http_report["p99"] > args.max_p99):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
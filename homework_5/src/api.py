@@ -3,11 +3,16 @@ import datetime
 import hashlib
 import json
 import logging
+import threading
+import time
 import uuid
 from argparse import ArgumentParser
 from http.server import BaseHTTPRequestHandler, HTTPServer
 
+from src import metrics, scoring
+from src.replica import InterestReplica
 from src.scoring import get_interests, get_score
+from src.store import Store
 
 SALT = "Otus"
 ADMIN_LOGIN = "admin"
@@ -16,12 +21,14 @@ OK = 200
 BAD_REQUEST = 400
 FORBIDDEN = 403
 NOT_FOUND = 404
+REQUEST_TOO_LARGE = 413
 INVALID_REQUEST = 422
 INTERNAL_ERROR = 500
 ERRORS = {
     BAD_REQUEST: "Bad Request",
     FORBIDDEN: "Forbidden",
     NOT_FOUND: "Not Found",
+    REQUEST_TOO_LARGE: "Request Entity Too Large",
     INVALID_REQUEST: "Invalid Request",
     INTERNAL_ERROR: "Internal Server Error",
 }
@@ -33,6 +40,10 @@ GENDERS = {
     MALE: "male",
     FEMALE: "female",
 }
+METHODS = ("online_score", "clients_interests")
+MAX_BODY_SIZE = 64 * 1024
+MAX_CLIENT_IDS = 1000
+LOG_BODY_LIMIT = 256
 
 
 class ValidationError(Exception):
@@ -125,11 +136,17 @@ class GenderField(Field):
 
 class ClientIDsField(Field):
     """Class for client IDs field validation"""
+    def __init__(self, required=False, nullable=False, max_length=None):
+        super().__init__(required, nullable)
+        self.max_length = max_length
+
     def parse(self, value):
         if not isinstance(value, list):
             raise ValidationError("ClientIDs must be a list")
         if not value:
             raise ValidationError("ClientIDs list is empty")
+        if self.max_length is not None and len(value) > self.max_length:
+            raise ValidationError(f"ClientIDs list is longer than {self.max_length}")
         for item in value:
             if not isinstance(item, int):
                 raise ValidationError("All client IDs must be integers")
@@ -197,7 +214,7 @@ class OnlineScoreRequest(Request):
 
 class ClientsInterestsRequest(Request):
     """Request for clients interests"""
-    client_ids = ClientIDsField(required=True)
+    client_ids = ClientIDsField(required=True, max_length=MAX_CLIENT_IDS)
     date = DateField(required=False, nullable=True)
 
 
@@ -224,15 +241,26 @@ def check_auth(request):
     return digest == request.token
 
 
+def metric_method(method):
+    """Method name usable as a metric label, unknown names are collapsed"""
+    return method if method in METHODS else "other"
+
+
+def invalid_request(method, errors):
+    """Count a validation failure and build the error response"""
+    metrics.VALIDATION_FAILURES.inc(metric_method(method))
+    return errors, INVALID_REQUEST
+
+
 def method_handler(request, ctx, store):
     """Handle method request"""
     try:
         req = MethodRequest(request['body'])
     except Exception as e:
-        return str(e), INVALID_REQUEST
+        return invalid_request(None, str(e))
 
     if not req.is_valid():
-        return req.errors, INVALID_REQUEST
+        return invalid_request(getattr(req, "method", None), req.errors)
 
     if not check_auth(req):
         return ERRORS[FORBIDDEN], FORBIDDEN
@@ -241,11 +269,11 @@ def method_handler(request, ctx, store):
     if req.method == "online_score":
         score_req = OnlineScoreRequest(arguments)
         if not score_req.is_valid():
-            return score_req.errors, INVALID_REQUEST
+            return invalid_request(req.method, score_req.errors)
         try:
             score_req.validate_pairs()
         except ValidationError as e:
-            return str(e), INVALID_REQUEST
+            return invalid_request(req.method, str(e))
         ctx['has'] = [k for k, v in score_req.cleaned_data.items() if v is not None]
         if req.is_admin:
             return {"score": 42}, OK
@@ -254,11 +282,29 @@ def method_handler(request, ctx, store):
     elif req.method == "clients_interests":
         ci_req = ClientsInterestsRequest(arguments)
         if not ci_req.is_valid():
-            return ci_req.errors, INVALID_REQUEST
+            return invalid_request(req.method, ci_req.errors)
         ctx['nclients'] = len(ci_req.cleaned_data['client_ids'])
         return {cid: get_interests(store, cid) for cid in ci_req.cleaned_data['client_ids']}, OK
     else:
-        return ERRORS[INVALID_REQUEST], INVALID_REQUEST
+        return invalid_request(req.method, ERRORS[INVALID_REQUEST])
+
+
+_buffers = threading.local()
+
+
+def read_body(rfile, length):
+    """Read exactly length bytes into a per-thread reusable buffer, return a view or None on EOF."""
+    buffer = getattr(_buffers, "body", None)
+    if buffer is None or len(buffer) < length:
+        buffer = _buffers.body = bytearray(length)
+    view = memoryview(buffer)[:length]
+    received = 0
+    while received < length:
+        n = rfile.readinto(view[received:])
+        if not n:
+            return None
+        received += n
+    return view
 
 
 class MainHTTPHandler(BaseHTTPRequestHandler):
@@ -267,25 +313,54 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
         "method": method_handler
     }
     store = None
+    max_body_size = MAX_BODY_SIZE
+
+    def read_request(self):
+        """Validate Content-Length, then read and decode the JSON body."""
+        try:
+            length = int(self.headers['Content-Length'])
+        except (TypeError, ValueError):
+            return None, None, BAD_REQUEST
+        if length < 0:
+            return None, None, BAD_REQUEST
+        if length > self.max_body_size:
+            self.close_connection = True  # the body is left unread
+            return None, None, REQUEST_TOO_LARGE
+        body = read_body(self.rfile, length)
+        if body is None:
+            return None, None, BAD_REQUEST
+        try:
+            data_string = str(body, 'utf-8')
+            return json.loads(data_string), data_string, OK
+        except ValueError:
+            return None, None, BAD_REQUEST
 
     def get_request_id(self, headers):
         """Get the request id from the header."""
         return headers.get('HTTP_X_REQUEST_ID', uuid.uuid4().hex)
 
+    def do_GET(self):
+        """Serve metrics in Prometheus text format."""
+        if self.path.strip("/") != "metrics":
+            self.send_error(NOT_FOUND)
+            return
+        body = metrics.REGISTRY.render().encode('utf-8')
+        self.send_response(OK)
+        self.send_header("Content-Type", metrics.CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
     def do_POST(self):
         """Handle the HTTP POST requests."""
+        started = time.perf_counter()
         response, code = {}, OK
         context = {"request_id": self.get_request_id(self.headers)}
-        request = None
-        try:
-            data_string = self.rfile.read(int(self.headers['Content-Length']))
-            request = json.loads(data_string)
-        except Exception:
-            code = BAD_REQUEST
+        request, data_string, code = self.read_request()
 
         if request:
             path = self.path.strip("/")
-            logging.info(f"{self.path}: {data_string} {context["request_id"]}")
+            logging.info(f"{self.path}: {data_string[:LOG_BODY_LIMIT]} {context["request_id"]}")
             if path in self.router:
                 try:
                     response, code = self.router[path]({"body": request, "headers": self.headers}, context, self.store)
@@ -305,6 +380,8 @@ class MainHTTPHandler(BaseHTTPRequestHandler):
         context.update(r)
         logging.info(context)
         self.wfile.write(json.dumps(r).encode('utf-8'))
+        method = request.get("method") if isinstance(request, dict) else None
+        metrics.REQUEST_LATENCY.observe(time.perf_counter() - started, metric_method(method), str(code))
         return
 
 
@@ -312,9 +389,24 @@ if __name__ == "__main__":
     parser = ArgumentParser()
     parser.add_argument("-p", "--port", action="store", type=int, default=8080)
     parser.add_argument("-l", "--log", action="store", default=None)
+    parser.add_argument("--migrate-keys", action="store_true", help="Also read score cache keys in the old md5 format")
+    parser.add_argument("--redis-host", action="store", default="localhost")
+    parser.add_argument("--redis-port", action="store", type=int, default=6379)
+    parser.add_argument("--interests-replica", action="store_true", help="Serve client interests from a local copy")
+    parser.add_argument("--replica-refresh", action="store", type=int, default=300, help="Replica reload interval, sec")
+    parser.add_argument("--replica-watch", action="store_true", help="Follow Redis keyspace notifications")
+    parser.add_argument("--max-body-size", action="store", type=int, default=MAX_BODY_SIZE, help="Bytes")
+    parser.add_argument("--max-client-ids", action="store", type=int, default=MAX_CLIENT_IDS)
     args = parser.parse_args()
+    scoring.READ_LEGACY_KEYS = args.migrate_keys
     logging.basicConfig(filename=args.log, level=logging.INFO,
                         format='[%(asctime)s] %(levelname).1s %(message)s', datefmt='%Y.%m.%d %H:%M:%S')
+    MainHTTPHandler.max_body_size = args.max_body_size
+    ClientsInterestsRequest.__fields__["client_ids"].max_length = args.max_client_ids
+    MainHTTPHandler.store = Store(host=args.redis_host, port=args.redis_port)
+    if args.interests_replica:
+        MainHTTPHandler.store = InterestReplica(MainHTTPHandler.store, refresh_interval=args.replica_refresh)
+        MainHTTPHandler.store.start(watch=args.replica_watch)
     server = HTTPServer(("localhost", args.port), MainHTTPHandler)
     logging.info(f"Starting server at {args.port}")
     try:
@@ -0,0 +1,93 @@
+"""Cache key derivation and compact value encoding for scoring"""
+import base64
+import hashlib
+import struct
+from datetime import datetime
+from typing import Optional
+
+try:
+    import xxhash
+except ImportError:  # optional speedup, blake2b is always available
+    xxhash = None
+
+DIGEST_SIZE = 8
+LEGACY_PREFIX = "uid:"
+# The prefix names the hash so that processes with and without xxhash never
+# read each other's entries as a different user's score.
+SCORE_PREFIX = "sx:" if xxhash is not None else "sb:"
+
+# u16 length of first_name, last_name, phone + u32 birthday ordinal
+_HEADER = struct.Struct("<HHHI")
+
+
+def _digest_blake2b(data: bytes) -> bytes:
+    return hashlib.blake2b(data, digest_size=DIGEST_SIZE).digest()
+
+
+def _digest_xxhash(data: bytes) -> bytes:
+    return xxhash.xxh3_64_digest(data)
+
+
+_digest = _digest_xxhash if xxhash is not None else _digest_blake2b
+
+
+def pack_score_fields(
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    phone: Optional[str] = None,
+    birthday: Optional[datetime] = None,
+) -> bytes:
+    """Pack key fields into a length-prefixed binary layout"""
+    first = first_name.encode("utf-8") if first_name else b""
+    last = last_name.encode("utf-8") if last_name else b""
+    phone_bytes = phone.encode("utf-8") if phone else b""
+    ordinal = birthday.toordinal() if birthday else 0
+    return _HEADER.pack(len(first), len(last), len(phone_bytes), ordinal) + first + last + phone_bytes
+
+
+def score_key(
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    phone: Optional[str] = None,
+    birthday: Optional[datetime] = None,
+) -> str:
+    """Cache key for a score: short non-cryptographic digest, base64url encoded"""
+    digest = _digest(pack_score_fields(first_name, last_name, phone, birthday))
+    return SCORE_PREFIX + base64.urlsafe_b64encode(digest).rstrip(b"=").decode("ascii")
+
+
+def legacy_score_key(
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None,
+    phone: Optional[str] = None,
+    birthday: Optional[datetime] = None,
+) -> str:
+    """Cache key in the original md5 format, used by the migration mode"""
+    key_parts = [
+        first_name or "",
+        last_name or "",
+        phone or "",
+        birthday.strftime("%Y%m%d") if birthday else "",
+    ]
+    return LEGACY_PREFIX + hashlib.md5("".join(key_parts).encode("utf-8")).hexdigest()
+
+
+def encode_score(score: float) -> str:
+    """Encode a score as a single character when it is a multiple of 0.5
+
+    Code points below 0x80 are one byte in utf-8, so the value survives a
+    client with decode_responses=True. Anything else is kept as a decimal string.
+    """
+    halves = score * 2
+    if halves.is_integer() and 0 <= halves < 0x80:
+        return chr(int(halves))
+    return repr(float(score))
+
+
+def decode_score(value) -> float:
+    """Decode a cached score written by encode_score or by the legacy format"""
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    if len(value) == 1:
+        return ord(value) / 2
+    return float(value)
@@ -0,0 +1,154 @@
+"""In-process metrics for the scoring API, rendered in Prometheus text format"""
+import bisect
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+
+def hdr_bounds(lowest=1e-5, highest=10.0, sub_buckets=(1, 2, 3, 5, 7)):
+    """Log-linear bucket bounds: a few linear steps inside every decade, like HDR histograms"""
+    bounds = []
+    decade = lowest
+    while decade <= highest:
+        for step in sub_buckets:
+            bound = round(decade * step, 12)
+            if bound <= highest:
+                bounds.append(bound)
+        decade *= 10
+    return tuple(bounds)
+
+
+DEFAULT_BOUNDS = hdr_bounds()
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+    kind = "counter"
+
+    def __init__(self, name, documentation, labels=()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        """Increase the counter for the given label values"""
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values):
+        """Current value for the given label values"""
+        return self._values.get(label_values, 0)
+
+    def samples(self):
+        """Yield exposition lines"""
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}"
+
+
+class Histogram:
+    """Histogram with fixed HDR-style buckets, one bucket array per label set"""
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labels=(), bounds=DEFAULT_BOUNDS):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.bounds = tuple(bounds)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        """Record one observation"""
+        index = bisect.bisect_left(self.bounds, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.bounds) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *label_values):
+        """Observe the duration of the with-block in seconds"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *label_values)
+
+    def count(self, *label_values):
+        """Number of observations for the given label values"""
+        series = self._series.get(label_values)
+        return sum(series[0]) if series else 0
+
+    def samples(self):
+        """Yield exposition lines with cumulative buckets"""
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._series.items())
+        for label_values, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.bounds + (math.inf,), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labels, label_values, le)} {cumulative}"
+            labels = _format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Collection of metrics exposed together"""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def register(self, metric):
+        """Add a metric, names must be unique"""
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+REGISTRY = Registry()
+REQUEST_LATENCY = REGISTRY.register(Histogram(
+    "scoring_request_duration_seconds", "Time spent handling an API request", labels=("method", "code")))
+STORE_LATENCY = REGISTRY.register(Histogram(
+    "scoring_store_duration_seconds", "Redis round-trip time including retries", labels=("op",)))
+STORE_ERRORS = REGISTRY.register(Counter(
+    "scoring_store_errors_total", "Failed Redis attempts", labels=("op",)))
+CACHE_REQUESTS = REGISTRY.register(Counter(
+    "scoring_cache_requests_total", "Score cache lookups", labels=("result",)))
+COALESCED_REQUESTS = REGISTRY.register(Counter(
+    "scoring_coalesced_requests_total", "Score lookups served by another in-flight request"))
+VALIDATION_FAILURES = REGISTRY.register(Counter(
+    "scoring_validation_failures_total", "Requests rejected by validation", labels=("method",)))
@@ -0,0 +1,141 @@
+"""Local read-through replica of the client interests keyspace"""
+import json
+import logging
+import sys
+import threading
+import time
+
+import redis
+
+INTERESTS_PREFIX = "i:"
+WATCH_BACKOFF = 1.0
+WATCH_BACKOFF_MAX = 30.0
+
+
+def compact_interests(raw):
+    """Decode a stored interests blob into a tuple of interned names"""
+    if not raw:
+        return ()
+    return tuple(sys.intern(name) for name in json.loads(raw))
+
+
+class InterestReplica:
+    """Store wrapper that serves i:* keys from memory
+
+    The whole keyspace is bulk-loaded with SCAN+MGET, refreshed every
+    refresh_interval seconds in the background and, optionally, kept up to date
+    per key through Redis keyspace notifications. Unknown client ids are read
+    through from the store and remembered only if the store has them, so
+    lookups of missing ids cannot grow the copy. Every other call goes to the store.
+    """
+
+    def __init__(self, store, refresh_interval=300, batch_size=500):
+        self.store = store
+        self.refresh_interval = refresh_interval
+        self.batch_size = batch_size
+        self.loaded_at = None
+        self._interests = {}
+        self._stop = threading.Event()
+        self._threads = []
+
+    def get(self, key):
+        return self.store.get(key)
+
+    def cache_get(self, key):
+        return self.store.cache_get(key)
+
+    def cache_set(self, key, value, expire=60):
+        return self.store.cache_set(key, value, expire)
+
+    def load(self):
+        """Replace the local copy with a fresh snapshot of the i:* keyspace"""
+        interests = {}
+        cursor = 0
+        while True:
+            cursor, keys = self.store.scan(cursor, match=INTERESTS_PREFIX + "*", count=self.batch_size)
+            if keys:
+                for key, raw in zip(keys, self.store.mget(keys)):
+                    interests[key[len(INTERESTS_PREFIX):]] = compact_interests(raw)
+            if not cursor:
+                break
+        self._interests = interests
+        self.loaded_at = time.monotonic()
+        logging.info(f"Interest replica loaded {len(interests)} clients")
+        return len(interests)
+
+    def interests(self, cid):
+        """Interests of a client as a tuple, read through to the store on a miss"""
+        cid = str(cid)
+        found = self._interests.get(cid)
+        if found is None:
+            found = compact_interests(self.store.get(INTERESTS_PREFIX + cid))
+            if found:
+                self._interests[cid] = found
+        return found
+
+    def start(self, watch=False):
+        """Initial load plus background refresh, and keyspace notifications if watch is set"""
+        self.load()
+        if self.refresh_interval:
+            self._spawn(self._refresh_loop)
+        if watch:
+            self._spawn(self._watch_loop)
+
+    def stop(self):
+        """Stop background threads"""
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout=1)
+        self._threads = []
+
+    def _spawn(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def _refresh_loop(self):
+        while not self._stop.wait(self.refresh_interval):
+            try:
+                self.load()
+            except ConnectionError as e:
+                logging.warning(f"Interest replica refresh failed, serving stale data: {e}")
+
+    def _watch_loop(self):
+        delay = WATCH_BACKOFF
+        while not self._stop.is_set():
+            pubsub = None
+            try:
+                pubsub = self._subscribe()
+                delay = WATCH_BACKOFF
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message:
+                        self.on_keyspace_event(message["channel"], message["data"])
+            except (redis.RedisError, ConnectionError) as e:
+                logging.warning(f"Interest replica watcher failed, resubscribing in {delay}s: {e}")
+                self._stop.wait(delay)
+                delay = min(delay * 2, WATCH_BACKOFF_MAX)
+            finally:
+                if pubsub is not None:
+                    pubsub.close()
+
+    def _subscribe(self):
+        # store.redis is replaced on reconnect, so always take the current client
+        client = self.store.redis
+        try:
+            # K = keyspace channel, g = generic (del/expire), $ = string commands, x = expired
+            client.config_set("notify-keyspace-events", "Kg$x")
+        except redis.ResponseError as e:
+            logging.warning(f"Could not enable keyspace notifications, relying on server config: {e}")
+        pubsub = client.pubsub(ignore_subscribe_messages=True)
+        pubsub.psubscribe(f"__keyspace@{self.store.db}__:{INTERESTS_PREFIX}*")
+        return pubsub
+
+    def on_keyspace_event(self, channel, event):
+        """Apply one keyspace notification to the local copy"""
+        key = channel.split(":", 1)[1]
+        cid = key[len(INTERESTS_PREFIX):]
+        if event in ("del", "expired", "evicted"):
+            self._interests.pop(cid, None)
+        else:
+            self._interests[cid] = compact_interests(self.store.get(key))
@@ -1,31 +1,54 @@
-import hashlib
 import json
 from datetime import datetime
 from typing import Optional
 
-def get_score(
-    store, 
-    phone: Optional[str] = None, 
-    email: Optional[str] = None, 
-    birthday: Optional[datetime] = None, 
-    gender: Optional[int] = None, 
-    first_name: Optional[str] = None, 
-    last_name: Optional[str] = None
-) -> float:
-    key_parts = [
-        first_name or "",
-        last_name or "",
-        phone or "",
-        birthday.strftime("%Y%m%d") if birthday else "",
-    ]
-    key = "uid:" + hashlib.md5("".join(key_parts).encode('utf-8')).hexdigest()
-    
-    # Try to get from cache
+from src.keys import decode_score, encode_score, legacy_score_key, score_key
+from src.metrics import CACHE_REQUESTS, COALESCED_REQUESTS
+from src.replica import InterestReplica
+from src.singleflight import AsyncSingleFlight, SingleFlight
+
+# Migration mode: on a miss under the new key, also look up the md5 key written
+# by older releases and copy the value over. Costs one extra round-trip per miss.
+READ_LEGACY_KEYS = False
+SCORE_TTL = 60 * 60
+
+# Concurrent misses for the same user share one cache round-trip and computation.
+# The async variant must only be used from a single event loop.
+_score_flight = SingleFlight()
+_async_score_flight = AsyncSingleFlight()
+
+
+def _cache_lookup(store, key, first_name, last_name, phone, birthday):
     score = store.cache_get(key)
     if score is not None:
-        return float(score)
-    
-    # Calculate score
+        CACHE_REQUESTS.inc("hit")
+        return decode_score(score)
+    if READ_LEGACY_KEYS:
+        score = store.cache_get(legacy_score_key(first_name, last_name, phone, birthday))
+    if score is None:
+        CACHE_REQUESTS.inc("miss")
+        return None
+    CACHE_REQUESTS.inc("legacy_hit")
+    score = decode_score(score)
+    store.cache_set(key, encode_score(score), SCORE_TTL)
+    return score
+
+async def _cache_lookup_async(store, key, first_name, last_name, phone, birthday):
+    score = await store.cache_get(key)
+    if score is not None:
+        CACHE_REQUESTS.inc("hit")
+        return decode_score(score)
+    if READ_LEGACY_KEYS:
+        score = await store.cache_get(legacy_score_key(first_name, last_name, phone, birthday))
+    if score is None:
+        CACHE_REQUESTS.inc("miss")
+        return None
+    CACHE_REQUESTS.inc("legacy_hit")
+    score = decode_score(score)
+    await store.cache_set(key, encode_score(score), SCORE_TTL)
+    return score
+
+def _compute_score(phone, email, birthday, gender, first_name, last_name) -> float:
     score = 0.0
     if phone:
         score += 1.5
@@ -35,11 +58,67 @@ def get_score(
         score += 1.5
     if first_name and last_name:
         score += 0.5
-    
-    # Cache the score for 60 minutes
-    store.cache_set(key, score, 60 * 60)
+    return score
+
+def _flight_key(key, email, gender):
+    # the cache key does not cover email and gender, but the score depends on them
+    return key, bool(email), gender is not None
+
+def _score_through_cache(store, key, phone, email, birthday, gender, first_name, last_name):
+    score = _cache_lookup(store, key, first_name, last_name, phone, birthday)
+    if score is not None:
+        return score
+    score = _compute_score(phone, email, birthday, gender, first_name, last_name)
+    store.cache_set(key, encode_score(score), SCORE_TTL)
+    return score
+
+async def _score_through_cache_async(store, key, phone, email, birthday, gender, first_name, last_name):
+    score = await _cache_lookup_async(store, key, first_name, last_name, phone, birthday)
+    if score is not None:
+        return score
+    score = _compute_score(phone, email, birthday, gender, first_name, last_name)
+    await store.cache_set(key, encode_score(score), SCORE_TTL)
+    return score
+
+def get_score(
+    store, 
+    phone: Optional[str] = None, 
+    email: Optional[str] = None, 
+    birthday: Optional[datetime] = None, 
+    gender: Optional[int] = None, 
+    first_name: Optional[str] = None, 
+    last_name: Optional[str] = None
+) -> float:
+    key = score_key(first_name, last_name, phone, birthday)
+    score, shared = _score_flight.do(
+        _flight_key(key, email, gender),
+        _score_through_cache, store, key, phone, email, birthday, gender, first_name, last_name,
+    )
+    if shared:
+        COALESCED_REQUESTS.inc()
+    return score
+
+async def get_score_async(
+    store,
+    phone: Optional[str] = None,
+    email: Optional[str] = None,
+    birthday: Optional[datetime] = None,
+    gender: Optional[int] = None,
+    first_name: Optional[str] = None,
+    last_name: Optional[str] = None
+) -> float:
+    """get_score for asyncio servers, store methods must be coroutines (e.g. redis.asyncio)"""
+    key = score_key(first_name, last_name, phone, birthday)
+    score, shared = await _async_score_flight.do(
+        _flight_key(key, email, gender),
+        _score_through_cache_async, store, key, phone, email, birthday, gender, first_name, last_name,
+    )
+    if shared:
+        COALESCED_REQUESTS.inc()
     return score
 
 def get_interests(store, cid: str) -> list:
+    if isinstance(store, InterestReplica):
+        return list(store.interests(cid))
     r = store.get(f"i:{cid}")
     return json.loads(r) if r else []
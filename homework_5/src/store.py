@@ -2,19 +2,23 @@ import redis
 import time
 import logging
 
+from src.metrics import STORE_ERRORS, STORE_LATENCY
+
 RETRY_COUNT = 3
 RETRY_DELAY = 0.1
 
 class Store:
-    def __init__(self, host='localhost', port=6379, db=0, timeout=1):
+    def __init__(self, host='localhost', port=6379, db=0, timeout=1, client_factory=None):
         self.host = host
         self.port = port
         self.db = db
         self.timeout = timeout
+        self.client_factory = client_factory  # e.g. fakeredis.FakeRedis for in-process runs
         self._connect()
 
     def _connect(self):
-        self.redis = redis.Redis(
+        factory = self.client_factory or redis.Redis
+        self.redis = factory(
             host=self.host,
             port=self.port,
             db=self.db,
@@ -24,13 +28,16 @@ class Store:
         )
 
     def _try(self, func, *args, **kwargs):
-        for attempt in range(RETRY_COUNT):
-            try:
-                return func(*args, **kwargs)
-            except redis.RedisError as e:
-                logging.warning(f"Redis error: {e}, attempt {attempt+1}")
-                time.sleep(RETRY_DELAY)
-                self._connect()
+        op = getattr(func, "__name__", "unknown")
+        with STORE_LATENCY.time(op):
+            for attempt in range(RETRY_COUNT):
+                try:
+                    return func(*args, **kwargs)
+                except redis.RedisError as e:
+                    STORE_ERRORS.inc(op)
+                    logging.warning(f"Redis error: {e}, attempt {attempt+1}")
+                    time.sleep(RETRY_DELAY)
+                    self._connect()
         raise ConnectionError("Could not connect to Redis after retries")
 
     def get(self, key):
@@ -41,3 +48,9 @@ class Store:
 
     def cache_set(self, key, value, expire=60):
         return self._try(self.redis.setex, key, expire, value)
+
+    def scan(self, cursor=0, match=None, count=None):
+        return self._try(self.redis.scan, cursor, match=match, count=count)
+
+    def mget(self, keys):
+        return self._try(self.redis.mget, keys)
@@ -1,8 +1,16 @@
+import http.client
+import io
+import json
+import threading
 import unittest
 from datetime import datetime
+from http.server import ThreadingHTTPServer
 import hashlib
 
-from src.api import method_handler, INVALID_REQUEST, FORBIDDEN, OK
+from src.api import (
+    method_handler, read_body, MainHTTPHandler, MAX_CLIENT_IDS,
+    BAD_REQUEST, INVALID_REQUEST, FORBIDDEN, OK, REQUEST_TOO_LARGE,
+)
 from tests.utils import cases
 
 
@@ -110,3 +118,63 @@ class TestAPIMethodHandler(unittest.TestCase):
         assert code == OK
         assert response[1] == ["books", "music"]
         assert response[2] == ["sports"]
+
+    def test_too_many_client_ids(self):
+        account = "test"
+        login = "user"
+        token = hashlib.sha512((account + login + "Otus").encode()).hexdigest()
+        self.store = MockStore()
+        request = {
+            "account": account,
+            "login": login,
+            "method": "clients_interests",
+            "token": token,
+            "arguments": {"client_ids": list(range(MAX_CLIENT_IDS + 1))}
+        }
+        response, code = self.get_response(request)
+        assert code == INVALID_REQUEST
+        assert "client_ids" in response
+
+
+class TestMainHTTPHandlerBody(unittest.TestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("localhost", 0), MainHTTPHandler)
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.conn = http.client.HTTPConnection("localhost", self.server.server_address[1], timeout=5)
+
+    def tearDown(self):
+        self.conn.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def post(self, body, headers=None):
+        self.conn.request("POST", "/method", body=body, headers=headers or {})
+        response = self.conn.getresponse()
+        return response.status, json.loads(response.read())
+
+    def test_oversized_body_rejected_before_reading(self):
+        length = MainHTTPHandler.max_body_size + 1
+        self.conn.putrequest("POST", "/method")
+        self.conn.putheader("Content-Length", str(length))
+        self.conn.endheaders()
+        response = self.conn.getresponse()
+        assert response.status == REQUEST_TOO_LARGE
+        assert json.loads(response.read())["code"] == REQUEST_TOO_LARGE
+
+    def test_bad_content_length(self):
+        status, body = self.post(b"{}", headers={"Content-Length": "abc"})
+        assert body["code"] == BAD_REQUEST
+
+    def test_body_is_parsed(self):
+        status, body = self.post(json.dumps({"login": "h&f"}).encode())
+        assert body["code"] == INVALID_REQUEST
+
+    def test_buffer_is_reused(self):
+        first = read_body(io.BytesIO(b"ab"), 2)
+        second = read_body(io.BytesIO(b"cd"), 2)
+        assert first.obj is second.obj
+
+    def test_read_body_handles_short_reads(self):
+        rfile = io.BufferedReader(io.BytesIO(b'{"a": 1}'), buffer_size=2)
+        assert bytes(read_body(rfile, 8)) == b'{"a": 1}'
+        assert read_body(io.BytesIO(b"{}"), 8) is None
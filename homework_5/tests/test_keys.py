@@ -0,0 +1,64 @@
+"""Module for cache key tests"""
+from datetime import datetime
+
+import fakeredis
+import pytest
+
+from src import keys, scoring
+
+
+@pytest.fixture
+def fake_store():
+    """Store stand-in backed by fakeredis"""
+    client = fakeredis.FakeRedis(decode_responses=True)
+
+    class FakeStore:
+        def cache_get(self, key):
+            return client.get(key)
+
+        def cache_set(self, key, value, expire):
+            client.setex(key, expire, value)
+
+    return FakeStore()
+
+
+def test_score_key_is_short_and_stable():
+    """same input gives the same compact key"""
+    birthday = datetime(1990, 5, 17)
+    key = keys.score_key("a", "b", "79175002040", birthday)
+    assert key == keys.score_key("a", "b", "79175002040", birthday)
+    assert key.startswith(keys.SCORE_PREFIX)
+    assert len(key) < len(keys.legacy_score_key("a", "b", "79175002040", birthday))
+
+
+def test_score_key_has_no_join_collisions():
+    """field boundaries are part of the layout"""
+    assert keys.score_key("ab", "c") != keys.score_key("a", "bc")
+    assert keys.legacy_score_key("ab", "c") == keys.legacy_score_key("a", "bc")
+
+
+@pytest.mark.parametrize("score", [0.0, 0.5, 1.5, 3.0, 5.0, 63.5, 0.3, 1000.0])
+def test_encode_decode_roundtrip(score):
+    """encoded score decodes to the same value"""
+    encoded = keys.encode_score(score)
+    assert keys.decode_score(encoded) == score
+    assert keys.decode_score(encoded.encode("utf-8")) == score
+
+
+def test_decode_legacy_value():
+    """decimal strings from the old format are still readable"""
+    assert keys.decode_score("3.5") == 3.5
+
+
+def test_migration_mode_reads_legacy_key(fake_store, monkeypatch):
+    """legacy entry is served and copied to the new key"""
+    monkeypatch.setattr(scoring, "READ_LEGACY_KEYS", True)
+    fake_store.cache_set(keys.legacy_score_key(phone="79175002040"), "42.0", 60)
+    assert scoring.get_score(fake_store, phone="79175002040") == 42.0
+    assert fake_store.cache_get(keys.score_key(phone="79175002040")) == keys.encode_score(42.0)
+
+
+def test_legacy_key_ignored_without_migration(fake_store):
+    """without migration mode the score is recomputed"""
+    fake_store.cache_set(keys.legacy_score_key(phone="79175002040"), "42.0", 60)
+    assert scoring.get_score(fake_store, phone="79175002040") == 1.5
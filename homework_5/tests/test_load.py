@@ -0,0 +1,26 @@
+"""Smoke test for the load-test harness"""
+from benchmarks import load
+
+
+def test_percentile():
+    """nearest-rank percentile"""
+    values = list(range(1, 101))
+    assert load.percentile(values, 50) == 50
+    assert load.percentile(values, 99) == 99
+    assert load.percentile([], 99) == 0.0
+
+
+def test_harness_runs_mixed_workload():
+    """both phases complete without errors on a small workload"""
+    store = load.make_store(clients=50)
+    bodies = load.make_requests(40, interests_ratio=0.5, clients=50)
+    assert {body["method"] for body in bodies} == {"online_score", "clients_interests"}
+
+    http_report = load.run_http(store, bodies, concurrency=4)
+    assert http_report["requests"] == 40
+    assert http_report["errors"] == 0
+    assert http_report["p50"] <= http_report["p95"] <= http_report["p99"]
+
+    handler_report = load.run_handler(store, bodies)
+    assert handler_report["calls"] == 40
+    assert handler_report["calls_per_sec"] > 0
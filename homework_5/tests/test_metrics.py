@@ -0,0 +1,74 @@
+"""Module for metrics tests"""
+import hashlib
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from src import metrics
+from src.api import INVALID_REQUEST, SALT, MainHTTPHandler, method_handler
+
+
+def test_hdr_bounds_are_sorted_and_log_linear():
+    """bounds grow inside a decade and across decades"""
+    bounds = metrics.hdr_bounds(lowest=0.001, highest=1.0, sub_buckets=(1, 2, 5))
+    assert bounds == (0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0)
+
+
+def test_histogram_renders_cumulative_buckets():
+    """buckets are cumulative and end with +Inf"""
+    hist = metrics.Histogram("h", "doc", labels=("op",), bounds=(0.1, 1.0))
+    hist.observe(0.05, "get")
+    hist.observe(0.5, "get")
+    hist.observe(5.0, "get")
+    registry = metrics.Registry()
+    registry.register(hist)
+    lines = registry.render().splitlines()
+    assert lines[:2] == ["# HELP h doc", "# TYPE h histogram"]
+    assert 'h_bucket{op="get",le="0.1"} 1' in lines
+    assert 'h_bucket{op="get",le="1.0"} 2' in lines
+    assert 'h_bucket{op="get",le="+Inf"} 3' in lines
+    assert 'h_count{op="get"} 3' in lines
+    assert hist.count("get") == 3
+
+
+def test_counter_and_duplicate_registration():
+    """counters accumulate and names are unique"""
+    counter = metrics.Counter("c_total", "doc", labels=("result",))
+    counter.inc("hit")
+    counter.inc("hit", amount=2)
+    registry = metrics.Registry()
+    registry.register(counter)
+    assert counter.value("hit") == 3
+    assert 'c_total{result="hit"} 3' in registry.render()
+    with pytest.raises(ValueError):
+        registry.register(counter)
+
+
+def test_validation_failures_are_counted():
+    """invalid arguments increase the failure counter for the method"""
+    before = metrics.VALIDATION_FAILURES.value("online_score")
+    token = hashlib.sha512(("a" + "h&f" + SALT).encode()).hexdigest()
+    request = {"account": "a", "login": "h&f", "method": "online_score", "token": token, "arguments": {"phone": "1"}}
+    _, code = method_handler({"body": request, "headers": {}}, {}, None)
+    assert code == INVALID_REQUEST
+    assert metrics.VALIDATION_FAILURES.value("online_score") == before + 1
+
+
+def test_metrics_endpoint():
+    """GET /metrics serves the registry and POST latency is recorded"""
+    server = ThreadingHTTPServer(("localhost", 0), MainHTTPHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    url = f"http://localhost:{server.server_address[1]}"
+    try:
+        requests.post(f"{url}/method", json={"method": "online_score"}, timeout=5)
+        response = requests.get(f"{url}/metrics", timeout=5)
+        assert response.status_code == 200
+        assert response.headers["Content-Type"] == metrics.CONTENT_TYPE
+        assert 'scoring_request_duration_seconds_count{method="online_score",code="422"}' in response.text
+        assert requests.get(f"{url}/other", timeout=5).status_code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,109 @@
+"""Module for interest replica tests"""
+import fakeredis
+import pytest
+import redis
+
+from src import scoring
+from src.replica import InterestReplica, compact_interests
+from src.store import Store
+
+
+@pytest.fixture
+def store():
+    """Store on a private fakeredis server with a few clients"""
+    server = fakeredis.FakeServer()
+    s = Store(client_factory=lambda **kwargs: fakeredis.FakeRedis(server=server, **kwargs))
+    for cid in range(1200):
+        s.redis.set(f"i:{cid}", '["books", "music"]')
+    s.redis.set("uid:other", "1.5")
+    return s
+
+
+def test_compact_interests_interns_names():
+    """decoded names are shared between clients"""
+    first = compact_interests('["sport", "music"]')
+    second = compact_interests('["music"]')
+    assert first == ("sport", "music")
+    assert first[1] is second[0]
+    assert compact_interests(None) == ()
+
+
+def test_load_reads_whole_keyspace(store):
+    """SCAN+MGET picks up only i:* keys"""
+    replica = InterestReplica(store, batch_size=100)
+    assert replica.load() == 1200
+    assert replica.interests(5) == ("books", "music")
+
+
+def test_served_without_network_after_load(store, mocker):
+    """loaded clients do not touch the store"""
+    replica = InterestReplica(store)
+    replica.load()
+    spy = mocker.spy(store, "get")
+    assert scoring.get_interests(replica, 7) == ["books", "music"]
+    assert spy.call_count == 0
+
+
+def test_read_through_on_miss(store):
+    """clients added after the load are fetched once"""
+    replica = InterestReplica(store)
+    replica.load()
+    store.redis.set("i:5000", '["tv"]')
+    assert replica.interests(5000) == ("tv",)
+    assert replica.interests(9999) == ()
+
+
+def test_keyspace_events_update_copy(store):
+    """set and del notifications are applied"""
+    replica = InterestReplica(store)
+    replica.load()
+    store.redis.set("i:1", '["geek"]')
+    replica.on_keyspace_event("__keyspace@0__:i:1", "set")
+    assert replica.interests(1) == ("geek",)
+    store.redis.delete("i:2")
+    replica.on_keyspace_event("__keyspace@0__:i:2", "del")
+    assert replica.interests(2) == ()
+
+
+def test_other_calls_are_delegated(store):
+    """cache methods go to the wrapped store"""
+    replica = InterestReplica(store)
+    replica.cache_set("k", "v", 10)
+    assert replica.cache_get("k") == "v"
+    assert replica.get("k") == "v"
+
+
+def test_misses_are_not_remembered(store):
+    """unknown and deleted clients do not grow the local copy"""
+    replica = InterestReplica(store)
+    replica.load()
+    for cid in range(5000, 5100):
+        assert replica.interests(cid) == ()
+    assert len(replica._interests) == 1200
+    replica.on_keyspace_event("__keyspace@0__:i:2", "del")
+    assert "2" not in replica._interests
+
+
+def test_watcher_resubscribes_after_errors(store, mocker):
+    """refused CONFIG SET is tolerated and a lost subscription moves to the new client"""
+    mocker.patch("src.replica.WATCH_BACKOFF", 0)
+    replica = InterestReplica(store)
+    replica.load()
+    old, new = mocker.Mock(), mocker.Mock()
+    old.config_set.side_effect = redis.ResponseError("unknown command 'config'")
+
+    def reconnect(timeout):
+        store.redis = new
+        raise redis.ConnectionError("connection reset")
+
+    def deliver(timeout):
+        replica._stop.set()
+        return {"channel": "__keyspace@0__:i:3", "data": "del"}
+
+    old.pubsub.return_value.get_message.side_effect = reconnect
+    new.pubsub.return_value.get_message.side_effect = deliver
+    store.redis = old
+    replica._watch_loop()
+    assert old.pubsub.return_value.close.called
+    new.pubsub.return_value.psubscribe.assert_called_once_with("__keyspace@0__:i:*")
+    assert "3" not in replica._interests
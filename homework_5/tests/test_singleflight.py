@@ -0,0 +1,138 @@
+"""Module for request coalescing tests"""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from src import scoring
+from src.singleflight import AsyncSingleFlight, SingleFlight
+
+
+class SlowStore:
+    """Store whose cache round-trips take a while, counting calls"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.cache_gets = 0
+        self.cache_sets = 0
+        self._lock = threading.Lock()
+
+    def cache_get(self, key):
+        with self._lock:
+            self.cache_gets += 1
+        time.sleep(self.delay)
+
+    def cache_set(self, key, value, expire):
+        with self._lock:
+            self.cache_sets += 1
+
+
+class AsyncSlowStore:
+    """Coroutine-based store, counting calls"""
+
+    def __init__(self, delay=0.05):
+        self.delay = delay
+        self.cache_gets = 0
+        self.cache_sets = 0
+
+    async def cache_get(self, key):
+        self.cache_gets += 1
+        await asyncio.sleep(self.delay)
+
+    async def cache_set(self, key, value, expire):
+        self.cache_sets += 1
+
+
+def test_concurrent_calls_share_one_execution():
+    """only the leader runs the function, all callers get its result"""
+    flight = SingleFlight()
+    calls = []
+    barrier = threading.Barrier(8)
+
+    def work():
+        calls.append(1)
+        time.sleep(0.1)
+        return 42
+
+    def caller():
+        barrier.wait()
+        return flight.do("k", work)
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda _: caller(), range(8)))
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [42] * 8
+    assert sum(1 for _, shared in results if not shared) == 1
+    assert flight.in_flight() == 0
+
+
+def test_error_is_propagated_to_waiters():
+    """waiters see the leader's exception and the key is released"""
+    flight = SingleFlight()
+    started = threading.Event()
+
+    def fail():
+        started.set()
+        time.sleep(0.05)
+        raise ValueError("boom")
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        leader = pool.submit(flight.do, "k", fail)
+        started.wait()
+        follower = pool.submit(flight.do, "k", fail)
+        with pytest.raises(ValueError):
+            leader.result()
+        with pytest.raises(ValueError):
+            follower.result()
+    assert flight.do("k", lambda: 1) == (1, False)
+
+
+def test_get_score_collapses_hot_user():
+    """concurrent identical requests hit the cache once"""
+    store = SlowStore()
+    with ThreadPoolExecutor(max_workers=10) as pool:
+        scores = list(pool.map(lambda _: scoring.get_score(store, phone="79175002040"), range(10)))
+    assert scores == [1.5] * 10
+    assert store.cache_sets < 10
+    assert store.cache_gets == store.cache_sets
+
+
+def test_get_score_does_not_mix_different_emails():
+    """email is not in the cache key but changes the score"""
+    store = SlowStore()
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        with_email = pool.submit(scoring.get_score, store, phone="79175002040", email="a@b")
+        without_email = pool.submit(scoring.get_score, store, phone="79175002040")
+        assert (with_email.result(), without_email.result()) == (3.0, 1.5)
+
+
+def test_async_single_flight():
+    """concurrent tasks share one coroutine run"""
+    flight = AsyncSingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return 7
+
+    async def main():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [result for result, _ in results] == [7] * 5
+    assert flight.in_flight() == 0
+
+
+def test_get_score_async_collapses_hot_user():
+    """async variant computes once for concurrent identical requests"""
+    store = AsyncSlowStore()
+
+    async def main():
+        return await asyncio.gather(*(scoring.get_score_async(store, phone="79175002040") for _ in range(5)))
+
+    assert asyncio.run(main()) == [1.5] * 5
+    assert (store.cache_gets, store.cache_sets) == (1, 1)
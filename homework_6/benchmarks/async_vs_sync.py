@@ -0,0 +1,116 @@
+"""Sync (thread pool) vs async (one event loop) throughput on the same SQLite file.
+
+Usage: python -m benchmarks.async_vs_sync [-n 2000] [-c 16]
+
+"read" fetches random orders with their products, "place" places orders
+through place_order(). The sync side runs -c threads with scoped sessions,
+the async side -c concurrent tasks on aiosqlite.
+"""
+import argparse
+import asyncio
+import os
+import random
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from domain.models import Product
+from domain.services import AsyncWarehouseService, WarehouseService
+from infrastructure.database import (
+    create_async_warehouse_engine,
+    create_warehouse_engine,
+    make_async_uow_factory,
+    make_session_registry,
+    make_uow_factory,
+    run_in_async_uow,
+    run_in_uow,
+)
+from infrastructure.migrations import migrate
+
+PRODUCTS = 100
+ORDERS = 1000
+
+
+def seed(url):
+    engine = create_warehouse_engine(url)
+    migrate(engine)
+    with make_uow_factory(make_session_registry(engine))() as uow:
+        service = WarehouseService(uow.products, uow.orders)
+        products = service.create_products(
+            (f"Product {i}", 10**6, 1.0) for i in range(PRODUCTS)
+        )
+        service.create_orders(products[i % 97:i % 97 + 3] for i in range(ORDERS))
+    engine.dispose()
+
+
+def workload(kind, requests, seed_value=0):
+    rnd = random.Random(seed_value)
+    if kind == "read":
+        return [rnd.randint(1, ORDERS) for _ in range(requests)]
+    return [rnd.randint(1, PRODUCTS) for _ in range(requests)]
+
+
+def run_sync(url, kind, ids, concurrency):
+    engine = create_warehouse_engine(url, pool_size=concurrency)
+    registry = make_session_registry(engine)
+    uow_factory = make_uow_factory(registry, for_write=kind != "read")
+
+    def read(order_id):
+        with uow_factory() as uow:
+            uow.orders.get(order_id)
+        registry.remove()
+
+    def place(product_id):
+        run_in_uow(uow_factory, lambda uow: WarehouseService(uow.products, uow.orders)
+                   .place_order([Product(product_id, "", 0, 0.0)]))
+        registry.remove()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(read if kind == "read" else place, ids))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return len(ids) / elapsed
+
+
+async def run_async(url, kind, ids, concurrency):
+    engine = create_async_warehouse_engine(url, pool_size=concurrency)
+    uow_factory = make_async_uow_factory(engine, for_write=kind != "read")
+    slots = asyncio.Semaphore(concurrency)
+
+    async def read(order_id):
+        async with slots, uow_factory() as uow:
+            await uow.orders.get(order_id)
+
+    async def place(product_id):
+        async def work(uow):
+            service = AsyncWarehouseService(uow.products, uow.orders)
+            await service.place_order([Product(product_id, "", 0, 0.0)])
+        async with slots:
+            await run_in_async_uow(uow_factory, work)
+
+    started = time.perf_counter()
+    await asyncio.gather(*((read if kind == "read" else place)(i) for i in ids))
+    elapsed = time.perf_counter() - started
+    await engine.dispose()
+    return len(ids) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", "--requests", type=int, default=2000)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        seed(url)
+        for kind in ("read", "place"):
+            ids = workload(kind, args.requests)
+            sync_rate = run_sync(url, kind, ids, args.concurrency)
+            async_rate = asyncio.run(run_async(url, kind, ids, args.concurrency))
+            print(f"{kind:6} sync {sync_rate:7.0f}/s, async {async_rate:7.0f}/s "
+                  f"({async_rate / sync_rate:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Import N products and N/10 orders one by one and in batches.
+
+Usage: python -m benchmarks.bulk_import [-n 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.orm import Base
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+)
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def run(n, batched):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session = sessionmaker(bind=engine)()
+        product_repo = SqlAlchemyProductRepository(session)
+        service = WarehouseService(product_repo, SqlAlchemyOrderRepository(session))
+        items = [(f"Product {i}", 10, 9.99) for i in range(n)]
+
+        started = time.perf_counter()
+        with SqlAlchemyUnitOfWork(session):
+            if batched:
+                products = service.create_products(items)
+                service.create_orders([products[i:i + 3] for i in range(0, n, 10)])
+            else:
+                for item in items:
+                    service.create_product(*item)
+                session.flush()
+                products = product_repo.list()
+                for i in range(0, n, 10):
+                    service.create_order(products[i:i + 3])
+        elapsed = time.perf_counter() - started
+        engine.dispose()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=100_000)
+    args = parser.parse_args()
+    single = run(args.n, batched=False)
+    batch = run(args.n, batched=True)
+    print(f"one by one: {single:8.2f} s  ({args.n / single:10.0f} products/s)")
+    print(f"batched:    {batch:8.2f} s  ({args.n / batch:10.0f} products/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Orders per second from several threads sharing one SQLite file.
+
+Usage: python -m benchmarks.concurrent_orders [-t 8] [-n 2000] [--url sqlite:///bench.db]
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from domain.services import WarehouseService
+from infrastructure.database import (
+    create_warehouse_engine,
+    make_session_registry,
+    make_uow_factory,
+)
+from infrastructure.ids import HiLoIdAllocator
+from infrastructure.orm import Base
+
+
+def run(url, threads, orders):
+    engine = create_warehouse_engine(url, pool_size=threads)
+    Base.metadata.create_all(engine)
+    registry = make_session_registry(engine)
+    uow_factory = make_uow_factory(
+        registry, id_allocator=HiLoIdAllocator(engine), for_write=True
+    )
+    with uow_factory() as uow:
+        products = WarehouseService(uow.products, uow.orders, uow.ids).create_products(
+            (f"Product {i}", 10**6, 1.0) for i in range(100)
+        )
+
+    def worker(index):
+        for i in range(index, orders, threads):
+            with uow_factory() as uow:
+                service = WarehouseService(uow.products, uow.orders, uow.ids)
+                service.create_order(products[i % 100:i % 100 + 3])
+        registry.remove()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(worker, range(threads)))
+    elapsed = time.perf_counter() - started
+    engine.dispose()
+    return orders / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--threads", type=int, default=8)
+    parser.add_argument("-n", "--orders", type=int, default=2000)
+    parser.add_argument("--url", default=os.environ.get("DATABASE_URL"))
+    args = parser.parse_args()
+    if args.url:
+        rate = run(args.url, args.threads, args.orders)
+    else:
+        with tempfile.TemporaryDirectory() as tmp:
+            rate = run(f"sqlite:///{os.path.join(tmp, 'bench.db')}", args.threads, args.orders)
+    print(f"{rate:.0f} orders/sec with {args.threads} threads")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""Throughput of many small service calls with and without group commit.
+
+Usage: python -m benchmarks.group_commit [-n 2000] [--group 50]
+
+Every call creates one product and calls uow.commit(), as a request handler
+would. With group commit only every --group-th commit reaches the database.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.migrations import migrate
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def run(session_factory, calls, group_commit):
+    started = time.perf_counter()
+    with SqlAlchemyUnitOfWork(session_factory(), group_commit=group_commit) as uow:
+        service = WarehouseService(uow.products, uow.orders)
+        for i in range(calls):
+            service.create_product(f"Product {i}", 10, 1.5)
+            uow.commit()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=2000)
+    parser.add_argument("--group", type=int, default=50)
+    args = parser.parse_args()
+    for group_commit in (1, args.group):
+        with tempfile.TemporaryDirectory() as tmp:
+            engine = create_warehouse_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+            migrate(engine)
+            elapsed = run(sessionmaker(bind=engine), args.n, group_commit)
+            print(f"group_commit={group_commit:<4} {args.n / elapsed:10,.0f} calls/sec")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
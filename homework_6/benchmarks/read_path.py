@@ -0,0 +1,86 @@
+"""List throughput and memory of the product read path.
+
+Usage: python -m benchmarks.read_path [-n 1000000]
+
+"orm" is the previous read path: full ProductORM hydration, then a field by
+field copy into a dataclass with a __dict__. "core" is what the repository
+does now: select() rows unpacked straight into slotted Product instances.
+Memory is the size of the resulting list as seen by tracemalloc, scaled to
+1M products.
+"""
+import argparse
+import gc
+import os
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass
+
+from sqlalchemy.orm import sessionmaker
+
+from infrastructure.database import create_warehouse_engine
+from infrastructure.orm import Base, ProductORM
+from infrastructure.repositories import SqlAlchemyProductRepository, insert_many
+
+
+@dataclass
+class DictProduct:
+    id: int
+    name: str
+    quantity: int
+    price: float
+
+
+def orm_list(session):
+    return [
+        DictProduct(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
+        for p in session.query(ProductORM).all()
+    ]
+
+
+def core_list(session):
+    return SqlAlchemyProductRepository(session).list()
+
+
+def measure(session_factory, read):
+    with session_factory() as session:
+        started = time.perf_counter()
+        products = read(session)
+        elapsed = time.perf_counter() - started
+    del products
+    gc.collect()
+    with session_factory() as session:
+        tracemalloc.start()
+        try:
+            products = read(session)
+            session.expunge_all()
+            gc.collect()
+            size, _ = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return len(products), elapsed, size
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-n", type=int, default=1_000_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_warehouse_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        Base.metadata.create_all(engine)
+        session_factory = sessionmaker(bind=engine)
+        with session_factory() as session:
+            insert_many(session, ProductORM.__table__, [
+                {"id": None, "name": f"Product {i}", "quantity": i % 100, "price": 1.5}
+                for i in range(args.n)
+            ])
+            session.commit()
+        for name, read in (("orm", orm_list), ("core", core_list)):
+            count, elapsed, size = measure(session_factory, read)
+            print(f"{name:5} {count / elapsed:10,.0f} products/sec, "
+                  f"{size / count * 1_000_000 / 2**20:7.1f} MiB per 1M products")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""Latency of reporting queries: full recount vs the read model tables.
+
+Usage: python -m benchmarks.reporting [--products 100000] [--orders 20000]
+
+"recount" is how a report had to be built before: list() every product and
+order and sum in Python. "read model" asks the summary tables maintained on
+commit, one primary key lookup per report.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sqlalchemy.orm import sessionmaker
+
+from domain.services import WarehouseService
+from infrastructure.database import create_warehouse_engine
+from infrastructure.migrations import migrate
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def recount(uow, order_id):
+    products = uow.products.list()
+    order = next(o for o in uow.orders.list() if o.id == order_id)
+    return (
+        sum(p.quantity for p in products),
+        sum(p.quantity * p.price for p in products),
+        sum(p.price for p in order.products),
+    )
+
+
+def read_model(uow, order_id):
+    inventory = uow.reports.inventory()
+    return inventory.units, inventory.value, uow.reports.order_total(order_id).total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--orders", type=int, default=20_000)
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_warehouse_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+        migrate(engine)
+        session_factory = sessionmaker(bind=engine)
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            service = WarehouseService(uow.products, uow.orders)
+            products = service.create_products(
+                (f"Product {i}", 1000, 1.5) for i in range(args.products)
+            )
+            service.create_orders(
+                [products[i % args.products:i % args.products + 3] for i in range(args.orders)]
+            )
+        for name, report in (("recount", recount), ("read model", read_model)):
+            with SqlAlchemyUnitOfWork(session_factory()) as uow:
+                started = time.perf_counter()
+                result = report(uow, args.orders // 2)
+                elapsed = time.perf_counter() - started
+            print(f"{name:10} {elapsed * 1000:10.2f} ms  {result}")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""Concurrent orders competing for limited stock.
+
+Usage: python -m benchmarks.reserve_stock [-t 8] [-n 2000] [--stock 1000]
+
+"reserve" places orders through WarehouseService.place_order (conditional
+UPDATE, retried on conflicts). "naive" reads the product, checks and writes
+the new quantity back in a DEFERRED transaction, the way it would be done
+without reserve(). On SQLite its read-to-write lock upgrade fails with
+"database is locked" even with retries; under READ COMMITTED on Postgres the
+same code oversells.
+"""
+import argparse
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy.exc import OperationalError
+
+from domain.exceptions import OutOfStock
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.database import (
+    create_warehouse_engine,
+    make_session_registry,
+    make_uow_factory,
+    run_in_uow,
+)
+from infrastructure.orm import Base, ProductORM
+
+PRODUCTS = 10
+
+
+def reserve(uow, product_id):
+    service = WarehouseService(uow.products, uow.orders)
+    service.place_order([Product(id=product_id, name="", quantity=0, price=0.0)])
+
+
+def naive(uow, product_id):
+    product = uow.session.get(ProductORM, product_id)
+    if product.quantity < 1:
+        raise OutOfStock(product_id, 1)
+    product.quantity -= 1
+    WarehouseService(uow.products, uow.orders).create_order(
+        [Product(id=product_id, name="", quantity=0, price=0.0)]
+    )
+
+
+def place_orders(uow_factory, work, indices):
+    outcomes = {"placed": 0, "out_of_stock": 0, "errors": 0}
+    for i in indices:
+        try:
+            run_in_uow(uow_factory, lambda uow, product_id=i % PRODUCTS + 1: work(uow, product_id))
+            outcomes["placed"] += 1
+        except OutOfStock:
+            outcomes["out_of_stock"] += 1
+        except OperationalError:
+            outcomes["errors"] += 1
+    return outcomes
+
+
+def run(url, mode, threads, orders, stock):
+    engine = create_warehouse_engine(url, pool_size=threads)
+    Base.metadata.create_all(engine)
+    registry = make_session_registry(engine)
+    uow_factory = make_uow_factory(registry, for_write=mode == "reserve")
+    with uow_factory() as uow:
+        uow.products.add_many([
+            Product(id=None, name=f"Product {i}", quantity=stock, price=1.0)
+            for i in range(PRODUCTS)
+        ])
+
+    def worker(index):
+        outcomes = place_orders(
+            uow_factory, reserve if mode == "reserve" else naive, range(index, orders, threads)
+        )
+        registry.remove()
+        return outcomes
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        counts = {}
+        for outcomes in pool.map(worker, range(threads)):
+            counts = {name: counts.get(name, 0) + value for name, value in outcomes.items()}
+    rate = orders / (time.perf_counter() - started)
+    with uow_factory() as uow:
+        # every order takes one unit, so orders beyond the units sold were oversold
+        counts["oversold"] = len(uow.orders.list()) - (
+            PRODUCTS * stock - sum(p.quantity for p in uow.products.list())
+        )
+    registry.remove()
+    engine.dispose()
+    return rate, counts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-t", "--threads", type=int, default=8)
+    parser.add_argument("-n", "--orders", type=int, default=2000)
+    parser.add_argument("--stock", type=int, default=100, help="Initial quantity per product")
+    args = parser.parse_args()
+    for mode in ("reserve", "naive"):
+        with tempfile.TemporaryDirectory() as tmp:
+            url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            rate, counts = run(url, mode, args.threads, args.orders, args.stock)
+        print(f"{mode:8} {rate:6.0f} orders/sec, "
+              + ", ".join(f"{name} {value}" for name, value in counts.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+class OutOfStock(Exception):
+    """Raised when a reservation asks for more units than are left."""
+
+    def __init__(self, product_id: int, requested: int):
+        super().__init__(f"Product {product_id}: not enough stock for {requested} units")
+        self.product_id = product_id
+        self.requested = requested
@@ -0,0 +1,24 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+
+class IdAllocator(ABC):
+    """Hands out identifiers before entities reach the database."""
+
+    @abstractmethod
+    def next_id(self, kind: str) -> int:
+        pass
+
+    def next_ids(self, kind: str, count: int) -> List[int]:
+        return [self.next_id(kind) for _ in range(count)]
+
+
+class AsyncIdAllocator(ABC):
+    """IdAllocator that may have to wait for the database."""
+
+    @abstractmethod
+    async def next_id(self, kind: str) -> int:
+        pass
+
+    async def next_ids(self, kind: str, count: int) -> List[int]:
+        return [await self.next_id(kind) for _ in range(count)]
@@ -1,17 +1,36 @@
 from dataclasses import dataclass, field
 from typing import List
 
-@dataclass
+@dataclass(slots=True)
 class Product:
     id: int
     name: str
     quantity: int
     price: float
 
-@dataclass
+@dataclass(slots=True)
 class Order:
     id: int
     products: List[Product] = field(default_factory=list)
 
     def add_product(self, product: Product):
         self.products.append(product)
+
+@dataclass(slots=True)
+class InventorySummary:
+    products: int = 0
+    units: int = 0
+    value: float = 0.0
+
+@dataclass(slots=True)
+class ProductStats:
+    product_id: int
+    orders: int = 0
+    units: int = 0
+    revenue: float = 0.0
+
+@dataclass(slots=True)
+class OrderTotal:
+    order_id: int
+    units: int = 0
+    total: float = 0.0
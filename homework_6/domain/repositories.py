@@ -1,12 +1,20 @@
 from abc import ABC, abstractmethod
-from typing import List
-from .models import Product, Order
+from typing import AsyncIterator, Iterator, List
+from .models import InventorySummary, Order, OrderTotal, Product, ProductStats
 
 class ProductRepository(ABC):
     @abstractmethod
     def add(self, product: Product):
         pass
 
+    @abstractmethod
+    def add_many(self, products: List[Product]):
+        pass
+
+    @abstractmethod
+    def update_many(self, products: List[Product]):
+        """Write the current name, quantity and price of already stored products."""
+
     @abstractmethod
     def get(self, product_id: int) -> Product:
         pass
@@ -15,11 +23,27 @@ class ProductRepository(ABC):
     def list(self) -> List[Product]:
         pass
 
+    @abstractmethod
+    def reserve(self, product_id: int, quantity: int) -> int:
+        """Take quantity units off the stock and return what is left, or raise OutOfStock."""
+
+    @abstractmethod
+    def list_page(self, after_id: int = 0, limit: int = 100) -> List[Product]:
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Product]:
+        pass
+
 class OrderRepository(ABC):
     @abstractmethod
     def add(self, order: Order):
         pass
 
+    @abstractmethod
+    def add_many(self, orders: List[Order]):
+        pass
+
     @abstractmethod
     def get(self, order_id: int) -> Order:
         pass
@@ -27,3 +51,95 @@ class OrderRepository(ABC):
     @abstractmethod
     def list(self) -> List[Order]:
         pass
+
+    @abstractmethod
+    def list_page(self, after_id: int = 0, limit: int = 100) -> List[Order]:
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Order]:
+        pass
+
+
+class AsyncProductRepository(ABC):
+    @abstractmethod
+    async def add(self, product: Product):
+        pass
+
+    @abstractmethod
+    async def add_many(self, products: List[Product]):
+        pass
+
+    @abstractmethod
+    async def get(self, product_id: int) -> Product:
+        pass
+
+    @abstractmethod
+    async def list(self) -> List[Product]:
+        pass
+
+    @abstractmethod
+    async def reserve(self, product_id: int, quantity: int) -> int:
+        """Take quantity units off the stock and return what is left, or raise OutOfStock."""
+
+    @abstractmethod
+    async def list_page(self, after_id: int = 0, limit: int = 100) -> List[Product]:
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> AsyncIterator[Product]:
+        pass
+
+class AsyncOrderRepository(ABC):
+    @abstractmethod
+    async def add(self, order: Order):
+        pass
+
+    @abstractmethod
+    async def add_many(self, orders: List[Order]):
+        pass
+
+    @abstractmethod
+    async def get(self, order_id: int) -> Order:
+        pass
+
+    @abstractmethod
+    async def list(self) -> List[Order]:
+        pass
+
+    @abstractmethod
+    async def list_page(self, after_id: int = 0, limit: int = 100) -> List[Order]:
+        pass
+
+    @abstractmethod
+    def iter_all(self, batch_size: int = 1000) -> AsyncIterator[Order]:
+        pass
+
+
+class ReportingRepository(ABC):
+    """Reads of the aggregates maintained by the unit of work, each a single row lookup."""
+
+    @abstractmethod
+    def inventory(self) -> InventorySummary:
+        pass
+
+    @abstractmethod
+    def product_stats(self, product_id: int) -> ProductStats:
+        pass
+
+    @abstractmethod
+    def order_total(self, order_id: int) -> OrderTotal:
+        pass
+
+class AsyncReportingRepository(ABC):
+    @abstractmethod
+    async def inventory(self) -> InventorySummary:
+        pass
+
+    @abstractmethod
+    async def product_stats(self, product_id: int) -> ProductStats:
+        pass
+
+    @abstractmethod
+    async def order_total(self, order_id: int) -> OrderTotal:
+        pass
@@ -1,26 +1,152 @@
-from typing import List
+from collections import Counter
+from typing import Iterable, List, Optional, Tuple, Union
+from .ids import AsyncIdAllocator, IdAllocator
 from .models import Product, Order
-from .repositories import ProductRepository, OrderRepository
+from .repositories import (
+    AsyncOrderRepository,
+    AsyncProductRepository,
+    OrderRepository,
+    ProductRepository,
+)
 
 
-def gen_id():
-    _id = 1
-    while True:
-        yield _id
-        _id += 1
+def allocate_ids(id_allocator: Optional[IdAllocator], kind: str, count: int) -> List[Optional[int]]:
+    if id_allocator is None:
+        return [None] * count
+    return id_allocator.next_ids(kind, count)
 
 
 class WarehouseService:
-    def __init__(self, product_repo: ProductRepository, order_repo: OrderRepository):
+    """Without an id allocator the database assigns ids when rows are flushed.
+
+    Use one of the two for all rows of a table: ids assigned by the database
+    may collide with ids an allocator has reserved but not handed out yet.
+    """
+
+    def __init__(
+        self,
+        product_repo: ProductRepository,
+        order_repo: OrderRepository,
+        id_allocator: Optional[IdAllocator] = None,
+    ):
         self.product_repo=product_repo
         self.order_repo=order_repo
+        self.id_allocator = id_allocator
+
+    def _next_ids(self, kind: str, count: int) -> List[Optional[int]]:
+        return allocate_ids(self.id_allocator, kind, count)
 
     def create_product(self, name: str, quantity: int, price: float) -> Product:
-        product=Product(id=gen_id(), name=name, quantity=quantity,price=price)
+        product_id, = self._next_ids("products", 1)
+        product=Product(id=product_id, name=name, quantity=quantity,price=price)
         self.product_repo.add(product)
         return product
 
     def create_order(self, products: List[Product]) -> Order:
-        order=Order(id=gen_id(), products=products)
+        order_id, = self._next_ids("orders", 1)
+        order=Order(id=order_id, products=products)
         self.order_repo.add(order)
         return order
+
+    def place_order(self, products: List[Product]) -> Order:
+        """Reserve one unit of stock per listed product, then create the order.
+
+        Products are reserved in id order so concurrent orders lock rows the same way.
+        Nothing is reserved for good unless the unit of work commits.
+        """
+        wanted = Counter(p.id for p in products)
+        remaining = {
+            product_id: self.product_repo.reserve(product_id, count)
+            for product_id, count in sorted(wanted.items())
+        }
+        for product in products:
+            product.quantity = remaining[product.id]
+        return self.create_order(products)
+
+    def create_products(self, items: Iterable[Tuple[str, int, float]]) -> List[Product]:
+        items = list(items)
+        products = [
+            Product(id=product_id, name=name, quantity=quantity, price=price)
+            for product_id, (name, quantity, price) in zip(
+                self._next_ids("products", len(items)), items
+            )
+        ]
+        self.product_repo.add_many(products)
+        return products
+
+    def create_orders(self, product_lists: Iterable[List[Product]]) -> List[Order]:
+        product_lists = list(product_lists)
+        orders = [
+            Order(id=order_id, products=products)
+            for order_id, products in zip(
+                self._next_ids("orders", len(product_lists)), product_lists
+            )
+        ]
+        self.order_repo.add_many(orders)
+        return orders
+
+
+class AsyncWarehouseService:
+    """WarehouseService for the repositories of an async unit of work.
+
+    Allocators that never wait, such as SnowflakeIdAllocator, may be plain
+    IdAllocators; one that claims ids from the database must be an
+    AsyncIdAllocator so that it does not block the event loop.
+    """
+
+    def __init__(
+        self,
+        product_repo: AsyncProductRepository,
+        order_repo: AsyncOrderRepository,
+        id_allocator: Optional[Union[IdAllocator, AsyncIdAllocator]] = None,
+    ):
+        self.product_repo = product_repo
+        self.order_repo = order_repo
+        self.id_allocator = id_allocator
+
+    async def _next_ids(self, kind: str, count: int) -> List[Optional[int]]:
+        if isinstance(self.id_allocator, AsyncIdAllocator):
+            return await self.id_allocator.next_ids(kind, count)
+        return allocate_ids(self.id_allocator, kind, count)
+
+    async def create_product(self, name: str, quantity: int, price: float) -> Product:
+        product_id, = await self._next_ids("products", 1)
+        product = Product(id=product_id, name=name, quantity=quantity, price=price)
+        await self.product_repo.add(product)
+        return product
+
+    async def create_order(self, products: List[Product]) -> Order:
+        order_id, = await self._next_ids("orders", 1)
+        order = Order(id=order_id, products=products)
+        await self.order_repo.add(order)
+        return order
+
+    async def place_order(self, products: List[Product]) -> Order:
+        """See WarehouseService.place_order."""
+        wanted = Counter(p.id for p in products)
+        remaining = {}
+        for product_id, count in sorted(wanted.items()):
+            remaining[product_id] = await self.product_repo.reserve(product_id, count)
+        for product in products:
+            product.quantity = remaining[product.id]
+        return await self.create_order(products)
+
+    async def create_products(self, items: Iterable[Tuple[str, int, float]]) -> List[Product]:
+        items = list(items)
+        ids = await self._next_ids("products", len(items))
+        products = [
+            Product(id=product_id, name=name, quantity=quantity, price=price)
+            for product_id, (name, quantity, price) in zip(ids, items)
+        ]
+        await self.product_repo.add_many(products)
+        return products
+
+    async def create_orders(self, product_lists: Iterable[List[Product]]) -> List[Order]:
+        product_lists = list(product_lists)
+        ids = await self._next_ids("orders", len(product_lists))
+        orders = [
+            Order(id=order_id, products=products)
+            for order_id, products in zip(ids, product_lists)
+        ]
+        await self.order_repo.add_many(orders)
+        return orders
@@ -16,3 +16,29 @@ class UnitOfWork(ABC):
     @abstractmethod
     def rollback(self):
         pass
+
+    @abstractmethod
+    def register_new(self, obj):
+        """Queue a new Product or Order, inserted on the next flush or commit."""
+
+    @abstractmethod
+    def register_dirty(self, product):
+        """Queue an UPDATE of a stored product with its current fields."""
+
+
+class AsyncUnitOfWork(ABC):
+    @abstractmethod
+    async def __aenter__(self):
+        pass
+
+    @abstractmethod
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        pass
+
+    @abstractmethod
+    async def commit(self):
+        pass
+
+    @abstractmethod
+    async def rollback(self):
+        pass
@@ -0,0 +1,180 @@
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Sequence
+from sqlalchemy import insert, select
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.ext.asyncio import AsyncSession
+from domain.models import InventorySummary, Order, OrderTotal, Product, ProductStats
+from domain.repositories import (
+    AsyncOrderRepository,
+    AsyncProductRepository,
+    AsyncReportingRepository,
+)
+from . import mapping
+from .identity_map import IdentityMap, ProductCache
+from .orm import OrderORM, ProductORM, order_lines
+from .read_model import (
+    ReadModelChanges,
+    select_inventory,
+    select_order_total,
+    select_product_stats,
+    to_inventory,
+    to_order_total,
+    to_product_stats,
+)
+from .repositories import (
+    ProductMaps,
+    check_prices,
+    chunked,
+    order_line_rows,
+    preallocated_ids,
+    product_rows,
+    record_orders,
+    reservation_error,
+    reserve_statement,
+    assigned_ids,
+    returning_ids,
+)
+
+# Orders are always read with the "core" strategy: ORM lazy loading cannot run
+# under asyncio, and plain rows need no ORM objects at all.
+
+
+async def insert_many_async(session: AsyncSession, table, rows: List[dict]) -> Sequence[int]:
+    """insert_many() for an AsyncSession."""
+    preallocated = preallocated_ids(rows)
+    if preallocated:
+        await session.execute(insert(table), rows)
+        return preallocated
+    dialect = session.get_bind().dialect.name
+    statement, rows = returning_ids(table, rows, dialect)
+    return assigned_ids((await session.scalars(statement, rows)).all(), dialect)
+
+
+class AsyncSqlAlchemyProductRepository(ProductMaps, AsyncProductRepository):
+    def __init__(
+        self,
+        session: AsyncSession,
+        identity_map: Optional[IdentityMap] = None,
+        cache: Optional[ProductCache] = None,
+        read_model: Optional[ReadModelChanges] = None,
+    ):
+        super().__init__(identity_map, cache, read_model)
+        self.session = session
+
+    async def add(self, product: Product):
+        await self.add_many([product])
+
+    async def add_many(self, products: List[Product]):
+        if not products:
+            return
+        ids = await insert_many_async(self.session, ProductORM.__table__, product_rows(products))
+        self.written(products, ids)
+        self.added(products)
+
+    async def get(self, product_id: int) -> Product:
+        product = self.known(product_id)
+        if product is None:
+            result = await self.session.execute(
+                mapping.select_products().where(ProductORM.id == product_id)
+            )
+            product = self.loaded(mapping.to_product(result.one()))
+        return product
+
+    async def list(self) -> List[Product]:
+        return mapping.to_products(await self.session.execute(mapping.select_products()))
+
+    async def reserve(self, product_id: int, quantity: int) -> int:
+        row = (await self.session.execute(reserve_statement(product_id, quantity))).first()
+        if row is None:
+            exists = await self.session.get(ProductORM, product_id) is not None
+            raise reservation_error(product_id, quantity, exists)
+        return self.reserved(product_id, quantity, row)
+
+    async def list_page(self, after_id: int = 0, limit: int = 100) -> List[Product]:
+        return mapping.to_products(
+            await self.session.execute(mapping.select_product_page(after_id, limit))
+        )
+
+    # an async generator is called like a plain function returning an AsyncIterator
+    async def iter_all(  # pylint: disable=invalid-overridden-method
+        self, batch_size: int = 1000
+    ) -> AsyncIterator[Product]:
+        result = await self.session.stream(mapping.select_all_products(batch_size))
+        async for partition in result.partitions():
+            for product in mapping.to_products(partition):
+                yield product
+
+
+class AsyncSqlAlchemyOrderRepository(AsyncOrderRepository):
+    def __init__(self, session: AsyncSession, read_model: Optional[ReadModelChanges] = None):
+        self.session = session
+        self.read_model = read_model
+
+    async def _product_prices(self, product_ids: Iterable[int]) -> Dict[int, float]:
+        wanted = list(set(product_ids))
+        prices = {}
+        for chunk in chunked(wanted):
+            rows = await self.session.execute(mapping.select_product_prices(chunk))
+            prices.update((product_id, price) for product_id, price in rows)
+        return check_prices(wanted, prices)
+
+    async def add(self, order: Order):
+        await self.add_many([order])
+
+    async def add_many(self, orders: List[Order]):
+        if not orders:
+            return
+        prices = await self._product_prices(p.id for o in orders for p in o.products)
+        ids = await insert_many_async(
+            self.session, OrderORM.__table__, [{"id": o.id} for o in orders]
+        )
+        lines = order_line_rows(orders, ids, prices)
+        if lines:
+            await self.session.execute(insert(order_lines), lines)
+        record_orders(self.read_model, orders, lines)
+
+    async def _load(self, statement) -> List[Order]:
+        order_ids = list(await self.session.scalars(statement))
+        rows = []
+        for chunk in chunked(order_ids):
+            rows.extend(await self.session.execute(mapping.select_order_products(chunk)))
+        return mapping.to_orders(order_ids, rows)
+
+    async def get(self, order_id: int) -> Order:
+        orders = await self._load(select(OrderORM.id).where(OrderORM.id == order_id))
+        if not orders:
+            raise NoResultFound(f"Order not found: {order_id}")
+        return orders[0]
+
+    async def list(self) -> List[Order]:
+        return await self._load(select(OrderORM.id))
+
+    async def list_page(self, after_id: int = 0, limit: int = 100) -> List[Order]:
+        return await self._load(mapping.select_order_page(after_id, limit))
+
+    async def iter_all(  # pylint: disable=invalid-overridden-method
+        self, batch_size: int = 1000
+    ) -> AsyncIterator[Order]:
+        after_id = 0
+        while True:
+            page = await self.list_page(after_id, batch_size)
+            for order in page:
+                yield order
+            if len(page) < batch_size:
+                return
+            after_id = page[-1].id
+
+
+class AsyncSqlAlchemyReportingRepository(AsyncReportingRepository):
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def inventory(self) -> InventorySummary:
+        return to_inventory((await self.session.execute(select_inventory())).first())
+
+    async def product_stats(self, product_id: int) -> ProductStats:
+        row = (await self.session.execute(select_product_stats(product_id))).first()
+        return to_product_stats(product_id, row)
+
+    async def order_total(self, order_id: int) -> OrderTotal:
+        row = (await self.session.execute(select_order_total(order_id))).first()
+        return to_order_total(order_id, row)
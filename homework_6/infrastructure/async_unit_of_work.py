@@ -0,0 +1,87 @@
+from typing import Optional
+from sqlalchemy.ext.asyncio import AsyncSession
+from domain.unit_of_work import AsyncUnitOfWork
+from .async_repositories import (
+    AsyncSqlAlchemyOrderRepository,
+    AsyncSqlAlchemyProductRepository,
+    AsyncSqlAlchemyReportingRepository,
+)
+from .identity_map import IdentityMap, ProductCache
+from .ids import AsyncBoundIdAllocator, HiLoIdAllocator
+from .read_model import ReadModelChanges
+from .unit_of_work import WRITE_TRANSACTION, WriteTracker
+
+
+class AsyncSqlAlchemyUnitOfWork(AsyncUnitOfWork):  # pylint: disable=too-many-instance-attributes
+
+    def __init__(
+        self,
+        session: AsyncSession,
+        product_cache: Optional[ProductCache] = None,
+        id_allocator: Optional[HiLoIdAllocator] = None,
+        for_write: bool = False,
+    ):
+        self.session = session
+        self.product_cache = product_cache
+        self.for_write = for_write
+        self.ids = (
+            AsyncBoundIdAllocator(id_allocator, session) if id_allocator is not None else None
+        )
+        self.identity_map = IdentityMap()
+        self.read_model = ReadModelChanges()
+        self.writes = WriteTracker.of(session.sync_session)
+        self.products = AsyncSqlAlchemyProductRepository(
+            session, self.identity_map, product_cache, self.read_model
+        )
+        self.orders = AsyncSqlAlchemyOrderRepository(session, self.read_model)
+        self.reports = AsyncSqlAlchemyReportingRepository(session)
+
+    async def __aenter__(self):
+        await self._begin()
+        return self
+
+    async def _begin(self):
+        if self.for_write and not self.session.in_transaction():
+            await self.session.connection(execution_options=WRITE_TRANSACTION)
+
+    async def __aexit__(self, exception_type, exception_value, traceback):
+        try:
+            if exception_type is None:
+                await self._commit()
+            else:
+                await self.rollback()
+        finally:
+            await self.session.close()
+            self.writes.written = False
+            if self.ids is not None:
+                self.ids.rolled_back()
+            self.identity_map.clear()
+
+    async def commit(self):
+        await self._commit()
+        await self._begin()
+
+    async def _commit(self):
+        if self.read_model:
+            await self.session.flush()
+            dialect = self.session.get_bind().dialect.name
+            for statement, parameters in self.read_model.statements(dialect):
+                await self.session.execute(statement, parameters)
+            self.read_model.clear()
+        if not self.writes.written:
+            return
+        await self.session.commit()
+        if self.ids is not None:
+            self.ids.committed()
+        self.writes.written = False
+        if self.product_cache is not None:
+            self.product_cache.invalidate(self.identity_map.dirty)
+        self.identity_map.dirty.clear()
+
+    async def rollback(self):
+        await self.session.rollback()
+        self.writes.written = False
+        if self.ids is not None:
+            self.ids.rolled_back()
+        self.identity_map.clear()
+        self.read_model.clear()
@@ -1 +1,174 @@
-DATABASE_URL= 'sqlite:///warehouse.db'
+import asyncio
+import os
+import random
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import scoped_session, sessionmaker
+
+from .async_unit_of_work import AsyncSqlAlchemyUnitOfWork
+from .unit_of_work import SQLITE_BEGIN, SqlAlchemyUnitOfWork
+
+DATABASE_URL= os.environ.get("DATABASE_URL", 'sqlite:///warehouse.db')
+
+SQLITE_PRAGMAS = {
+    "journal_mode": "WAL",       # readers do not block the writer and vice versa
+    "synchronous": "NORMAL",     # fsync on checkpoint only, safe with WAL
+    "busy_timeout": "5000",      # wait for the write lock instead of failing at once
+    "foreign_keys": "ON",
+}
+
+
+def _configure_sqlite(engine: Engine, pragmas: dict, begin: str):
+    @event.listens_for(engine, "connect")
+    def on_connect(dbapi_connection, _connection_record):
+        # let SQLAlchemy emit BEGIN itself instead of the sqlite3 module
+        dbapi_connection.isolation_level = None
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    @event.listens_for(engine, "begin")
+    def on_begin(connection):
+        # IMMEDIATE takes the write lock up front: a transaction that reads and then
+        # writes cannot fail with SQLITE_BUSY halfway through because another
+        # writer committed in between. Only units of work created with
+        # for_write=True ask for it; readers stay DEFERRED and never wait for writers
+        mode = connection.get_execution_options().get(SQLITE_BEGIN, begin)
+        connection.exec_driver_sql(f"BEGIN {mode}")
+
+
+def create_warehouse_engine(
+    url: str = DATABASE_URL,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    sqlite_pragmas: Optional[dict] = None,
+    sqlite_begin: str = "DEFERRED",
+    **kwargs,
+) -> Engine:
+    """Engine configured for use from many threads.
+
+    SQLite files get WAL and the pragmas above on every connection; any other
+    database (e.g. a local Postgres via DATABASE_URL) gets a sized pool with
+    pre-ping.
+    """
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_engine(
+            url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True, **kwargs
+        )
+    in_memory = parsed.database in (None, "", ":memory:")
+    pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    if in_memory:
+        pragmas.pop("journal_mode", None)
+    else:
+        kwargs.setdefault("pool_size", pool_size)
+        kwargs.setdefault("max_overflow", max_overflow)
+    engine = create_engine(url, connect_args={"check_same_thread": False}, **kwargs)
+    _configure_sqlite(engine, pragmas, sqlite_begin)
+    return engine
+
+
+def create_async_warehouse_engine(
+    url: str = DATABASE_URL,
+    pool_size: int = 10,
+    max_overflow: int = 20,
+    sqlite_pragmas: Optional[dict] = None,
+    sqlite_begin: str = "DEFERRED",
+    **kwargs,
+) -> AsyncEngine:
+    """create_warehouse_engine() for asyncio; sqlite:// URLs are served by aiosqlite."""
+    parsed = make_url(url)
+    if parsed.get_backend_name() != "sqlite":
+        return create_async_engine(
+            url, pool_size=pool_size, max_overflow=max_overflow, pool_pre_ping=True, **kwargs
+        )
+    parsed = parsed.set(drivername="sqlite+aiosqlite")
+    pragmas = dict(SQLITE_PRAGMAS if sqlite_pragmas is None else sqlite_pragmas)
+    if parsed.database in (None, "", ":memory:"):
+        pragmas.pop("journal_mode", None)
+    else:
+        kwargs.setdefault("pool_size", pool_size)
+        kwargs.setdefault("max_overflow", max_overflow)
+    engine = create_async_engine(parsed, **kwargs)
+    _configure_sqlite(engine.sync_engine, pragmas, sqlite_begin)
+    return engine
+
+
+def make_session_registry(engine: Engine) -> scoped_session:
+    """Thread-local sessions: every thread gets its own Session from the registry."""
+    return scoped_session(sessionmaker(bind=engine, expire_on_commit=False))
+
+
+def make_uow_factory(session_factory: Callable, **uow_kwargs) -> Callable:
+    """Returns a callable creating a unit of work on a session of the calling thread.
+
+    Pass for_write=True for units of work that write, so that on SQLite their
+    transactions start with BEGIN IMMEDIATE.
+    """
+    def uow_factory():
+        return SqlAlchemyUnitOfWork(session_factory(), **uow_kwargs)
+
+    return uow_factory
+
+
+def run_in_uow(
+    uow_factory: Callable,
+    work: Callable,
+    attempts: int = 5,
+    backoff: float = 0.01,
+    sleep: Callable = time.sleep,
+):
+    """Call work(uow) in a fresh unit of work, retrying the whole transaction on conflicts.
+
+    OperationalError covers "database is locked" on SQLite and serialization
+    failures / deadlocks on Postgres; the rolled back attempt is simply replayed
+    after a jittered exponential backoff. Domain errors such as OutOfStock are
+    not retried.
+    """
+    for attempt in range(attempts):
+        try:
+            with uow_factory() as uow:
+                return work(uow)
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+    raise ValueError("attempts must be positive")
+
+
+def make_async_uow_factory(engine: AsyncEngine, **uow_kwargs) -> Callable:
+    """Returns a callable creating an async unit of work on a new AsyncSession.
+
+    Sessions are not shared between tasks, so there is no registry to scope them.
+    """
+    session_factory = async_sessionmaker(engine, expire_on_commit=False)
+
+    def uow_factory():
+        return AsyncSqlAlchemyUnitOfWork(session_factory(), **uow_kwargs)
+
+    return uow_factory
+
+
+async def run_in_async_uow(
+    uow_factory: Callable,
+    work: Callable,
+    attempts: int = 5,
+    backoff: float = 0.01,
+    sleep: Callable = asyncio.sleep,
+):
+    """run_in_uow() for async units of work; work(uow) must return an awaitable."""
+    for attempt in range(attempts):
+        try:
+            async with uow_factory() as uow:
+                return await work(uow)
+        except OperationalError:
+            if attempt == attempts - 1:
+                raise
+            await sleep(backoff * 2 ** attempt * random.uniform(0.5, 1.5))
+    raise ValueError("attempts must be positive")
@@ -0,0 +1,72 @@
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, Iterable, Optional
+
+from domain.models import Product
+
+
+class IdentityMap:
+    """Products loaded or written within one unit of work, by id."""
+
+    def __init__(self):
+        self._products: Dict[int, Product] = {}
+        self.dirty = set()
+
+    def get(self, product_id: int) -> Optional[Product]:
+        return self._products.get(product_id)
+
+    def add(self, product: Product):
+        self._products[product.id] = product
+
+    def mark_dirty(self, product_id: int):
+        self._products.pop(product_id, None)
+        self.dirty.add(product_id)
+
+    def clear(self):
+        self._products.clear()
+        self.dirty.clear()
+
+
+class ProductCache:
+    """Process-wide TTL cache of products shared between units of work.
+
+    Entries are copied in and out so callers never share mutable instances.
+    """
+
+    def __init__(self, ttl: float = 30.0, max_size: int = 10_000, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._entries: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+
+    def get(self, product_id: int) -> Optional[Product]:
+        with self._lock:
+            entry = self._entries.get(product_id)
+            if entry is None:
+                return None
+            expires_at, product = entry
+            if expires_at < self.clock():
+                del self._entries[product_id]
+                return None
+        return replace(product)
+
+    def put(self, product: Product):
+        with self._lock:
+            if len(self._entries) >= self.max_size and product.id not in self._entries:
+                # dicts keep insertion order, drop the oldest entry
+                del self._entries[next(iter(self._entries))]
+            self._entries[product.id] = (self.clock() + self.ttl, replace(product))
+
+    def invalidate(self, product_ids: Iterable[int]):
+        with self._lock:
+            for product_id in product_ids:
+                self._entries.pop(product_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,212 @@
+import threading
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import Table, func, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from domain.ids import AsyncIdAllocator, IdAllocator
+from .orm import IdBlockORM, OrderORM, ProductORM
+from .read_model import UPSERTS
+
+ID_TABLES = {
+    "products": ProductORM.__table__,
+    "orders": OrderORM.__table__,
+}
+
+
+def take_from(block: Optional[List[int]], count: int) -> List[int]:
+    """Up to count ids from the front of a [next, end) block."""
+    if block is None or count <= 0:
+        return []
+    take = min(count, block[1] - block[0])
+    block[0] += take
+    return list(range(block[0] - take, block[0]))
+
+
+class HiLoIdAllocator(IdAllocator):
+    """Reserves blocks of ids in the id_blocks table and hands them out locally.
+
+    A block is claimed with one UPDATE ... RETURNING, so any number of threads
+    and processes sharing the database never get the same id. next_ids() claims
+    in a transaction of its own. On SQLite that transaction needs the write
+    lock, so a thread whose unit of work has already written must not call it:
+    it would wait for its own lock until busy_timeout runs out. Units of work
+    created with id_allocator= expose a bound allocator as uow.ids that claims
+    in the unit of work's transaction instead.
+
+    Ids of a block that is not used up are lost when the process exits. A table
+    must get all its ids from allocators: rows stored with database-assigned ids
+    (a service without an allocator) take the next value of the database's own
+    counter, which may fall into a block that was claimed earlier and is still
+    being handed out.
+    """
+
+    def __init__(
+        self,
+        engine: Engine,
+        block_size: int = 1000,
+        tables: Optional[Dict[str, Table]] = None,
+    ):
+        self.engine = engine
+        self.block_size = block_size
+        self.tables = tables if tables is not None else ID_TABLES
+        self._blocks: Dict[str, List[int]] = {}  # kind -> [next, end)
+        self._lock = threading.Lock()
+
+    def next_id(self, kind: str) -> int:
+        return self.next_ids(kind, 1)[0]
+
+    def next_ids(self, kind: str, count: int) -> List[int]:
+        with self._lock:
+            ids = take_from(self._blocks.get(kind), count)
+            while len(ids) < count:
+                size = max(self.block_size, count - len(ids))
+                with self.engine.begin() as conn:
+                    start = self.claim(conn, kind, size)
+                block = self._blocks[kind] = [start, start + size]
+                ids += take_from(block, count - len(ids))
+        return ids
+
+    def bind(self, session: Session) -> "BoundIdAllocator":
+        return BoundIdAllocator(self, session)
+
+    def take(self, kind: str, count: int) -> List[int]:
+        """Ids left in the current block, without claiming a new one."""
+        with self._lock:
+            return take_from(self._blocks.get(kind), count)
+
+    def release(self, kind: str, block: List[int]):
+        """Share the rest of a committed block unless the current one still has ids."""
+        with self._lock:
+            current = self._blocks.get(kind)
+            if current is None or current[0] >= current[1]:
+                self._blocks[kind] = block
+
+    def claim(self, conn: Connection, kind: str, size: int) -> int:
+        """Claim size ids on conn and return the first; commits with conn's transaction."""
+        blocks = IdBlockORM.__table__
+        claim = (
+            update(blocks)
+            .where(blocks.c.name == kind)
+            .values(next_value=blocks.c.next_value + size)
+            .returning(blocks.c.next_value)
+        )
+        end = conn.scalar(claim)
+        if end is None:
+            # first block for this kind starts after the rows already stored;
+            # DO NOTHING lets a concurrent first claim win
+            table = self.tables[kind]
+            start = (conn.scalar(select(func.max(table.c.id))) or 0) + 1  # pylint: disable=not-callable
+            conn.execute(
+                UPSERTS[conn.dialect.name](blocks)
+                .values(name=kind, next_value=start)
+                .on_conflict_do_nothing(index_elements=[blocks.c.name])
+            )
+            end = conn.scalar(claim)
+        return end - size
+
+
+class BoundIdAllocator(IdAllocator):
+    """Ids of a HiLoIdAllocator for one session, claiming new blocks in its transaction.
+
+    A block claimed here serves only this session until the transaction commits
+    and then joins the shared blocks. On rollback it is dropped together with
+    its claim, so no other allocator can hand it out twice.
+    """
+
+    def __init__(self, allocator: HiLoIdAllocator, session: Session):
+        self.allocator = allocator
+        self.session = session
+        self._pending: Dict[str, List[int]] = {}
+
+    def next_id(self, kind: str) -> int:
+        return self.next_ids(kind, 1)[0]
+
+    def next_ids(self, kind: str, count: int) -> List[int]:
+        ids = self.take(kind, count)
+        while len(ids) < count:
+            size = max(self.allocator.block_size, count - len(ids))
+            start = self.allocator.claim(self.session.connection(), kind, size)
+            block = self._pending[kind] = [start, start + size]
+            ids += take_from(block, count - len(ids))
+        return ids
+
+    def take(self, kind: str, count: int) -> List[int]:
+        ids = take_from(self._pending.get(kind), count)
+        return ids + self.allocator.take(kind, count - len(ids))
+
+    def committed(self):
+        for kind, block in self._pending.items():
+            if block[0] < block[1]:
+                self.allocator.release(kind, block)
+        self._pending = {}
+
+    def rolled_back(self):
+        self._pending = {}
+
+
+class AsyncBoundIdAllocator(AsyncIdAllocator):
+    """BoundIdAllocator for an AsyncSession; claims run on the session without blocking the loop."""
+
+    def __init__(self, allocator: HiLoIdAllocator, session: AsyncSession):
+        self.session = session
+        self.bound = BoundIdAllocator(allocator, session.sync_session)
+
+    async def next_id(self, kind: str) -> int:
+        return (await self.next_ids(kind, 1))[0]
+
+    async def next_ids(self, kind: str, count: int) -> List[int]:
+        ids = self.bound.take(kind, count)
+        if len(ids) < count:
+            missing = count - len(ids)
+            ids += await self.session.run_sync(lambda _: self.bound.next_ids(kind, missing))
+        return ids
+
+    def committed(self):
+        self.bound.committed()
+
+    def rolled_back(self):
+        self.bound.rolled_back()
+
+
+class SnowflakeIdAllocator(IdAllocator):
+    """Time-ordered 63-bit ids: 41 bits of milliseconds, 10 bits of worker, 12 bits of sequence.
+
+    Needs no database round-trip at all; each process must use its own worker_id.
+    """
+
+    WORKER_BITS = 10
+    SEQUENCE_BITS = 12
+    EPOCH_MS = 1_704_067_200_000  # 2024-01-01T00:00:00Z
+
+    def __init__(self, worker_id: int, clock=time.time):
+        if not 0 <= worker_id < 1 << self.WORKER_BITS:
+            raise ValueError(f"worker_id must be in [0, {1 << self.WORKER_BITS})")
+        self.worker_id = worker_id
+        self.clock = clock
+        self._last_ms = -1
+        self._sequence = 0
+        self._lock = threading.Lock()
+
+    def _now_ms(self) -> int:
+        return int(self.clock() * 1000) - self.EPOCH_MS
+
+    def next_id(self, kind: str) -> int:
+        with self._lock:
+            now = max(self._now_ms(), self._last_ms)  # never go back if the clock does
+            if now == self._last_ms:
+                self._sequence = (self._sequence + 1) & ((1 << self.SEQUENCE_BITS) - 1)
+                if self._sequence == 0:
+                    while now <= self._last_ms:
+                        now = self._now_ms()
+            else:
+                self._sequence = 0
+            self._last_ms = now
+            return (
+                (now << (self.WORKER_BITS + self.SEQUENCE_BITS))
+                | (self.worker_id << self.SEQUENCE_BITS)
+                | self._sequence
+            )
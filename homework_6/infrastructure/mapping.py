@@ -0,0 +1,62 @@
+from typing import Iterable, List
+
+from sqlalchemy import Select, select
+
+from domain.models import Order, Product
+from .orm import OrderORM, ProductORM, order_lines
+
+# Selected in Product field order, so a result row unpacks straight into Product(*row).
+PRODUCT_COLUMNS = (ProductORM.id, ProductORM.name, ProductORM.quantity, ProductORM.price)
+
+
+def select_products() -> Select:
+    return select(*PRODUCT_COLUMNS)
+
+
+def select_product_page(after_id: int, limit: int) -> Select:
+    return select_products().where(ProductORM.id > after_id).order_by(ProductORM.id).limit(limit)
+
+
+def select_all_products(batch_size: int) -> Select:
+    """Every product in id order, fetched batch_size rows at a time when streamed."""
+    return select_products().order_by(ProductORM.id).execution_options(yield_per=batch_size)
+
+
+def select_product_prices(product_ids: List[int]) -> Select:
+    return select(ProductORM.id, ProductORM.price).where(ProductORM.id.in_(product_ids))
+
+
+def select_order_page(after_id: int, limit: int) -> Select:
+    return select(OrderORM.id).where(OrderORM.id > after_id).order_by(OrderORM.id).limit(limit)
+
+
+def select_order_products(order_ids: List[int]) -> Select:
+    """(order_id, line quantity, *PRODUCT_COLUMNS) rows for the lines of the given orders."""
+    return (
+        select(order_lines.c.order_id, order_lines.c.quantity, *PRODUCT_COLUMNS)
+        .join(ProductORM, ProductORM.id == order_lines.c.product_id)
+        .where(order_lines.c.order_id.in_(order_ids))
+    )
+
+
+def to_product(row) -> Product:
+    return Product(*row)
+
+
+def to_products(rows: Iterable) -> List[Product]:
+    return [Product(*row) for row in rows]
+
+
+def orm_to_product(product_orm: ProductORM) -> Product:
+    return Product(product_orm.id, product_orm.name, product_orm.quantity, product_orm.price)
+
+
+def to_orders(order_ids: Iterable[int], rows: Iterable) -> List[Order]:
+    """Orders in order_ids order, filled from select_order_products() rows.
+
+    A line for n units lists its product n times, the way the order was placed.
+    """
+    orders = {order_id: Order(order_id) for order_id in order_ids}
+    for order_id, quantity, *product in rows:
+        orders[order_id].products.extend([Product(*product)] * quantity)
+    return list(orders.values())
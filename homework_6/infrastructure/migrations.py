@@ -0,0 +1,171 @@
+from dataclasses import dataclass
+from typing import Callable, List, Sequence
+
+from sqlalchemy import (
+    Column,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    insert,
+    literal,
+    select,
+)
+from sqlalchemy.engine import Connection, Engine
+
+# Migrations describe their tables as of the moment they were written, so they keep
+# producing the same schema when the models in orm.py change later on.
+
+schema_migrations = Table(
+    "schema_migrations", MetaData(),
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    upgrade: Callable[[Connection], None]
+
+
+def _initial_schema(conn: Connection):
+    metadata = MetaData()
+    Table("products", metadata,
+          Column("id", Integer, primary_key=True),
+          Column("name", String),
+          Column("quantity", Integer),
+          Column("price", Float))
+    Table("orders", metadata, Column("id", Integer, primary_key=True))
+    Table("order_product_assocoations", metadata,
+          Column("order_id", ForeignKey("orders.id")),
+          Column("product_id", ForeignKey("products.id")))
+    metadata.create_all(conn, checkfirst=True)
+
+
+def _id_blocks(conn: Connection):
+    metadata = MetaData()
+    Table("id_blocks", metadata,
+          Column("name", String, primary_key=True),
+          Column("next_value", Integer, nullable=False))
+    metadata.create_all(conn, checkfirst=True)
+
+
+def _order_lines(conn: Connection):
+    """Replace the association table with order lines, one per (order, product).
+
+    A product linked to an order n times becomes a line for n units, priced at
+    the product's current price since the old table did not record one.
+    """
+    metadata = MetaData()
+    metadata.reflect(conn, only=["products", "orders", "order_product_assocoations"])
+    products = metadata.tables["products"]
+    links = metadata.tables["order_product_assocoations"]
+    lines = Table("order_lines", metadata,
+                  Column("order_id", ForeignKey("orders.id"), primary_key=True),
+                  Column("product_id", ForeignKey("products.id"), primary_key=True),
+                  Column("quantity", Integer, nullable=False),
+                  Column("price", Float, nullable=False),
+                  Index("ix_order_lines_product_id_order_id", "product_id", "order_id"))
+    lines.create(conn)
+    conn.execute(insert(lines).from_select(
+        ["order_id", "product_id", "quantity", "price"],
+        select(links.c.order_id, links.c.product_id, func.count(), products.c.price)  # pylint: disable=not-callable
+        .join(products, products.c.id == links.c.product_id)
+        .where(links.c.order_id.is_not(None))
+        .group_by(links.c.order_id, links.c.product_id, products.c.price),
+    ))
+    links.drop(conn)
+
+
+def _read_model(conn: Connection):
+    """Summary tables for reporting, filled from the data already stored."""
+    metadata = MetaData()
+    metadata.reflect(conn, only=["products", "orders", "order_lines"])
+    products = metadata.tables["products"]
+    orders = metadata.tables["orders"]
+    lines = metadata.tables["order_lines"]
+    inventory = Table("inventory_summary", metadata,
+                      Column("id", Integer, primary_key=True),
+                      Column("products", Integer, nullable=False),
+                      Column("units", Integer, nullable=False),
+                      Column("value", Float, nullable=False))
+    stats = Table("product_stats", metadata,
+                  Column("product_id", ForeignKey("products.id"), primary_key=True),
+                  Column("orders", Integer, nullable=False),
+                  Column("units", Integer, nullable=False),
+                  Column("revenue", Float, nullable=False))
+    totals = Table("order_totals", metadata,
+                   Column("order_id", ForeignKey("orders.id"), primary_key=True),
+                   Column("units", Integer, nullable=False),
+                   Column("total", Float, nullable=False))
+    for table in (inventory, stats, totals):
+        table.create(conn)
+    # pylint: disable=not-callable
+    conn.execute(insert(inventory).from_select(
+        ["id", "products", "units", "value"],
+        select(
+            literal(1),
+            func.count(products.c.id),
+            func.coalesce(func.sum(products.c.quantity), 0),
+            func.coalesce(func.sum(products.c.quantity * products.c.price), 0.0),
+        ),
+    ))
+    conn.execute(insert(stats).from_select(
+        ["product_id", "orders", "units", "revenue"],
+        select(
+            lines.c.product_id,
+            func.count(),
+            func.sum(lines.c.quantity),
+            func.sum(lines.c.quantity * lines.c.price),
+        ).group_by(lines.c.product_id),
+    ))
+    conn.execute(insert(totals).from_select(
+        ["order_id", "units", "total"],
+        select(
+            orders.c.id,
+            func.coalesce(func.sum(lines.c.quantity), 0),
+            func.coalesce(func.sum(lines.c.quantity * lines.c.price), 0.0),
+        )
+        .select_from(orders.outerjoin(lines, lines.c.order_id == orders.c.id))
+        .group_by(orders.c.id),
+    ))
+
+
+MIGRATIONS = (
+    Migration(1, "products, orders and their association", _initial_schema),
+    Migration(2, "id_blocks for the hi/lo id allocator", _id_blocks),
+    Migration(3, "order_lines with quantity and price", _order_lines),
+    Migration(4, "read model summary tables", _read_model),
+)
+
+
+def applied_versions(engine: Engine) -> List[int]:
+    with engine.begin() as conn:
+        schema_migrations.create(conn, checkfirst=True)
+        return list(conn.scalars(select(schema_migrations.c.version).order_by("version")))
+
+
+def migrate(engine: Engine, migrations: Sequence[Migration] = MIGRATIONS) -> List[int]:
+    """Apply pending migrations, each in its own transaction; returns the versions applied.
+
+    Databases created by Base.metadata.create_all() before migrations existed
+    pass through the first steps unchanged since those only create missing tables.
+    """
+    done = set(applied_versions(engine))
+    applied = []
+    for migration in migrations:
+        if migration.version in done:
+            continue
+        with engine.begin() as conn:
+            migration.upgrade(conn)
+            conn.execute(insert(schema_migrations).values(
+                version=migration.version, description=migration.description
+            ))
+        applied.append(migration.version)
+    return applied
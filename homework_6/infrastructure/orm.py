@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, Table, ForeignKey
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Index
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -15,10 +15,57 @@ class OrderORM(Base):
     id = Column(Integer, primary_key=True)
 
 
-order_product_assocoations = Table(
-    'order_product_assocoations', Base.metadata,
-    Column('order_id', ForeignKey('orders.id')),
-    Column('product_id', ForeignKey('products.id'))
-)
+class OrderLineORM(Base):
+    """One product of an order: units ordered and the unit price at order time.
 
-OrderORM.products = relationship("ProductORM", secondary=order_product_assocoations)
+    The primary key (order_id, product_id) serves lookups by order, the second
+    index lookups by product and foreign key checks when products are deleted.
+    """
+    __tablename__ = "order_lines"
+    order_id = Column(ForeignKey("orders.id"), primary_key=True)
+    product_id = Column(ForeignKey("products.id"), primary_key=True)
+    quantity = Column(Integer, nullable=False, default=1)
+    price = Column(Float, nullable=False)
+
+    __table_args__ = (
+        Index("ix_order_lines_product_id_order_id", "product_id", "order_id"),
+    )
+
+
+order_lines = OrderLineORM.__table__
+
+OrderORM.lines = relationship(OrderLineORM, cascade="all, delete-orphan")
+OrderLineORM.product = relationship(ProductORM)
+
+
+class IdBlockORM(Base):
+    """High value of the hi/lo allocator, one row per entity kind."""
+    __tablename__ = "id_blocks"
+    name = Column(String, primary_key=True)
+    next_value = Column(Integer, nullable=False)
+
+
+# Read model: aggregates kept up to date by the unit of work on commit, see read_model.py.
+
+class InventorySummaryORM(Base):
+    """A single row (id=1) with the totals over all products."""
+    __tablename__ = "inventory_summary"
+    id = Column(Integer, primary_key=True)
+    products = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    value = Column(Float, nullable=False, default=0.0)
+
+
+class ProductStatsORM(Base):
+    __tablename__ = "product_stats"
+    product_id = Column(ForeignKey("products.id"), primary_key=True)
+    orders = Column(Integer, nullable=False, default=0)
+    units = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0.0)
+
+
+class OrderTotalORM(Base):
+    __tablename__ = "order_totals"
+    order_id = Column(ForeignKey("orders.id"), primary_key=True)
+    units = Column(Integer, nullable=False, default=0)
+    total = Column(Float, nullable=False, default=0.0)
@@ -0,0 +1,147 @@
+from collections import defaultdict
+from typing import Dict, List, Tuple, Union
+
+from sqlalchemy import Select, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import NoResultFound
+
+from domain.models import InventorySummary, OrderTotal, Product, ProductStats
+from .orm import InventorySummaryORM, OrderORM, OrderTotalORM, ProductStatsORM
+
+INVENTORY_ID = 1
+
+# INSERT ... ON CONFLICT DO UPDATE, spelled the same way by both dialects
+UPSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+
+class ReadModelChanges:
+    """Deltas of the read model tables collected during one unit of work.
+
+    Repositories record what they write; the unit of work turns the deltas into
+    a few upserts right before committing, inside the same transaction.
+    """
+
+    def __init__(self):
+        self.products = 0
+        self.units = 0
+        self.value = 0.0
+        # order id, or the pending OrderORM whose id is known only after flush
+        self.orders: List[Tuple[Union[int, OrderORM], List[dict]]] = []
+
+    def clear(self):
+        self.products = 0
+        self.units = 0
+        self.value = 0.0
+        self.orders = []
+
+    def __bool__(self):
+        return bool(self.products or self.units or self.value or self.orders)
+
+    def products_added(self, products: List[Product]):
+        self.products += len(products)
+        for product in products:
+            self.units += product.quantity or 0
+            self.value += (product.quantity or 0) * (product.price or 0.0)
+
+    def product_updated(self, before: Product, after: Product):
+        self.units += (after.quantity or 0) - (before.quantity or 0)
+        self.value += (
+            (after.quantity or 0) * (after.price or 0.0)
+            - (before.quantity or 0) * (before.price or 0.0)
+        )
+
+    def stock_reserved(self, quantity: int, price: float):
+        self.units -= quantity
+        self.value -= quantity * (price or 0.0)
+
+    def order_added(self, order: Union[int, OrderORM], lines: List[dict]):
+        """lines are order_lines rows: product_id, quantity and price."""
+        self.orders.append((order, lines))
+
+    def statements(self, dialect: str) -> List[tuple]:
+        """(statement, parameters) pairs applying the deltas; run after a flush."""
+        upsert = UPSERTS[dialect]
+        result = []
+        if self.products or self.units or self.value:
+            table = InventorySummaryORM.__table__
+            statement = upsert(table)
+            result.append((
+                statement.on_conflict_do_update(
+                    index_elements=[table.c.id],
+                    set_={
+                        name: table.c[name] + statement.excluded[name]
+                        for name in ("products", "units", "value")
+                    },
+                ),
+                {"id": INVENTORY_ID, "products": self.products, "units": self.units,
+                 "value": self.value},
+            ))
+        if self.orders:
+            totals, stats = self._order_rows()
+            result.append((insert(OrderTotalORM.__table__), totals))
+            if stats:
+                table = ProductStatsORM.__table__
+                statement = upsert(table)
+                result.append((
+                    statement.on_conflict_do_update(
+                        index_elements=[table.c.product_id],
+                        set_={
+                            name: table.c[name] + statement.excluded[name]
+                            for name in ("orders", "units", "revenue")
+                        },
+                    ),
+                    stats,
+                ))
+        return result
+
+    def _order_rows(self) -> Tuple[List[dict], List[dict]]:
+        totals = []
+        stats: Dict[int, dict] = defaultdict(lambda: {"orders": 0, "units": 0, "revenue": 0.0})
+        for order, lines in self.orders:
+            order_id = order if isinstance(order, int) else order.id
+            totals.append({
+                "order_id": order_id,
+                "units": sum(line["quantity"] for line in lines),
+                "total": sum(line["quantity"] * line["price"] for line in lines),
+            })
+            for line in lines:
+                row = stats[line["product_id"]]
+                row["orders"] += 1
+                row["units"] += line["quantity"]
+                row["revenue"] += line["quantity"] * line["price"]
+        return totals, [
+            {"product_id": product_id, **row} for product_id, row in sorted(stats.items())
+        ]
+
+
+def select_inventory() -> Select:
+    table = InventorySummaryORM.__table__
+    return select(table.c.products, table.c.units, table.c.value).where(
+        table.c.id == INVENTORY_ID
+    )
+
+
+def select_product_stats(product_id: int) -> Select:
+    table = ProductStatsORM.__table__
+    return select(table.c.orders, table.c.units, table.c.revenue).where(
+        table.c.product_id == product_id
+    )
+
+
+def select_order_total(order_id: int) -> Select:
+    table = OrderTotalORM.__table__
+    return select(table.c.units, table.c.total).where(table.c.order_id == order_id)
+
+
+def to_inventory(row) -> InventorySummary:
+    return InventorySummary(*row) if row is not None else InventorySummary()
+
+
+def to_product_stats(product_id: int, row) -> ProductStats:
+    return ProductStats(product_id, *row) if row is not None else ProductStats(product_id)
+
+
+def to_order_total(order_id: int, row) -> OrderTotal:
+    if row is None:
+        raise NoResultFound(f"Order not found: {order_id}")
+    return OrderTotal(order_id, *row)
@@ -1,64 +1,389 @@
-from typing import List
-from sqlalchemy.orm import Session
+from collections import Counter
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+from sqlalchemy import Insert, insert, select, update
+from sqlalchemy.exc import NoResultFound
+from sqlalchemy.orm import Session, joinedload, lazyload, selectinload
+from domain.exceptions import OutOfStock
 from domain.models import Order, Product
-from domain.repositories import ProductRepository, OrderRepository
-from .orm import ProductORM, OrderORM
+from domain.models import InventorySummary, OrderTotal, ProductStats
+from domain.repositories import OrderRepository, ProductRepository, ReportingRepository
+from . import mapping
+from .identity_map import IdentityMap, ProductCache
+from .orm import OrderLineORM, OrderORM, ProductORM, order_lines
+from .read_model import (
+    ReadModelChanges,
+    select_inventory,
+    select_order_total,
+    select_product_stats,
+    to_inventory,
+    to_order_total,
+    to_product_stats,
+)
 
-class SqlAlchemyProductRepository(ProductRepository):
-    def __init__(self, session: Session):
+# How order products are loaded: "core" reads plain rows with one extra IN query and
+# never builds ORM objects, "selectin" issues the same IN query through the ORM,
+# "joined" uses a single LEFT OUTER JOIN, "lazy" loads per order on first access (N+1).
+# The ORM strategies go through OrderORM.lines with the product joined to each line:
+# a secondary (many-to-many) join would be nested in parentheses, which SQLite
+# materialises with a full scan of order_lines.
+LOADING_STRATEGIES = {
+    "core": None,
+    "selectin": selectinload(OrderORM.lines).joinedload(OrderLineORM.product),
+    "joined": joinedload(OrderORM.lines).joinedload(OrderLineORM.product),
+    "lazy": lazyload(OrderORM.lines).joinedload(OrderLineORM.product),
+}
+# Ids per IN (...) list, well below SQLite's bound parameter limit.
+CHUNK_SIZE = 500
+
+
+def chunked(items: List, size: int = CHUNK_SIZE) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def preallocated_ids(rows: List[dict]) -> List[int]:
+    preallocated = [row["id"] for row in rows if row["id"] is not None]
+    if preallocated and len(preallocated) != len(rows):
+        raise ValueError("Either all or none of the rows must have an id")
+    return preallocated
+
+
+def reserve_statement(product_id: int, quantity: int):
+    # the stock check and the decrement are one statement, so two concurrent
+    # reservations can never both see the same quantity and oversell
+    return (
+        update(ProductORM)
+        .where(ProductORM.id == product_id, ProductORM.quantity >= quantity)
+        .values(quantity=ProductORM.quantity - quantity)
+        .returning(ProductORM.quantity, ProductORM.price)
+    )
+
+
+def reservation_error(product_id: int, quantity: int, exists: bool) -> Exception:
+    if not exists:
+        return NoResultFound(f"Products not found: [{product_id}]")
+    return OutOfStock(product_id, quantity)
+
+
+def line_quantities(order: Order) -> Counter:
+    # a product listed n times in an order becomes one line for n units
+    return Counter(p.id for p in order.products)
+
+
+def line_rows(order_id: int, order: Order, prices: Dict[int, float]) -> List[dict]:
+    return [
+        {"order_id": order_id, "product_id": product_id, "quantity": quantity,
+         "price": prices[product_id]}
+        for product_id, quantity in line_quantities(order).items()
+    ]
+
+
+def check_prices(wanted: List[int], prices: Dict[int, float]) -> Dict[int, float]:
+    missing = set(wanted) - set(prices)
+    if missing:
+        raise NoResultFound(f"Products not found: {sorted(missing)}")
+    return prices
+
+
+def order_line_rows(
+    orders: List[Order], ids: Sequence[int], prices: Dict[int, float]
+) -> List[dict]:
+    """Give the orders their ids and return the order_lines rows for all of them."""
+    lines = []
+    for order, order_id in zip(orders, ids):
+        order.id = order_id
+        lines.extend(line_rows(order_id, order, prices))
+    return lines
+
+
+def record_orders(read_model: Optional[ReadModelChanges], orders: List[Order], lines: List[dict]):
+    if read_model is None:
+        return
+    by_order = {order.id: [] for order in orders}
+    for line in lines:
+        by_order[line["order_id"]].append(line)
+    for order_id, rows in by_order.items():
+        read_model.order_added(order_id, rows)
+
+
+def returning_ids(table, rows: List[dict], dialect: str) -> Tuple[Insert, List[dict]]:
+    """INSERT ... RETURNING id and its parameters for rows whose ids are None.
+
+    SQLite turns a NULL id into a new rowid, so the rows go as they are; other
+    databases need the column left out to fill it from its sequence.
+    """
+    if dialect == "sqlite":
+        return insert(table).returning(table.c.id), rows
+    rows = [{name: value for name, value in row.items() if name != "id"} for row in rows]
+    return insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+
+
+def assigned_ids(ids: Sequence[int], dialect: str) -> Sequence[int]:
+    """Ids from returning_ids() in the order of the parameter rows.
+
+    SQLAlchemy can only keep RETURNING rows in parameter order on SQLite by
+    sending one INSERT per row. One SQLite INSERT numbers its rows in VALUES
+    order, so there the statements stay batched and sorting restores the order.
+    """
+    return sorted(ids) if dialect == "sqlite" else ids
+
+
+def insert_many(session: Session, table, rows: List[dict]) -> Sequence[int]:
+    """executemany() the rows and return the ids they received.
+
+    Rows either all carry preallocated ids or none do. In the latter case the
+    database assigns them and returns them with RETURNING.
+    """
+    preallocated = preallocated_ids(rows)
+    if preallocated:
+        session.execute(insert(table), rows)
+        return preallocated
+    dialect = session.get_bind().dialect.name
+    statement, rows = returning_ids(table, rows, dialect)
+    return assigned_ids(session.scalars(statement, rows).all(), dialect)
+
+
+class ProductMaps:
+    """Identity map and shared cache bookkeeping of a product repository."""
+
+    def __init__(
+        self,
+        identity_map: Optional[IdentityMap] = None,
+        cache: Optional[ProductCache] = None,
+        read_model: Optional[ReadModelChanges] = None,
+    ):
+        self.identity_map = identity_map if identity_map is not None else IdentityMap()
+        self.cache = cache
+        self.read_model = read_model
+
+    def known(self, product_id: int) -> Optional[Product]:
+        product = self.identity_map.get(product_id)
+        # products written in this unit of work must not come from the shared cache
+        if product is None and self.cache is not None and product_id not in self.identity_map.dirty:
+            product = self.cache.get(product_id)
+            if product is not None:
+                self.identity_map.add(product)
+        return product
+
+    def loaded(self, product: Product) -> Product:
+        if self.cache is not None and product.id not in self.identity_map.dirty:
+            self.cache.put(product)
+        self.identity_map.add(product)
+        return product
+
+    def added(self, products: List[Product]):
+        if self.read_model is not None:
+            self.read_model.products_added(products)
+
+    def reserved(self, product_id: int, quantity: int, row) -> int:
+        """Bookkeeping after a reservation, row is what reserve_statement() returned."""
+        remaining, price = row
+        self.identity_map.mark_dirty(product_id)
+        if self.read_model is not None:
+            self.read_model.stock_reserved(quantity, price)
+        return remaining
+
+    def written(self, products: List[Product], ids: Sequence[int]):
+        for product, product_id in zip(products, ids):
+            product.id = product_id
+            self.identity_map.mark_dirty(product_id)
+            self.identity_map.add(product)
+        if self.cache is not None:
+            self.cache.invalidate(ids)
+
+
+def product_rows(products: List[Product]) -> List[dict]:
+    return [
+        {"id": p.id, "name": p.name, "quantity": p.quantity, "price": p.price}
+        for p in products
+    ]
+
+
+class SqlAlchemyProductRepository(ProductMaps, ProductRepository):
+    def __init__(
+        self,
+        session: Session,
+        identity_map: Optional[IdentityMap] = None,
+        cache: Optional[ProductCache] = None,
+        read_model: Optional[ReadModelChanges] = None,
+    ):
+        super().__init__(identity_map, cache, read_model)
         self.session=session
 
     def add(self, product:Product):
         product_orm = ProductORM(
+            id=product.id,
             name=product.name,
             quantity=product.quantity,
             price=product.price,
         )
         self.session.add(product_orm)
+        self.added([product])
+        if product.id is not None:
+            self.written([product], [product.id])
+
+    def add_many(self, products: List[Product]):
+        if not products:
+            return
+        ids = insert_many(self.session, ProductORM.__table__, product_rows(products))
+        self.written(products, ids)
+        self.added(products)
+
+    def update_many(self, products: List[Product]):
+        """One executemany UPDATE by primary key for all products."""
+        if not products:
+            return
+        if self.read_model is not None:
+            before = {}
+            for chunk in chunked([p.id for p in products]):
+                before.update((p.id, p) for p in mapping.to_products(self.session.execute(
+                    mapping.select_products().where(ProductORM.id.in_(chunk))
+                )))
+            check_prices([p.id for p in products], before)
+            for product in products:
+                self.read_model.product_updated(before[product.id], product)
+        self.session.execute(update(ProductORM), product_rows(products))
+        self.written(products, [p.id for p in products])
 
     def get(self, product_id: int)->Product:
-        product_orm= self.session.query(ProductORM).filter_by(id=product_id).one()
-        return Product(
-            id=product_orm.id,
-            name=product_orm.name,
-            quantity=product_orm.quantity,
-            price=product_orm.price
-        )
+        product = self.known(product_id)
+        if product is None:
+            product = self.loaded(mapping.to_product(self.session.execute(
+                mapping.select_products().where(ProductORM.id == product_id)
+            ).one()))
+        return product
 
     def list(self) -> List[Product]:
-        products_orm= self.session.query(ProductORM).all()
-        return [
-            Product(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
-            for p in products_orm
-        ]
+        return mapping.to_products(self.session.execute(mapping.select_products()))
+
+    def reserve(self, product_id: int, quantity: int) -> int:
+        row = self.session.execute(reserve_statement(product_id, quantity)).first()
+        if row is None:
+            exists = self.session.get(ProductORM, product_id) is not None
+            raise reservation_error(product_id, quantity, exists)
+        return self.reserved(product_id, quantity, row)
+
+    def list_page(self, after_id: int = 0, limit: int = 100) -> List[Product]:
+        return mapping.to_products(
+            self.session.execute(mapping.select_product_page(after_id, limit))
+        )
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Product]:
+        # plain column rows are streamed without entering the session identity map
+        result = self.session.execute(mapping.select_all_products(batch_size))
+        for partition in result.partitions():
+            yield from mapping.to_products(partition)
 
 class SqlAlchemyOrderRepository(OrderRepository):
-    def __init__(self, session: Session):
+    def __init__(
+        self,
+        session: Session,
+        loading: str = "core",
+        read_model: Optional[ReadModelChanges] = None,
+    ):
         self.session=session
+        self.loader = LOADING_STRATEGIES[loading]
+        self.read_model = read_model
+
+    def _query(self):
+        return self.session.query(OrderORM).options(self.loader)
+
+    def _product_prices(self, product_ids: Iterable[int]) -> Dict[int, float]:
+        wanted = list(set(product_ids))
+        prices = {}
+        for chunk in chunked(wanted):
+            rows = self.session.execute(mapping.select_product_prices(chunk))
+            prices.update((product_id, price) for product_id, price in rows)
+        return check_prices(wanted, prices)
 
     def add(self, order:Order):
-        order_orm = OrderORM()
-        order_orm.products = [
-            self.session.query(ProductORM).filter_by(id=p.id).one()
-            for p in order.products
+        quantities = line_quantities(order)
+        prices = self._product_prices(quantities)
+        order_orm = OrderORM(id=order.id)
+        order_orm.lines = [
+            OrderLineORM(product_id=product_id, quantity=quantity, price=prices[product_id])
+            for product_id, quantity in quantities.items()
         ]
         self.session.add(order_orm)
+        if self.read_model is not None:
+            # the id may only be assigned on flush, the read model resolves it then
+            self.read_model.order_added(
+                order_orm if order.id is None else order.id, line_rows(order.id, order, prices)
+            )
+
+    def add_many(self, orders: List[Order]):
+        if not orders:
+            return
+        prices = self._product_prices(p.id for o in orders for p in o.products)
+        ids = insert_many(self.session, OrderORM.__table__, [{"id": o.id} for o in orders])
+        lines = order_line_rows(orders, ids, prices)
+        if lines:
+            self.session.execute(insert(order_lines), lines)
+        record_orders(self.read_model, orders, lines)
+
+    @staticmethod
+    def _to_order(order_orm: OrderORM) -> Order:
+        products = []
+        for line in order_orm.lines:
+            products.extend([mapping.orm_to_product(line.product)] * line.quantity)
+        return Order(order_orm.id, products)
+
+    def _load(self, statement) -> List[Order]:
+        order_ids = list(self.session.scalars(statement))
+        rows = []
+        for chunk in chunked(order_ids):
+            rows.extend(self.session.execute(mapping.select_order_products(chunk)))
+        return mapping.to_orders(order_ids, rows)
 
     def get(self, order_id: int)->Order:
-        order_orm= self.session.query(OrderORM).filter_by(id=order_id).one()
-        products = [
-            Product(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
-            for p in order_orm.products
-        ]
-        return Order(id=order_orm.id, products=products)
+        if self.loader is None:
+            orders = self._load(select(OrderORM.id).where(OrderORM.id == order_id))
+            if not orders:
+                raise NoResultFound(f"Order not found: {order_id}")
+            return orders[0]
+        order_orm= self._query().filter_by(id=order_id).one()
+        return self._to_order(order_orm)
 
     def list(self) -> List[Order]:
-        orders_orm= self.session.query(OrderORM).all()
-        orders=[]
-        for order_orm in orders_orm:
-            products = [
-                Product(id=p.id, name=p.name, quantity=p.quantity, price=p.price)
-                for p in order_orm.products
-            ]
-            orders.append(Order(id=order_orm.id, products=products))
-        return orders
+        if self.loader is None:
+            return self._load(select(OrderORM.id))
+        orders_orm= self._query().all()
+        return [self._to_order(order_orm) for order_orm in orders_orm]
+
+    def list_page(self, after_id: int = 0, limit: int = 100) -> List[Order]:
+        if self.loader is None:
+            return self._load(mapping.select_order_page(after_id, limit))
+        orders_orm = (
+            self._query()
+            .filter(OrderORM.id > after_id)
+            .order_by(OrderORM.id)
+            .limit(limit)
+            .all()
+        )
+        return [self._to_order(order_orm) for order_orm in orders_orm]
+
+    def iter_all(self, batch_size: int = 1000) -> Iterator[Order]:
+        # keyset pages keep eager loading working; a page's ORM objects are only
+        # weakly held by the session and go away once mapped to domain orders
+        after_id = 0
+        while True:
+            page = self.list_page(after_id, batch_size)
+            yield from page
+            if len(page) < batch_size:
+                return
+            after_id = page[-1].id
+
+
+class SqlAlchemyReportingRepository(ReportingRepository):
+    def __init__(self, session: Session):
+        self.session = session
+
+    def inventory(self) -> InventorySummary:
+        return to_inventory(self.session.execute(select_inventory()).first())
+
+    def product_stats(self, product_id: int) -> ProductStats:
+        row = self.session.execute(select_product_stats(product_id)).first()
+        return to_product_stats(product_id, row)
+
+    def order_total(self, order_id: int) -> OrderTotal:
+        return to_order_total(order_id, self.session.execute(select_order_total(order_id)).first())
@@ -1,24 +1,198 @@
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+from sqlalchemy import event
+from sqlalchemy.orm import ORMExecuteState, Session
+from domain.models import Order, Product
 from domain.unit_of_work import UnitOfWork
+from .identity_map import IdentityMap, ProductCache
+from .ids import HiLoIdAllocator
+from .read_model import ReadModelChanges
+from .repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+    SqlAlchemyReportingRepository,
+)
 
+# connection execution option naming the BEGIN mode of SQLite transactions
+SQLITE_BEGIN = "sqlite_begin"
+WRITE_TRANSACTION = {SQLITE_BEGIN: "IMMEDIATE"}
 
-class SqlAlchemyUnitOfWork(UnitOfWork):
+
+class WriteTracker:
+    """Notices whether a session wrote anything since the last reset.
+
+    Flushes and INSERT/UPDATE/DELETE statements passed to session.execute() count
+    as writes; plain text() statements are not recognised. There is one tracker
+    per session, kept in session.info: units of work reusing a thread-local
+    session share it instead of adding listeners each time.
+    """
+
+    INFO_KEY = "write_tracker"
 
     def __init__(self, session: Session):
+        self.written = False
+        event.listen(session, "after_flush", self._flushed)
+        event.listen(session, "do_orm_execute", self._executed)
+
+    @classmethod
+    def of(cls, session: Session) -> "WriteTracker":
+        tracker = session.info.get(cls.INFO_KEY)
+        if tracker is None:
+            tracker = session.info[cls.INFO_KEY] = cls(session)
+        return tracker
+
+    def _flushed(self, _session, _flush_context):
+        self.written = True
+
+    def _executed(self, state: ORMExecuteState):
+        if state.is_insert or state.is_update or state.is_delete:
+            self.written = True
+
+
+class ChangeSet:
+    """New and dirty domain objects registered with a unit of work."""
+
+    def __init__(self):
+        self.new_products: List[Product] = []
+        self.new_orders: List[Order] = []
+        self.dirty_products: Dict[int, Product] = {}
+
+    def register_new(self, obj):
+        if isinstance(obj, Product):
+            self.new_products.append(obj)
+        elif isinstance(obj, Order):
+            self.new_orders.append(obj)
+        else:
+            raise TypeError(f"Cannot register {type(obj).__name__}")
+
+    def register_dirty(self, product: Product):
+        if product.id is None:
+            raise ValueError("Only stored products can be registered as dirty")
+        # a new product is inserted with its latest fields anyway
+        if not any(product is new for new in self.new_products):
+            self.dirty_products[product.id] = product
+
+    def clear(self):
+        self.new_products = []
+        self.new_orders = []
+        self.dirty_products = {}
+
+
+class SqlAlchemyUnitOfWork(UnitOfWork):  # pylint: disable=too-many-instance-attributes
+    """Transaction boundary around the repositories of one session.
+
+    Objects passed to register_new() and register_dirty() are written on flush,
+    one executemany per kind. Commits with nothing to write are skipped.
+    With group_commit=n only every n-th commit() that wrote something reaches
+    the database, so n small service calls share one transaction and one fsync;
+    leaving the with-block commits the rest. A rollback then also discards the
+    calls whose commit() was deferred. With for_write=True each transaction of
+    the with-block takes the SQLite write lock when it begins; read-only units
+    of work should leave it off so that they do not wait for writers.
+
+    Given an id_allocator, uow.ids hands out its ids and claims new blocks in
+    this unit of work's transaction; pass it to the services.
+    """
+
+    def __init__(  # pylint: disable=too-many-arguments,too-many-positional-arguments
+        self,
+        session: Session,
+        product_cache: Optional[ProductCache] = None,
+        group_commit: int = 1,
+        id_allocator: Optional[HiLoIdAllocator] = None,
+        for_write: bool = False,
+    ):
         self.session = session
+        self.product_cache = product_cache
+        self.group_commit = group_commit
+        self.for_write = for_write
+        self.identity_map = IdentityMap()
+        self.read_model = ReadModelChanges()
+        self.writes = WriteTracker.of(session)
+        self.ids = id_allocator.bind(session) if id_allocator is not None else None
+        self.products = SqlAlchemyProductRepository(
+            session, self.identity_map, product_cache, self.read_model
+        )
+        self.orders = SqlAlchemyOrderRepository(session, read_model=self.read_model)
+        self.reports = SqlAlchemyReportingRepository(session)
+        self.changes = ChangeSet()
+        self.deferred_commits = 0
 
     def __enter__(self):
+        self._begin()
         return self
 
+    def _begin(self):
+        # a transaction already in progress keeps the mode it began with
+        if self.for_write and not self.session.in_transaction():
+            self.session.connection(execution_options=WRITE_TRANSACTION)
+
     def __exit__(self, exception_type, exception_value, traceback):
-        if exception_type is None:
-            self.commit()
-        else:
-            self.rollback()
-        self.session.close()
+        try:
+            if exception_type is None:
+                self.flush()
+                self._commit()
+            else:
+                self.rollback()
+        finally:
+            self.session.close()
+            self.writes.written = False
+            if self.ids is not None:
+                self.ids.rolled_back()
+            self.identity_map.clear()
+
+    def register_new(self, obj):
+        self.changes.register_new(obj)
+
+    def register_dirty(self, product: Product):
+        self.changes.register_dirty(product)
+
+    def flush(self):
+        """Write registered objects and the read model deltas, without committing.
+
+        New products go first so that new orders may list them.
+        """
+        changes, self.changes = self.changes, ChangeSet()
+        self.products.add_many(changes.new_products)
+        self.orders.add_many(changes.new_orders)
+        self.products.update_many(list(changes.dirty_products.values()))
+        if self.read_model:
+            self.session.flush()
+            dialect = self.session.get_bind().dialect.name
+            for statement, parameters in self.read_model.statements(dialect):
+                self.session.execute(statement, parameters)
+            self.read_model.clear()
+
+    def has_writes(self) -> bool:
+        session = self.session
+        return self.writes.written or bool(session.new or session.dirty or session.deleted)
 
     def commit(self):
+        self.flush()
+        if not self.has_writes():
+            return
+        self.deferred_commits += 1
+        if self.deferred_commits >= self.group_commit:
+            self._commit()
+            self._begin()
+
+    def _commit(self):
+        if not self.has_writes():
+            return
         self.session.commit()
+        self.writes.written = False
+        self.deferred_commits = 0
+        if self.ids is not None:
+            self.ids.committed()
+        if self.product_cache is not None:
+            self.product_cache.invalidate(self.identity_map.dirty)
+        self.identity_map.dirty.clear()
 
     def rollback(self):
         self.session.rollback()
+        self.writes.written = False
+        self.deferred_commits = 0
+        if self.ids is not None:
+            self.ids.rolled_back()
+        self.changes.clear()
+        self.identity_map.clear()
+        self.read_model.clear()
@@ -1,26 +1,23 @@
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from domain.services import WarehouseService
-from infrastructure.orm import Base
-from infrastructure.repositories import SqlAlchemyProductRepository, SqlAlchemyOrderRepository
+from infrastructure.ids import HiLoIdAllocator
 from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
-from infrastructure.database import DATABASE_URL
+from infrastructure.database import DATABASE_URL, create_warehouse_engine
+from infrastructure.migrations import migrate
 
-engine = create_engine(DATABASE_URL)
+engine = create_warehouse_engine(DATABASE_URL)
 SessionFactory=sessionmaker(bind=engine)
-Base.metadata.create_all(engine)
+migrate(engine)
 
 def main():
     session = SessionFactory()
-    product_repo = SqlAlchemyProductRepository(session)
-    order_repo = SqlAlchemyOrderRepository(session)
+    uow = SqlAlchemyUnitOfWork(
+        session, id_allocator=HiLoIdAllocator(engine), for_write=True
+    )
 
-    uow = SqlAlchemyUnitOfWork(session)
-
-    warehouse_service = WarehouseService(product_repo, order_repo)
+    warehouse_service = WarehouseService(uow.products, uow.orders, uow.ids)
     with uow:
         new_product = warehouse_service.create_product(name="test1", quantity=1, price=100)
-        uow.commit()
         print(f"create product: {new_product}")
         # todo add some actions
 
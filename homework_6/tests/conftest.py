@@ -0,0 +1,69 @@
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from infrastructure.database import create_warehouse_engine
+from infrastructure.orm import Base
+
+
+class QueryCounter:
+    """Counts SQL statements sent to the database while active."""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.parameters = []
+
+    def _record(self, _conn, _cursor, statement, parameters, _context, executemany):
+        self.statements.append(statement)
+        self.parameters.append(parameters[0] if executemany else parameters)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def __enter__(self):
+        self.statements = []
+        self.parameters = []
+        event.listen(self.engine, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, "before_cursor_execute", self._record)
+
+
+@pytest.fixture(name="engine")
+def fixture_engine():
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="wal_engine")
+def fixture_wal_engine(tmp_path):
+    """File database set up the way main.py does it, for multi-threaded tests."""
+    engine = create_warehouse_engine(f"sqlite:///{tmp_path / 'warehouse.db'}", pool_size=8)
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="session_factory")
+def fixture_session_factory(engine):
+    return sessionmaker(bind=engine)
+
+
+@pytest.fixture(name="session")
+def fixture_session(session_factory):
+    session = session_factory()
+    yield session
+    session.close()
+
+
+@pytest.fixture(name="query_counter")
+def fixture_query_counter(engine):
+    return QueryCounter(engine)
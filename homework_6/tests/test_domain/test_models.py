@@ -54,3 +54,10 @@ def test_order_add_same_product_twice():
     order.add_product(product)
     order.add_product(product)
     assert order.products == [product, product]
+
+
+def test_models_have_no_instance_dict():
+    product = Product(id=1, name="Test Product", quantity=42, price=42.0)
+    with pytest.raises(AttributeError):
+        product.color = "red"
+    assert not hasattr(Order(id=1), "__dict__")
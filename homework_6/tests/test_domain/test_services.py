@@ -1,8 +1,16 @@
+import asyncio
+
 import pytest
 from pytest_mock import MockerFixture
+from domain.ids import IdAllocator
 from domain.models import Product
-from domain.repositories import OrderRepository, ProductRepository
-from domain.services import WarehouseService, gen_id
+from domain.repositories import (
+    AsyncOrderRepository,
+    AsyncProductRepository,
+    OrderRepository,
+    ProductRepository,
+)
+from domain.services import AsyncWarehouseService, WarehouseService
 
 
 @pytest.mark.parametrize(
@@ -47,8 +55,83 @@ def test_service_should_create_order_and_store_it(mocker: MockerFixture):
     mock_order_repo.add.assert_called_once_with(order)
 
 
-def test_gen_id_produces_sequential_values():
-    gen = gen_id()
-    assert next(gen) == 1
-    assert next(gen) == 2
-    assert next(gen) == 3
+def test_service_should_create_products_in_one_batch(mocker: MockerFixture):
+    mock_product_repo = mocker.MagicMock(spec=ProductRepository)
+    mock_order_repo = mocker.MagicMock(spec=OrderRepository)
+    service = WarehouseService(mock_product_repo, mock_order_repo)
+
+    products = service.create_products([("A", 1, 1.0), ("B", 2, 2.0)])
+
+    assert [(p.name, p.quantity, p.price) for p in products] == [
+        ("A", 1, 1.0),
+        ("B", 2, 2.0),
+    ]
+    mock_product_repo.add_many.assert_called_once_with(products)
+
+
+def test_service_should_create_orders_in_one_batch(mocker: MockerFixture):
+    mock_product_repo = mocker.MagicMock(spec=ProductRepository)
+    mock_order_repo = mocker.MagicMock(spec=OrderRepository)
+    service = WarehouseService(mock_product_repo, mock_order_repo)
+    product = Product(id=1, name="Product 1", quantity=512, price=512.0)
+
+    orders = service.create_orders([[product], [product, product]])
+
+    assert [len(o.products) for o in orders] == [1, 2]
+    mock_order_repo.add_many.assert_called_once_with(orders)
+
+
+def test_service_should_take_ids_from_allocator(mocker: MockerFixture):
+    mock_product_repo = mocker.MagicMock(spec=ProductRepository)
+    mock_order_repo = mocker.MagicMock(spec=OrderRepository)
+    allocator = mocker.MagicMock(spec=IdAllocator)
+    allocator.next_ids.side_effect = lambda kind, count: list(range(10, 10 + count))
+    service = WarehouseService(mock_product_repo, mock_order_repo, allocator)
+
+    product = service.create_product(name="A", quantity=1, price=1.0)
+    products = service.create_products([("B", 1, 1.0), ("C", 1, 1.0)])
+    order = service.create_order(products=[product])
+
+    assert (product.id, [p.id for p in products], order.id) == (10, [10, 11], 10)
+    allocator.next_ids.assert_any_call("orders", 1)
+
+
+def test_service_without_allocator_leaves_ids_to_database(mocker: MockerFixture):
+    service = WarehouseService(
+        mocker.MagicMock(spec=ProductRepository), mocker.MagicMock(spec=OrderRepository)
+    )
+
+    assert service.create_product(name="A", quantity=1, price=1.0).id is None
+
+
+def test_service_should_reserve_stock_before_placing_order(mocker: MockerFixture):
+    mock_product_repo = mocker.MagicMock(spec=ProductRepository)
+    mock_product_repo.reserve.side_effect = lambda product_id, count: 10 - count
+    mock_order_repo = mocker.MagicMock(spec=OrderRepository)
+    service = WarehouseService(mock_product_repo, mock_order_repo)
+    product1 = Product(id=2, name="Product 2", quantity=10, price=1.0)
+    product2 = Product(id=1, name="Product 1", quantity=10, price=1.0)
+
+    order = service.place_order([product1, product2, product1])
+
+    assert mock_product_repo.reserve.call_args_list == [mocker.call(1, 1), mocker.call(2, 2)]
+    assert (product1.quantity, product2.quantity) == (8, 9)
+    mock_order_repo.add.assert_called_once_with(order)
+
+
+def test_async_service_should_reserve_stock_before_placing_order(mocker: MockerFixture):
+    mock_product_repo = mocker.AsyncMock(spec=AsyncProductRepository)
+    mock_product_repo.reserve.side_effect = lambda product_id, count: 10 - count
+    mock_order_repo = mocker.AsyncMock(spec=AsyncOrderRepository)
+    allocator = mocker.MagicMock(spec=IdAllocator)
+    allocator.next_ids.return_value = [7]
+    service = AsyncWarehouseService(mock_product_repo, mock_order_repo, allocator)
+    product1 = Product(id=2, name="Product 2", quantity=10, price=1.0)
+    product2 = Product(id=1, name="Product 1", quantity=10, price=1.0)
+
+    order = asyncio.run(service.place_order([product1, product2, product1]))
+
+    assert order.id == 7
+    assert mock_product_repo.reserve.await_args_list == [mocker.call(1, 1), mocker.call(2, 2)]
+    assert (product1.quantity, product2.quantity) == (8, 9)
+    mock_order_repo.add.assert_awaited_once_with(order)
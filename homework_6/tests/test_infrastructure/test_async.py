@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from domain.exceptions import OutOfStock
+from domain.models import Order, Product
+from domain.services import AsyncWarehouseService
+from infrastructure.database import (
+    create_async_warehouse_engine,
+    make_async_uow_factory,
+    run_in_async_uow,
+)
+from infrastructure.identity_map import ProductCache
+from infrastructure.ids import HiLoIdAllocator
+from infrastructure.orm import Base
+
+
+async def make_engine(url):
+    engine = create_async_warehouse_engine(url, pool_size=4)
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    return engine
+
+
+@pytest.fixture(name="async_url")
+def fixture_async_url(tmp_path):
+    return f"sqlite:///{tmp_path / 'warehouse.db'}"
+
+
+def run(url, scenario, **uow_kwargs):
+    async def main():
+        engine = await make_engine(url)
+        try:
+            return await scenario(make_async_uow_factory(engine, **uow_kwargs))
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(main())
+
+
+def test_products_round_trip(async_url):
+    async def scenario(uow_factory):
+        async with uow_factory() as uow:
+            service = AsyncWarehouseService(uow.products, uow.orders)
+            created = await service.create_products((f"Product {i}", i, 1.0) for i in range(5))
+            extra = await service.create_product("Extra", 1, 2.0)
+        async with uow_factory() as uow:
+            return (
+                created,
+                extra,
+                await uow.products.get(3),
+                await uow.products.list_page(after_id=2, limit=2),
+                [p.id async for p in uow.products.iter_all(batch_size=2)],
+            )
+
+    created, extra, third, page, streamed = run(async_url, scenario)
+
+    assert [p.id for p in created] == [1, 2, 3, 4, 5]
+    assert extra.id == 6
+    assert third == Product(id=3, name="Product 2", quantity=2, price=1.0)
+    assert [p.id for p in page] == [3, 4]
+    assert streamed == [1, 2, 3, 4, 5, 6]
+
+
+def test_orders_round_trip(async_url):
+    async def scenario(uow_factory):
+        async with uow_factory() as uow:
+            service = AsyncWarehouseService(uow.products, uow.orders)
+            products = await service.create_products([("A", 5, 1.0), ("B", 5, 2.0)])
+            await service.create_order(products)
+            await service.create_orders([products[:1]] * 3)
+        async with uow_factory() as uow:
+            return (
+                await uow.orders.get(1),
+                await uow.orders.list(),
+                [o.id async for o in uow.orders.iter_all(batch_size=3)],
+            )
+
+    first, orders, streamed = run(async_url, scenario)
+
+    assert [p.name for p in first.products] == ["A", "B"]
+    assert [len(o.products) for o in orders] == [2, 1, 1, 1]
+    assert streamed == [1, 2, 3, 4]
+
+
+def test_missing_rows_raise(async_url):
+    async def scenario(uow_factory):
+        async with uow_factory() as uow:
+            for lookup in (uow.products.get(1), uow.orders.get(1), uow.products.reserve(1, 1)):
+                with pytest.raises(NoResultFound):
+                    await lookup
+            with pytest.raises(NoResultFound):
+                await uow.orders.add(Order(id=None, products=[Product(7, "", 0, 0)]))
+
+    run(async_url, scenario)
+
+
+def test_rollback_discards_work(async_url):
+    async def scenario(uow_factory):
+        with pytest.raises(OutOfStock):
+            async with uow_factory() as uow:
+                service = AsyncWarehouseService(uow.products, uow.orders)
+                await service.create_product("A", 1, 1.0)
+                await uow.commit()
+                product = await uow.products.get(1)
+                await service.place_order([product, product])
+        async with uow_factory() as uow:
+            return await uow.products.list(), await uow.orders.list()
+
+    products, orders = run(async_url, scenario)
+
+    assert [p.quantity for p in products] == [1]
+    assert not orders
+
+
+def test_commit_invalidates_shared_cache(async_url):
+    cache = ProductCache()
+
+    async def scenario(uow_factory):
+        async with uow_factory() as uow:
+            await uow.products.add(Product(id=None, name="A", quantity=3, price=1.0))
+        async with uow_factory() as uow:
+            await uow.products.get(1)
+        cached = cache.get(1)
+        async with uow_factory() as uow:
+            await uow.products.reserve(1, 1)
+        return cached, cache.get(1)
+
+    cached, after_commit = run(async_url, scenario, product_cache=cache)
+
+    assert cached.quantity == 3
+    assert after_commit is None
+
+
+def test_concurrent_tasks_never_oversell(async_url):
+    async def place(uow_factory):
+        async def work(uow):
+            service = AsyncWarehouseService(uow.products, uow.orders)
+            return await service.place_order([Product(1, "A", 0, 1.0)])
+        try:
+            await run_in_async_uow(uow_factory, work)
+            return True
+        except OutOfStock:
+            return False
+
+    async def scenario(uow_factory):
+        async with uow_factory() as uow:
+            await uow.products.add(Product(id=None, name="A", quantity=20, price=1.0))
+        placed = await asyncio.gather(*(place(uow_factory) for _ in range(40)))
+        async with uow_factory() as uow:
+            return sum(placed), await uow.products.get(1), len(await uow.orders.list())
+
+    placed, product, orders = run(async_url, scenario)
+
+    assert (placed, product.quantity, orders) == (20, 0, 20)
+
+
+def test_place_order_claims_id_block_in_the_unit_of_work(async_url):
+    async def main():
+        engine = await make_engine(async_url)
+        uow_factory = make_async_uow_factory(
+            engine,
+            id_allocator=HiLoIdAllocator(engine.sync_engine, block_size=2),
+            for_write=True,
+        )
+
+        async def work(uow):
+            service = AsyncWarehouseService(uow.products, uow.orders, uow.ids)
+            return await service.place_order([Product(1, "A", 0, 1.0)])
+
+        try:
+            async with uow_factory() as uow:
+                await uow.products.add(Product(id=None, name="A", quantity=20, price=1.0))
+            return [await asyncio.wait_for(run_in_async_uow(uow_factory, work), 1.0)
+                    for _ in range(5)]
+        finally:
+            await engine.dispose()
+
+    orders = asyncio.run(main())
+
+    assert [o.id for o in orders] == [1, 2, 3, 4, 5]
+
+
+def test_in_memory_url_uses_aiosqlite():
+    engine = create_async_warehouse_engine("sqlite://")
+
+    assert engine.url.drivername == "sqlite+aiosqlite"
+    asyncio.run(engine.dispose())
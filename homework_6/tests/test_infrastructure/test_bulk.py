@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import NoResultFound
+
+from domain.models import Order, Product
+from domain.services import WarehouseService
+from infrastructure.orm import order_lines
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+)
+
+
+def make_service(session):
+    return WarehouseService(
+        SqlAlchemyProductRepository(session), SqlAlchemyOrderRepository(session)
+    )
+
+
+def test_create_products_assigns_ids_in_order(session):
+    service = make_service(session)
+
+    products = service.create_products(
+        (f"Product {i}", i, float(i)) for i in range(1200)
+    )
+    session.commit()
+
+    assert [p.id for p in products] == list(range(1, 1201))
+    assert SqlAlchemyProductRepository(session).get(700).name == "Product 699"
+
+
+def test_create_products_uses_few_statements(session, query_counter):
+    service = make_service(session)
+
+    with query_counter:
+        service.create_products((f"Product {i}", 1, 1.0) for i in range(1000))
+
+    # one INSERT ... RETURNING id
+    assert query_counter.count == 1
+
+
+def test_create_orders_links_products(session, query_counter):
+    service = make_service(session)
+    products = service.create_products((f"Product {i}", 10, 1.0) for i in range(3))
+
+    with query_counter:
+        orders = service.create_orders(
+            [products, products[:1]] * 300
+        )
+    session.commit()
+
+    # product prices, orders returning their ids, lines
+    assert query_counter.count == 3
+    assert [o.id for o in orders] == list(range(1, 601))
+    links = session.scalar(
+        select(func.count()).select_from(order_lines)  # pylint: disable=not-callable
+    )
+    assert links == 300 * 4
+    stored = SqlAlchemyOrderRepository(session).get(2)
+    assert [p.id for p in stored.products] == [products[0].id]
+
+
+def test_create_orders_with_unknown_product_fails(session):
+    service = make_service(session)
+    ghost = Product(id=404, name="ghost", quantity=1, price=1.0)
+
+    with pytest.raises(NoResultFound):
+        service.create_orders([[ghost]])
+
+
+def test_add_order_uses_single_product_lookup(session, query_counter):
+    service = make_service(session)
+    products = service.create_products((f"Product {i}", 10, 1.0) for i in range(5))
+    session.commit()
+    repo = SqlAlchemyOrderRepository(session)
+
+    with query_counter:
+        repo.add(Order(id=None, products=products + products[:1]))
+
+    assert query_counter.count == 1
+    session.commit()
+    assert len(repo.get(1).products) == 6
+
+
+def test_add_many_with_nothing_is_noop(session, query_counter):
+    with query_counter:
+        SqlAlchemyProductRepository(session).add_many([])
+        SqlAlchemyOrderRepository(session).add_many([])
+    assert query_counter.count == 0
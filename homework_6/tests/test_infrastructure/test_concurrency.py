@@ -0,0 +1,111 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlalchemy import event, text
+
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.database import (
+    create_warehouse_engine,
+    make_session_registry,
+    make_uow_factory,
+)
+from infrastructure.ids import HiLoIdAllocator
+
+
+def test_sqlite_connections_use_wal(wal_engine):
+    with wal_engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == 5000
+
+
+def test_non_sqlite_url_gets_sized_pool(mocker):
+    create_engine = mocker.patch("infrastructure.database.create_engine")
+
+    create_warehouse_engine("postgresql://localhost/warehouse", pool_size=4)
+
+    create_engine.assert_called_once_with(
+        "postgresql://localhost/warehouse", pool_size=4, max_overflow=20, pool_pre_ping=True
+    )
+
+
+def test_session_registry_is_thread_local(wal_engine):
+    registry = make_session_registry(wal_engine)
+
+    sessions = []
+    thread = threading.Thread(target=lambda: sessions.append(registry()))
+    thread.start()
+    thread.join()
+
+    assert registry() is registry()
+    assert sessions[0] is not registry()
+    registry.remove()
+
+
+def test_concurrent_orders_stress(wal_engine):
+    registry = make_session_registry(wal_engine)
+    allocator = HiLoIdAllocator(wal_engine, block_size=100)
+    uow_factory = make_uow_factory(registry, id_allocator=allocator, for_write=True)
+    with uow_factory() as uow:
+        products = WarehouseService(uow.products, uow.orders, uow.ids).create_products(
+            (f"Product {i}", 1000, 1.0) for i in range(10)
+        )
+    threads, orders_per_thread = 8, 25
+
+    def place_orders(worker):
+        for i in range(orders_per_thread):
+            with uow_factory() as uow:
+                service = WarehouseService(uow.products, uow.orders, uow.ids)
+                service.create_order([products[(worker + i) % 10]])
+        registry.remove()
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(place_orders, range(threads)))
+
+    with uow_factory() as uow:
+        assert len(uow.orders.list()) == threads * orders_per_thread
+
+
+def test_only_write_units_of_work_begin_immediate(wal_engine):
+    registry = make_session_registry(wal_engine)
+    begins = []
+
+    def record(_conn, _cursor, statement, *_args):
+        if statement.startswith("BEGIN"):
+            begins.append(statement)
+
+    event.listen(wal_engine, "before_cursor_execute", record)
+    with make_uow_factory(registry, for_write=True)() as uow:
+        uow.products.list()
+    with make_uow_factory(registry)() as uow:
+        uow.products.list()
+    event.remove(wal_engine, "before_cursor_execute", record)
+    registry.remove()
+
+    assert begins == ["BEGIN IMMEDIATE", "BEGIN DEFERRED"]
+
+
+def test_readers_do_not_wait_for_open_transactions(wal_engine):
+    registry = make_session_registry(wal_engine)
+    with make_uow_factory(registry, for_write=True)() as uow:
+        uow.products.add_many([Product(None, f"P{i}", 1, 1.0) for i in range(10)])
+
+    def read_page():
+        try:
+            with make_uow_factory(registry)() as uow:
+                return uow.products.list_page(limit=5)
+        finally:
+            registry.remove()
+
+    with make_uow_factory(registry)() as export, ThreadPoolExecutor(max_workers=2) as pool:
+        next(export.products.iter_all(batch_size=2))
+        started = time.perf_counter()
+        assert len(pool.submit(read_page).result()) == 5
+        with make_uow_factory(registry, for_write=True)() as writer:
+            writer.products.reserve(1, 1)
+            assert len(pool.submit(read_page).result()) == 5
+    registry.remove()
+
+    assert time.perf_counter() - started < 1.0
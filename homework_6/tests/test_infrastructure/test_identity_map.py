@@ -0,0 +1,122 @@
+from domain.models import Product
+from infrastructure.identity_map import IdentityMap, ProductCache
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def seed(session_factory, count=3):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        uow.products.add_many([
+            Product(id=None, name=f"Product {i}", quantity=10, price=1.0)
+            for i in range(count)
+        ])
+
+
+class TestIdentityMap:
+
+    def test_repeated_get_hits_database_once(self, session_factory, query_counter):
+        seed(session_factory)
+        uow = SqlAlchemyUnitOfWork(session_factory())
+
+        with query_counter:
+            first = uow.products.get(1)
+            second = uow.products.get(1)
+
+        assert first is second
+        assert query_counter.count == 1
+
+    def test_identity_map_is_per_unit_of_work(self, session_factory, query_counter):
+        seed(session_factory)
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            first = uow.products.get(1)
+
+        with query_counter:
+            with SqlAlchemyUnitOfWork(session_factory()) as uow:
+                second = uow.products.get(1)
+
+        assert first is not second
+        assert query_counter.count == 1
+
+    def test_added_products_are_served_from_map(self, session_factory, query_counter):
+        uow = SqlAlchemyUnitOfWork(session_factory())
+        products = [Product(id=None, name="A", quantity=1, price=1.0)]
+        uow.products.add_many(products)
+
+        with query_counter:
+            assert uow.products.get(products[0].id) is products[0]
+        assert query_counter.count == 0
+
+    def test_rollback_clears_map(self):
+        identity_map = IdentityMap()
+        identity_map.add(Product(id=1, name="A", quantity=1, price=1.0))
+        identity_map.mark_dirty(2)
+
+        identity_map.clear()
+
+        assert identity_map.get(1) is None
+        assert not identity_map.dirty
+
+
+class TestProductCache:
+
+    def test_cross_request_reads_skip_database(self, session_factory, query_counter):
+        seed(session_factory)
+        cache = ProductCache(ttl=60)
+        with SqlAlchemyUnitOfWork(session_factory(), product_cache=cache) as uow:
+            uow.products.get(2)
+
+        with query_counter:
+            with SqlAlchemyUnitOfWork(session_factory(), product_cache=cache) as uow:
+                product = uow.products.get(2)
+
+        assert product.name == "Product 1"
+        # only the empty commit of the second unit of work reaches the engine
+        assert not [s for s in query_counter.statements if s.startswith("SELECT")]
+
+    def test_entries_are_copies(self):
+        cache = ProductCache()
+        product = Product(id=1, name="A", quantity=1, price=1.0)
+        cache.put(product)
+        product.quantity = 0
+
+        cached = cache.get(1)
+
+        assert cached.quantity == 1
+        assert cached is not cache.get(1)
+
+    def test_entries_expire(self):
+        clock = FakeClock()
+        cache = ProductCache(ttl=5, clock=clock)
+        cache.put(Product(id=1, name="A", quantity=1, price=1.0))
+
+        clock.now = 4
+        assert cache.get(1) is not None
+        clock.now = 6
+        assert cache.get(1) is None
+        assert len(cache) == 0
+
+    def test_oldest_entry_is_evicted(self):
+        cache = ProductCache(max_size=2)
+        for product_id in (1, 2, 3):
+            cache.put(Product(id=product_id, name="A", quantity=1, price=1.0))
+
+        assert cache.get(1) is None
+        assert cache.get(3) is not None
+
+    def test_commit_invalidates_written_products(self, session_factory):
+        seed(session_factory)
+        cache = ProductCache()
+        cache.put(Product(id=4, name="stale", quantity=1, price=1.0))
+
+        with SqlAlchemyUnitOfWork(session_factory(), product_cache=cache) as uow:
+            uow.products.add_many([Product(id=None, name="fresh", quantity=1, price=1.0)])
+            cache.put(Product(id=4, name="stale", quantity=1, price=1.0))
+
+        assert cache.get(4) is None
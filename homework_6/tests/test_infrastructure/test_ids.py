@@ -0,0 +1,180 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.database import make_session_registry, make_uow_factory, run_in_uow
+from infrastructure.ids import HiLoIdAllocator, SnowflakeIdAllocator
+from infrastructure.orm import Base
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+@pytest.fixture(name="file_engine")
+def fixture_file_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ids.db'}")
+    Base.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+class TestHiLoIdAllocator:
+
+    def test_ids_are_sequential_within_block(self, engine):
+        allocator = HiLoIdAllocator(engine, block_size=10)
+
+        assert allocator.next_ids("products", 3) == [1, 2, 3]
+        assert allocator.next_id("products") == 4
+
+    def test_request_larger_than_block(self, engine):
+        allocator = HiLoIdAllocator(engine, block_size=4)
+
+        ids = allocator.next_ids("orders", 10)
+
+        assert ids == list(range(1, 11))
+
+    def test_first_block_starts_after_existing_rows(self, session_factory, engine):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            uow.products.add_many([
+                Product(id=None, name="old", quantity=1, price=1.0) for _ in range(5)
+            ])
+
+        assert HiLoIdAllocator(engine).next_id("products") == 6
+
+    def test_unique_across_threads_and_allocators(self, file_engine):
+        # two allocators stand in for two processes sharing the database
+        allocators = [HiLoIdAllocator(file_engine, block_size=7) for _ in range(2)]
+
+        def allocate(i):
+            return allocators[i % 2].next_ids("products", 5)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = [i for chunk in pool.map(allocate, range(200)) for i in chunk]
+
+        assert len(ids) == len(set(ids)) == 1000
+
+    def test_service_assigns_ids_without_database_round_trip(
+        self, session_factory, engine, query_counter
+    ):
+        allocator = HiLoIdAllocator(engine, block_size=100)
+        allocator.next_id("products")
+        uow = SqlAlchemyUnitOfWork(session_factory())
+        service = WarehouseService(uow.products, uow.orders, allocator)
+
+        with query_counter:
+            products = [service.create_product(f"P{i}", 1, 1.0) for i in range(3)]
+        assert query_counter.count == 0
+        assert [p.id for p in products] == [2, 3, 4]
+
+        order = service.create_order(products)
+        uow.commit()
+        assert uow.orders.get(order.id).products == products
+
+    def test_batch_create_uses_preallocated_ids(self, session_factory, engine, query_counter):
+        allocator = HiLoIdAllocator(engine, block_size=1000)
+        allocator.next_id("products")
+        uow = SqlAlchemyUnitOfWork(session_factory())
+        service = WarehouseService(uow.products, uow.orders, allocator)
+
+        with query_counter:
+            products = service.create_products(("P", 1, 1.0) for _ in range(50))
+
+        assert [p.id for p in products] == list(range(2, 52))
+        # a single executemany, no max(id) lookup
+        assert query_counter.count == 1
+
+
+class TestBoundIdAllocator:
+
+    def test_batch_create_claims_blocks_after_writing(self, file_engine):
+        allocator = HiLoIdAllocator(file_engine, block_size=4)
+        sessions = sessionmaker(bind=file_engine)
+
+        with SqlAlchemyUnitOfWork(sessions(), id_allocator=allocator) as uow:
+            service = WarehouseService(uow.products, uow.orders, uow.ids)
+            products = service.create_products(("P", 10, 1.0) for _ in range(3))
+            orders = service.create_orders([p] for p in products * 3)
+
+        assert [o.id for o in orders] == list(range(1, 10))
+
+    def test_place_order_claims_block_after_reserve(self, wal_engine):
+        allocator = HiLoIdAllocator(wal_engine, block_size=2)
+        registry = make_session_registry(wal_engine)
+        uow_factory = make_uow_factory(registry, id_allocator=allocator, for_write=True)
+        with uow_factory() as uow:
+            service = WarehouseService(uow.products, uow.orders, uow.ids)
+            product = service.create_product("P", 10, 1.0)
+
+        started = time.perf_counter()
+        orders = [
+            run_in_uow(uow_factory, lambda uow: WarehouseService(uow.products, uow.orders, uow.ids)
+                       .place_order([product]))
+            for _ in range(5)
+        ]
+        registry.remove()
+
+        assert time.perf_counter() - started < 1.0
+        assert [o.id for o in orders] == [1, 2, 3, 4, 5]
+
+    def test_block_claimed_in_rolled_back_transaction_is_dropped(self, session_factory, engine):
+        allocator = HiLoIdAllocator(engine, block_size=10)
+        with pytest.raises(ValueError):
+            with SqlAlchemyUnitOfWork(session_factory(), id_allocator=allocator) as uow:
+                assert uow.ids.next_id("orders") == 1
+                raise ValueError("Test exception")
+
+        # another process claims the same block again, so this one must not reuse it
+        assert HiLoIdAllocator(engine).next_id("orders") == 1
+        assert allocator.next_id("orders") == 1001
+
+    def test_committed_block_is_shared(self, session_factory, engine, query_counter):
+        allocator = HiLoIdAllocator(engine, block_size=10)
+        with SqlAlchemyUnitOfWork(session_factory(), id_allocator=allocator) as uow:
+            WarehouseService(uow.products, uow.orders, uow.ids).create_product("P", 1, 1.0)
+
+        with query_counter:
+            assert allocator.next_ids("products", 2) == [2, 3]
+        assert query_counter.count == 0
+
+
+class TestSnowflakeIdAllocator:
+
+    def test_layout(self):
+        def clock():
+            return (SnowflakeIdAllocator.EPOCH_MS + 5) / 1000
+
+        allocator = SnowflakeIdAllocator(worker_id=3, clock=clock)
+
+        first, second = allocator.next_ids("products", 2)
+
+        assert first == (5 << 22) | (3 << 12)
+        assert second == first + 1
+
+    def test_unique_and_increasing_across_threads(self):
+        allocator = SnowflakeIdAllocator(worker_id=1)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            ids = [i for chunk in pool.map(
+                lambda _: allocator.next_ids("orders", 100), range(50)
+            ) for i in chunk]
+
+        assert len(set(ids)) == 5000
+        assert all(0 < i < 1 << 63 for i in ids)
+
+    def test_sequence_overflow_waits_for_next_millisecond(self):
+        ticks = iter([0.0] + [0.0] * 4096 + [0.001] * 10)
+        allocator = SnowflakeIdAllocator(
+            worker_id=0, clock=lambda: SnowflakeIdAllocator.EPOCH_MS / 1000 + next(ticks)
+        )
+
+        ids = allocator.next_ids("products", 4097)
+
+        assert len(set(ids)) == 4097
+        assert ids[-1] >> 22 == 1
+
+    def test_worker_id_is_validated(self):
+        with pytest.raises(ValueError):
+            SnowflakeIdAllocator(worker_id=1024)
@@ -0,0 +1,82 @@
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from infrastructure.migrations import MIGRATIONS, applied_versions, migrate
+from infrastructure.orm import Base
+
+
+def describe(engine):
+    inspector = inspect(engine)
+    return {
+        table: (
+            [(c["name"], str(c["type"]), c["nullable"]) for c in inspector.get_columns(table)],
+            inspector.get_pk_constraint(table)["constrained_columns"],
+            sorted((i["name"], tuple(i["column_names"])) for i in inspector.get_indexes(table)),
+            sorted(
+                (tuple(fk["constrained_columns"]), fk["referred_table"])
+                for fk in inspector.get_foreign_keys(table)
+            ),
+        )
+        for table in inspector.get_table_names()
+        if table != "schema_migrations"
+    }
+
+
+@pytest.fixture(name="empty_engine")
+def fixture_empty_engine():
+    engine = create_engine("sqlite://")
+    yield engine
+    engine.dispose()
+
+
+def test_migrated_schema_matches_models(empty_engine):
+    assert migrate(empty_engine) == [m.version for m in MIGRATIONS]
+
+    reference = create_engine("sqlite://")
+    Base.metadata.create_all(reference)
+    assert describe(empty_engine) == describe(reference)
+
+
+def test_migrate_is_idempotent(empty_engine):
+    migrate(empty_engine)
+
+    assert not migrate(empty_engine)
+    assert applied_versions(empty_engine) == [m.version for m in MIGRATIONS]
+
+
+def test_order_links_become_order_lines(empty_engine):
+    migrate(empty_engine, MIGRATIONS[:2])
+    with empty_engine.begin() as conn:
+        conn.execute(text("INSERT INTO products VALUES (1, 'A', 5, 2.5), (2, 'B', 5, 3.0)"))
+        conn.execute(text("INSERT INTO orders VALUES (1), (2)"))
+        conn.execute(text(
+            "INSERT INTO order_product_assocoations VALUES (1, 1), (1, 1), (1, 2), (2, 2)"
+        ))
+
+    assert migrate(empty_engine, MIGRATIONS[:3]) == [3]
+
+    with empty_engine.connect() as conn:
+        lines = conn.execute(text("SELECT * FROM order_lines ORDER BY order_id, product_id"))
+        assert lines.all() == [(1, 1, 2, 2.5), (1, 2, 1, 3.0), (2, 2, 1, 3.0)]
+    assert "order_product_assocoations" not in inspect(empty_engine).get_table_names()
+
+
+def test_read_model_is_backfilled(empty_engine):
+    migrate(empty_engine, MIGRATIONS[:3])
+    with empty_engine.begin() as conn:
+        conn.execute(text("INSERT INTO products VALUES (1, 'A', 5, 2.5), (2, 'B', 4, 3.0)"))
+        conn.execute(text("INSERT INTO orders VALUES (1), (2), (3)"))
+        conn.execute(text(
+            "INSERT INTO order_lines VALUES (1, 1, 2, 2.5), (1, 2, 1, 3.0), (2, 2, 1, 3.0)"
+        ))
+
+    assert migrate(empty_engine) == [4]
+
+    with empty_engine.connect() as conn:
+        assert conn.execute(text("SELECT * FROM inventory_summary")).all() == [(1, 2, 9, 24.5)]
+        assert conn.execute(text("SELECT * FROM product_stats ORDER BY product_id")).all() == [
+            (1, 1, 2, 5.0), (2, 2, 2, 6.0)
+        ]
+        assert conn.execute(text("SELECT * FROM order_totals ORDER BY order_id")).all() == [
+            (1, 3, 8.0), (2, 1, 3.0), (3, 0, 0.0)
+        ]
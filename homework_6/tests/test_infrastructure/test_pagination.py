@@ -0,0 +1,72 @@
+import tracemalloc
+
+import pytest
+
+from domain.models import Order, Product
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+)
+
+
+def add_products(session, count):
+    products = [
+        Product(id=None, name=f"Product {i}", quantity=i, price=1.0) for i in range(count)
+    ]
+    SqlAlchemyProductRepository(session).add_many(products)
+    session.commit()
+    return products
+
+
+@pytest.mark.parametrize("after_id, limit, expected", [
+    (0, 3, [1, 2, 3]),
+    (3, 3, [4, 5, 6]),
+    (9, 3, [10]),
+    (10, 3, []),
+])
+def test_product_list_page(session, after_id, limit, expected):
+    add_products(session, 10)
+    repo = SqlAlchemyProductRepository(session)
+
+    assert [p.id for p in repo.list_page(after_id, limit)] == expected
+
+
+def test_product_iter_all_streams_every_row(session):
+    add_products(session, 25)
+    repo = SqlAlchemyProductRepository(session)
+
+    assert [p.id for p in repo.iter_all(batch_size=10)] == list(range(1, 26))
+
+
+def test_product_iter_all_memory_is_flat(session):
+    add_products(session, 20_000)
+    session.expunge_all()
+    repo = SqlAlchemyProductRepository(session)
+
+    tracemalloc.start()
+    count = sum(1 for _ in repo.iter_all(batch_size=500))
+    _, streamed_peak = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    listed = len(repo.list())
+    _, listed_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    assert count == listed == 20_000
+    assert streamed_peak * 5 < listed_peak
+
+
+def test_order_pages_and_iter_all(session, query_counter):
+    products = add_products(session, 2)
+    order_repo = SqlAlchemyOrderRepository(session)
+    order_repo.add_many([Order(id=None, products=products) for _ in range(7)])
+    session.commit()
+
+    page = order_repo.list_page(after_id=2, limit=3)
+    assert [o.id for o in page] == [3, 4, 5]
+    assert all(len(o.products) == 2 for o in page)
+
+    with query_counter:
+        orders = list(order_repo.iter_all(batch_size=3))
+    assert [o.id for o in orders] == list(range(1, 8))
+    # three pages, each one query for orders and one selectin query for products
+    assert query_counter.count == 6
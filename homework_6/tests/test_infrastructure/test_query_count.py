@@ -0,0 +1,79 @@
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from domain.models import Order, Product
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+)
+
+
+def populate(session, orders_count):
+    product_repo = SqlAlchemyProductRepository(session)
+    for i in range(3):
+        product_repo.add(Product(id=None, name=f"Product {i}", quantity=10, price=10.0))
+    session.commit()
+    products = product_repo.list()
+    order_repo = SqlAlchemyOrderRepository(session)
+    for _ in range(orders_count):
+        order_repo.add(Order(id=None, products=products))
+    session.commit()
+    session.expunge_all()
+
+
+@pytest.mark.parametrize("loading", ["core", "selectin", "joined"])
+@pytest.mark.parametrize("orders_count", [1, 10, 50])
+def test_order_list_uses_constant_number_of_queries(
+    session, query_counter, loading, orders_count
+):
+    populate(session, orders_count)
+    repo = SqlAlchemyOrderRepository(session, loading=loading)
+
+    with query_counter:
+        orders = repo.list()
+
+    assert len(orders) == orders_count
+    assert all(len(order.products) == 3 for order in orders)
+    assert query_counter.count == (1 if loading == "joined" else 2)
+
+
+def test_lazy_loading_issues_query_per_order(session, query_counter):
+    populate(session, 5)
+    repo = SqlAlchemyOrderRepository(session, loading="lazy")
+
+    with query_counter:
+        repo.list()
+
+    assert query_counter.count == 1 + 5
+
+
+@pytest.mark.parametrize("loading", ["core", "selectin", "joined"])
+def test_order_get_loads_products_eagerly(session, query_counter, loading):
+    populate(session, 3)
+    repo = SqlAlchemyOrderRepository(session, loading=loading)
+
+    with query_counter:
+        order = repo.get(2)
+
+    assert [p.name for p in order.products] == ["Product 0", "Product 1", "Product 2"]
+    assert query_counter.count == (1 if loading == "joined" else 2)
+
+
+def test_unknown_loading_policy_is_rejected(session):
+    with pytest.raises(KeyError):
+        SqlAlchemyOrderRepository(session, loading="eager")
+
+
+def test_core_loading_does_not_hydrate_orm_objects(session):
+    populate(session, 3)
+    repo = SqlAlchemyOrderRepository(session)
+
+    orders = repo.list()
+
+    assert [len(order.products) for order in orders] == [3, 3, 3]
+    assert not list(session.identity_map.values())
+
+
+def test_core_get_of_unknown_order_raises(session):
+    with pytest.raises(NoResultFound):
+        SqlAlchemyOrderRepository(session).get(1)
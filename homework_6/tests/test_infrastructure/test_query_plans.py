@@ -0,0 +1,95 @@
+import re
+
+import pytest
+
+from domain.models import Order, Product
+from domain.services import WarehouseService
+from infrastructure.ids import HiLoIdAllocator
+from infrastructure.repositories import (
+    SqlAlchemyOrderRepository,
+    SqlAlchemyProductRepository,
+)
+
+# "SCAN products" reads the whole table; "SCAN t USING COVERING INDEX i" the whole index
+FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW)")
+
+
+def populate(session):
+    products = [Product(id=None, name=f"Product {i}", quantity=100, price=1.0) for i in range(20)]
+    SqlAlchemyProductRepository(session).add_many(products)
+    SqlAlchemyOrderRepository(session).add_many(
+        [Order(id=None, products=products[i:i + 3]) for i in range(15)]
+    )
+    session.commit()
+    session.expunge_all()
+
+
+def explain(engine, statement, parameters):
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).all()
+    return [row[-1] for row in rows]
+
+
+def product_repo(session):
+    return SqlAlchemyProductRepository(session)
+
+
+def order_repo(session, loading="core"):
+    return SqlAlchemyOrderRepository(session, loading=loading)
+
+
+HOT_PATHS = {
+    "product get": lambda s: product_repo(s).get(5),
+    "product page": lambda s: product_repo(s).list_page(after_id=10, limit=5),
+    "product reserve": lambda s: product_repo(s).reserve(5, 1),
+    "order get": lambda s: order_repo(s).get(5),
+    "order page": lambda s: order_repo(s).list_page(after_id=10, limit=5),
+    "order get selectin": lambda s: order_repo(s, "selectin").get(5),
+    "order get joined": lambda s: order_repo(s, "joined").get(5),
+    "order add": lambda s: order_repo(s).add(Order(None, [Product(3, "", 0, 0)])),
+    "orders add": lambda s: order_repo(s).add_many([Order(None, [Product(3, "", 0, 0)])]),
+    "place order": lambda s: WarehouseService(product_repo(s), order_repo(s)).place_order(
+        [Product(3, "", 0, 0), Product(4, "", 0, 0)]
+    ),
+}
+
+
+@pytest.mark.parametrize("path", HOT_PATHS)
+def test_hot_path_does_not_scan_tables(engine, session, query_counter, path):
+    populate(session)
+
+    with query_counter:
+        HOT_PATHS[path](session)
+        session.flush()
+
+    plans = {
+        statement: explain(engine, statement, parameters)
+        for statement, parameters in zip(query_counter.statements, query_counter.parameters)
+        if not statement.lstrip().upper().startswith("INSERT")
+    }
+    assert plans
+    scans = {
+        statement: details
+        for statement, details in plans.items()
+        if any(FULL_SCAN.match(detail) for detail in details)
+    }
+    assert not scans
+
+
+def test_id_block_claim_does_not_scan_tables(engine, query_counter):
+    allocator = HiLoIdAllocator(engine, block_size=10)
+    allocator.next_id("orders")
+
+    with query_counter:
+        allocator.next_ids("orders", 20)
+
+    for statement, parameters in zip(query_counter.statements, query_counter.parameters):
+        assert not any(FULL_SCAN.match(d) for d in explain(engine, statement, parameters))
+
+
+def test_full_scan_is_detected(engine, session):
+    populate(session)
+
+    details = explain(engine, "SELECT * FROM order_lines WHERE quantity = ?", (1,))
+
+    assert any(FULL_SCAN.match(detail) for detail in details)
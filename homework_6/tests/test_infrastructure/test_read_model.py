@@ -0,0 +1,156 @@
+import asyncio
+
+import pytest
+from sqlalchemy.exc import NoResultFound
+
+from domain.exceptions import OutOfStock
+from domain.models import InventorySummary, OrderTotal, Product, ProductStats
+from domain.services import AsyncWarehouseService, WarehouseService
+from infrastructure.database import create_async_warehouse_engine, make_async_uow_factory
+from infrastructure.orm import Base
+from infrastructure.read_model import ReadModelChanges
+from infrastructure.repositories import SqlAlchemyOrderRepository
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def make_service(uow):
+    return WarehouseService(uow.products, uow.orders)
+
+
+def test_unit_of_work_maintains_aggregates(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        a, b = service.create_products([("A", 10, 2.0), ("B", 5, 3.0)])
+        service.create_product("C", 1, 100.0)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        service = make_service(uow)
+        service.place_order([a, b, b])
+        service.create_orders([[a], []])
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert uow.reports.inventory() == InventorySummary(products=3, units=13, value=127.0)
+        assert uow.reports.product_stats(b.id) == ProductStats(b.id, orders=1, units=2, revenue=6.0)
+        assert uow.reports.product_stats(a.id) == ProductStats(a.id, orders=2, units=2, revenue=4.0)
+        assert uow.reports.order_total(1) == OrderTotal(1, units=3, total=8.0)
+        assert uow.reports.order_total(3) == OrderTotal(3, units=0, total=0.0)
+
+
+def test_orders_added_without_ids_are_resolved_on_commit(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        product = make_service(uow).create_product("A", 10, 2.0)
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        make_service(uow).create_order([uow.products.list()[0]] * 2)
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert product.id is None
+        assert uow.reports.order_total(1) == OrderTotal(1, units=2, total=4.0)
+
+
+@pytest.mark.parametrize("loading", ["core", "selectin", "joined", "lazy"])
+def test_order_listing_a_product_twice_round_trips(session_factory, loading):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        a, b = make_service(uow).create_products([("A", 10, 2.0), ("B", 5, 3.0)])
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        make_service(uow).create_order([a, b, a])
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        order = SqlAlchemyOrderRepository(uow.session, loading=loading).get(1)
+        total = uow.reports.order_total(1)
+
+    assert sorted(p.name for p in order.products) == ["A", "A", "B"]
+    assert total == OrderTotal(1, units=len(order.products), total=7.0)
+
+
+def test_reports_match_a_full_recount(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        products = make_service(uow).create_products(
+            (f"Product {i}", 20 + i, 1.5 * i) for i in range(10)
+        )
+    for i in range(30):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            make_service(uow).place_order(products[i % 10:i % 10 + 3])
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        stored = uow.products.list()
+        orders = uow.orders.list()
+        inventory = uow.reports.inventory()
+        assert inventory.units == sum(p.quantity for p in stored)
+        assert inventory.value == pytest.approx(sum(p.quantity * p.price for p in stored))
+        for order in orders:
+            total = uow.reports.order_total(order.id).total
+            assert total == pytest.approx(sum(p.price for p in order.products))
+        assert sum(uow.reports.product_stats(p.id).orders for p in stored) == sum(
+            len(o.products) for o in orders
+        )
+
+
+def test_rollback_discards_deltas(session_factory):
+    with pytest.raises(OutOfStock):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            service = make_service(uow)
+            product = service.create_product("A", 1, 2.0)
+            uow.commit()
+            service.place_order([uow.products.list()[0]] * 2)
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert product.id is None
+        assert uow.reports.inventory() == InventorySummary(products=1, units=1, value=2.0)
+        assert not uow.read_model
+
+
+def test_empty_read_model_and_unknown_order(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert uow.reports.inventory() == InventorySummary()
+        assert uow.reports.product_stats(7) == ProductStats(7)
+        with pytest.raises(NoResultFound):
+            uow.reports.order_total(7)
+
+
+def test_reports_are_single_row_lookups(session_factory, query_counter):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        products = make_service(uow).create_products((f"P{i}", 10, 1.0) for i in range(50))
+        make_service(uow).create_orders([products] * 20)
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        with query_counter:
+            uow.reports.inventory()
+            uow.reports.order_total(5)
+            uow.reports.product_stats(5)
+
+    assert query_counter.count == 3
+
+
+def test_changes_without_orders_emit_one_statement():
+    changes = ReadModelChanges()
+    changes.products_added([Product(None, "A", 2, 1.5)])
+    changes.stock_reserved(1, 1.5)
+
+    assert (changes.products, changes.units, changes.value) == (1, 1, 1.5)
+    assert len(changes.statements("sqlite")) == 1
+
+
+def test_async_unit_of_work_maintains_aggregates(tmp_path):
+    async def main():
+        engine = create_async_warehouse_engine(f"sqlite:///{tmp_path / 'warehouse.db'}")
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        uow_factory = make_async_uow_factory(engine)
+        try:
+            async with uow_factory() as uow:
+                service = AsyncWarehouseService(uow.products, uow.orders)
+                products = await service.create_products([("A", 10, 2.0), ("B", 5, 3.0)])
+                await service.place_order(products)
+            async with uow_factory() as uow:
+                return (
+                    await uow.reports.inventory(),
+                    await uow.reports.order_total(1),
+                    await uow.reports.product_stats(2),
+                )
+        finally:
+            await engine.dispose()
+
+    inventory, total, stats = asyncio.run(main())
+
+    assert inventory == InventorySummary(products=2, units=13, value=30.0)
+    assert total == OrderTotal(1, units=2, total=5.0)
+    assert stats == ProductStats(2, orders=1, units=1, revenue=3.0)
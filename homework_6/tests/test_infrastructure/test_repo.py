@@ -2,13 +2,19 @@ from pytest_mock import MockerFixture
 from sqlalchemy.orm import Session
 
 from domain.models import Order, Product
-from infrastructure.orm import OrderORM, ProductORM
+from infrastructure.orm import OrderLineORM, OrderORM, ProductORM
 from infrastructure.repositories import (
     SqlAlchemyOrderRepository,
     SqlAlchemyProductRepository,
 )
 
 
+def line(order_id, product_orm):
+    return OrderLineORM(
+        order_id=order_id, product=product_orm, quantity=1, price=product_orm.price
+    )
+
+
 class TestSqlAlchemyProductRepository:
 
     def test_add_product_to_session(self, mocker: MockerFixture):
@@ -25,31 +31,24 @@ class TestSqlAlchemyProductRepository:
     def test_get_product_by_id(self, mocker: MockerFixture):
         mock_session = mocker.Mock(spec=Session)
         repo = SqlAlchemyProductRepository(mock_session)
-        product_orm = ProductORM(id=1, name="Test Product", quantity=10, price=100)
-        mock_session.query.return_value.filter_by.return_value.one.return_value = (
-            product_orm
-        )
+        mock_session.execute.return_value.one.return_value = (1, "Test Product", 10, 100)
 
         product = repo.get(1)
 
-        mock_session.query.assert_called_once_with(ProductORM)
-        assert (
-            product.__dict__
-            == Product(id=1, name="Test Product", quantity=10, price=100).__dict__
-        )
+        mock_session.execute.assert_called_once()
+        assert product == Product(id=1, name="Test Product", quantity=10, price=100)
 
     def test_list_all_products(self, mocker: MockerFixture):
         mock_session = mocker.Mock(spec=Session)
         repo = SqlAlchemyProductRepository(mock_session)
-        products_orm = [
-            ProductORM(id=1, name="Product 1", quantity=10, price=100),
-            ProductORM(id=2, name="Product 2", quantity=20, price=200),
+        mock_session.execute.return_value = [
+            (1, "Product 1", 10, 100),
+            (2, "Product 2", 20, 200),
         ]
-        mock_session.query.return_value.all.return_value = products_orm
 
         products = repo.list()
 
-        mock_session.query.assert_called_once_with(ProductORM)
+        mock_session.execute.assert_called_once()
         assert [p.id for p in products] == [1, 2]
 
 
@@ -63,28 +62,25 @@ class TestSqlAlchemyOrderRepository:
         product2 = Product(id=2, name="Product 2", quantity=20, price=200)
         order = Order(id=42, products=[product1, product2])
 
-        product_orm1 = ProductORM(id=1, name="Product 1", quantity=10, price=100)
-        product_orm2 = ProductORM(id=2, name="Product 2", quantity=20, price=200)
-        mock_session.query.return_value.filter_by.return_value.one.side_effect = [
-            product_orm1,
-            product_orm2,
-        ]
+        mock_session.execute.return_value = [(1, 100), (2, 200)]
 
         repo.add(order)
 
         mock_session.add.assert_called_once()
         added_order_orm = mock_session.add.call_args[0][0]
-        assert [p.id for p in added_order_orm.products] == [1, 2]
+        assert [(line.product_id, line.price) for line in added_order_orm.lines] == [
+            (1, 100),
+            (2, 200),
+        ]
 
     def test_get_order_by_id_with_products(self, mocker: MockerFixture):
         mock_session = mocker.Mock(spec=Session)
-        repo = SqlAlchemyOrderRepository(mock_session)
+        repo = SqlAlchemyOrderRepository(mock_session, loading="selectin")
         product_orm1 = ProductORM(id=1, name="Product 1", quantity=10, price=100)
         product_orm2 = ProductORM(id=2, name="Product 2", quantity=20, price=200)
-        order_orm = OrderORM(id=1, products=[product_orm1, product_orm2])
-        mock_session.query.return_value.filter_by.return_value.one.return_value = (
-            order_orm
-        )
+        order_orm = OrderORM(id=1, lines=[line(1, product_orm1), line(1, product_orm2)])
+        query = mock_session.query.return_value.options.return_value
+        query.filter_by.return_value.one.return_value = order_orm
 
         order = repo.get(1)
 
@@ -93,14 +89,33 @@ class TestSqlAlchemyOrderRepository:
 
     def test_list_all_orders_with_their_products(self, mocker: MockerFixture):
         mock_session = mocker.Mock(spec=Session)
-        repo = SqlAlchemyOrderRepository(mock_session)
+        repo = SqlAlchemyOrderRepository(mock_session, loading="selectin")
         product_orm1 = ProductORM(id=1, name="Product 1", quantity=10, price=100)
         product_orm2 = ProductORM(id=2, name="Product 2", quantity=20, price=200)
-        order_orm1 = OrderORM(id=1, products=[product_orm1, product_orm2])
-        order_orm2 = OrderORM(id=2, products=[product_orm1])
-        mock_session.query.return_value.all.return_value = [order_orm1, order_orm2]
+        order_orm1 = OrderORM(id=1, lines=[line(1, product_orm1), line(1, product_orm2)])
+        order_orm2 = OrderORM(id=2, lines=[line(2, product_orm1)])
+        query = mock_session.query.return_value.options.return_value
+        query.all.return_value = [order_orm1, order_orm2]
 
         orders = repo.list()
 
         mock_session.query.assert_called_once_with(OrderORM)
         assert [(o.id, len(o.products)) for o in orders] == [(1, 2), (2, 1)]
+
+    def test_list_orders_from_rows_without_orm_objects(self, mocker: MockerFixture):
+        mock_session = mocker.Mock(spec=Session)
+        repo = SqlAlchemyOrderRepository(mock_session)
+        mock_session.scalars.return_value = [1, 2]
+        mock_session.execute.return_value = [
+            (1, 1, 1, "Product 1", 10, 100),
+            (1, 1, 2, "Product 2", 20, 200),
+            (2, 2, 1, "Product 1", 10, 100),
+        ]
+
+        orders = repo.list()
+
+        mock_session.query.assert_not_called()
+        assert [(o.id, [p.id for p in o.products]) for o in orders] == [
+            (1, [1, 2]),
+            (2, [1, 1]),
+        ]
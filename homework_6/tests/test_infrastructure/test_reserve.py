@@ -0,0 +1,132 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy.exc import NoResultFound, OperationalError
+
+from domain.exceptions import OutOfStock
+from domain.models import Product
+from domain.services import WarehouseService
+from infrastructure.database import make_session_registry, make_uow_factory, run_in_uow
+from infrastructure.identity_map import ProductCache
+from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
+
+
+def seed(session_factory, quantity=10):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        uow.products.add_many([
+            Product(id=None, name="A", quantity=quantity, price=1.0),
+            Product(id=None, name="B", quantity=quantity, price=2.0),
+        ])
+
+
+def test_reserve_decrements_stock(session_factory):
+    seed(session_factory)
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert uow.products.reserve(1, 3) == 7
+        assert uow.products.reserve(1, 7) == 0
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert uow.products.get(1).quantity == 0
+        assert uow.products.get(2).quantity == 10
+
+
+def test_reserve_more_than_stock_raises_and_keeps_quantity(session_factory):
+    seed(session_factory)
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        with pytest.raises(OutOfStock) as excinfo:
+            uow.products.reserve(1, 11)
+        assert uow.products.get(1).quantity == 10
+
+    assert (excinfo.value.product_id, excinfo.value.requested) == (1, 11)
+
+
+def test_reserve_unknown_product_raises(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        with pytest.raises(NoResultFound):
+            uow.products.reserve(42, 1)
+
+
+def test_reserve_refreshes_identity_map_and_cache(session_factory):
+    seed(session_factory)
+    cache = ProductCache()
+    with SqlAlchemyUnitOfWork(session_factory(), product_cache=cache) as uow:
+        assert uow.products.get(1).quantity == 10
+        uow.products.reserve(1, 4)
+        assert uow.products.get(1).quantity == 6
+
+    assert cache.get(1) is None
+
+
+def test_place_order_rolls_back_all_reservations(session_factory):
+    seed(session_factory, quantity=1)
+
+    with pytest.raises(OutOfStock):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            service = WarehouseService(uow.products, uow.orders)
+            service.place_order([uow.products.get(1), uow.products.get(2), uow.products.get(2)])
+
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        assert [p.quantity for p in uow.products.list()] == [1, 1]
+        assert not uow.orders.list()
+
+
+def test_concurrent_orders_never_oversell(wal_engine):
+    registry = make_session_registry(wal_engine)
+    uow_factory = make_uow_factory(registry, for_write=True)
+    seed(registry, quantity=50)
+    registry.remove()
+
+    def place(_):
+        try:
+            run_in_uow(uow_factory, lambda uow: WarehouseService(uow.products, uow.orders)
+                       .place_order([Product(id=1, name="A", quantity=0, price=1.0)]))
+            return True
+        except OutOfStock:
+            return False
+        finally:
+            registry.remove()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        placed = sum(pool.map(place, range(80)))
+
+    with uow_factory() as uow:
+        assert placed == 50
+        assert uow.products.get(1).quantity == 0
+        assert len(uow.orders.list()) == 50
+
+
+def fake_uow(mocker):
+    uow = mocker.MagicMock()
+    uow.__enter__.return_value = uow
+    uow.__exit__.return_value = False
+    return uow
+
+
+def test_run_in_uow_retries_operational_errors(mocker):
+    uow = fake_uow(mocker)
+    work = mocker.Mock(side_effect=[OperationalError("UPDATE", {}, Exception("locked")), "done"])
+    sleep = mocker.Mock()
+
+    assert run_in_uow(lambda: uow, work, sleep=sleep) == "done"
+    assert work.call_count == 2
+    sleep.assert_called_once()
+
+
+def test_run_in_uow_gives_up_after_attempts(mocker):
+    uow = fake_uow(mocker)
+    work = mocker.Mock(side_effect=OperationalError("UPDATE", {}, Exception("locked")))
+
+    with pytest.raises(OperationalError):
+        run_in_uow(lambda: uow, work, attempts=3, sleep=mocker.Mock())
+    assert work.call_count == 3
+
+
+def test_run_in_uow_does_not_retry_out_of_stock(mocker):
+    uow = fake_uow(mocker)
+    work = mocker.Mock(side_effect=OutOfStock(1, 1))
+
+    with pytest.raises(OutOfStock):
+        run_in_uow(lambda: uow, work)
+    assert work.call_count == 1
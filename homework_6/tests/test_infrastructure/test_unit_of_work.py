@@ -1,6 +1,9 @@
 import pytest
 from pytest_mock import MockerFixture
 from sqlalchemy.orm import Session
+from domain.models import InventorySummary, Order, Product
+from domain.services import WarehouseService
+from infrastructure.database import make_session_registry, make_uow_factory
 from infrastructure.unit_of_work import SqlAlchemyUnitOfWork
 
 
@@ -52,3 +55,114 @@ class TestSqlAlchemyUnitOfWork:
             mock_session.commit.call_count,
             mock_session.close.call_count,
         ) == (1, 0, 1)
+
+
+def products_in(session_factory):
+    with SqlAlchemyUnitOfWork(session_factory()) as uow:
+        return uow.products.list()
+
+
+class TestChangeTracking:
+
+    def test_read_only_unit_of_work_skips_commit(self, session_factory, mocker):
+        session = session_factory()
+        commit = mocker.spy(session, "commit")
+
+        with SqlAlchemyUnitOfWork(session) as uow:
+            uow.products.list()
+            uow.commit()
+
+        assert commit.call_count == 0
+
+    def test_explicit_commit_inside_block_commits_once(self, session_factory, mocker):
+        session = session_factory()
+        commit = mocker.spy(session, "commit")
+
+        with SqlAlchemyUnitOfWork(session) as uow:
+            uow.products.add(Product(id=None, name="A", quantity=1, price=1.0))
+            uow.commit()
+
+        assert commit.call_count == 1
+        assert len(products_in(session_factory)) == 1
+
+    def test_registered_objects_are_flushed_in_batches(self, session_factory, query_counter):
+        products = [Product(None, f"P{i}", 10, 2.0) for i in range(100)]
+        with query_counter:
+            with SqlAlchemyUnitOfWork(session_factory()) as uow:
+                for product in products:
+                    uow.register_new(product)
+                for i in range(50):
+                    uow.register_new(Order(None, products[i:i + 2]))
+                assert query_counter.count == 0
+
+        inserts = [s for s in query_counter.statements if s.startswith("INSERT")]
+        # products, orders and their lines, then the three read model tables
+        assert len(inserts) == 6
+        assert len(products_in(session_factory)) == 100
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            assert uow.orders.get(50).products == products[49:51]
+
+    def test_dirty_products_are_updated_together(self, session_factory, query_counter):
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            for i in range(3):
+                uow.register_new(Product(None, f"P{i}", 10, 2.0))
+
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            products = uow.products.list()
+            for product in products:
+                product.quantity += 5
+                uow.register_dirty(product)
+                uow.register_dirty(product)
+            with query_counter:
+                uow.commit()
+
+        assert sum(s.startswith("UPDATE products") for s in query_counter.statements) == 1
+        assert [p.quantity for p in products_in(session_factory)] == [15, 15, 15]
+        with SqlAlchemyUnitOfWork(session_factory()) as uow:
+            assert uow.reports.inventory() == InventorySummary(products=3, units=45, value=90.0)
+
+    def test_register_rejects_unknown_objects(self, session_factory):
+        uow = SqlAlchemyUnitOfWork(session_factory())
+
+        with pytest.raises(TypeError):
+            uow.register_new("product")
+        with pytest.raises(ValueError):
+            uow.register_dirty(Product(None, "A", 1, 1.0))
+
+    def test_group_commit_defers_commits(self, session_factory, mocker):
+        session = session_factory()
+        commit = mocker.spy(session, "commit")
+
+        with SqlAlchemyUnitOfWork(session, group_commit=4) as uow:
+            service = WarehouseService(uow.products, uow.orders)
+            for i in range(10):
+                service.create_product(f"P{i}", 1, 1.0)
+                uow.commit()
+            assert commit.call_count == 2
+
+        assert commit.call_count == 3
+        assert len(products_in(session_factory)) == 10
+
+    def test_rollback_discards_deferred_commits(self, session_factory):
+        with pytest.raises(ValueError):
+            with SqlAlchemyUnitOfWork(session_factory(), group_commit=10) as uow:
+                uow.register_new(Product(None, "A", 1, 1.0))
+                uow.commit()
+                raise ValueError("Test exception")
+
+        assert not products_in(session_factory)
+
+    def test_reused_session_keeps_one_write_tracker(self, engine):
+        registry = make_session_registry(engine)
+        uow_factory = make_uow_factory(registry)
+
+        for i in range(20):
+            with uow_factory() as uow:
+                uow.register_new(Product(None, f"P{i}", 1, 1.0))
+
+        session = registry()
+        assert len(session.dispatch.after_flush) == 1
+        assert len(session.dispatch.do_orm_execute) == 1
+        with uow_factory() as uow:
+            assert not uow.has_writes()
+        registry.remove()
@@ -1,13 +1,46 @@
 """Module for simple http server"""
 import argparse
+import collections
+import email.utils
+import errno
+import functools
+import gzip
 import os
+import selectors
 import socket
 import multiprocessing
+import time
 import urllib.parse
 import mimetypes
-from datetime import datetime
+from http import HTTPStatus
+from typing import NamedTuple
 
 CRLF = "\r\n"
+MAX_REQUEST_SIZE = 8192
+IDLE_TIMEOUT = 10
+MAX_KEEPALIVE_REQUESTS = 100
+# seconds the event loop stops accepting after running out of file descriptors
+ACCEPT_BACKOFF = 0.1
+
+# Everything constant about a response head is assembled once at import
+STATUS_LINES = {status.value: f"HTTP/1.1 {status.value} {status.phrase}{CRLF}".encode()
+                for status in HTTPStatus}
+SERVER_HEADER = b"Server: httpd/0.1\r\n"
+KEEP_ALIVE_END = b"Connection: keep-alive\r\n\r\n"
+CLOSE_END = b"Connection: close\r\n\r\n"
+MIME_TYPES = {
+    **mimetypes.types_map,
+    ".js": "application/javascript",
+    ".swf": "application/x-shockwave-flash",
+}
+COMPRESSIBLE_TYPES = frozenset({
+    "application/javascript", "application/json", "application/xml", "image/svg+xml",
+})
+VARY_HEADER = b"Vary: Accept-Encoding\r\n"
+GZIP_HEADER = b"Content-Encoding: gzip\r\n"
+# smaller files gain nothing from gzip, larger ones are only served precompressed
+MIN_GZIP_SIZE = 256
+MAX_GZIP_SIZE = 2**20
 
 def parse_args():
     """Parser"""
@@ -15,95 +48,563 @@ def parse_args():
     parser.add_argument("-r", dest="root", type=str, default='src', help="Document root")
     parser.add_argument("-w", dest="workers", type=int, default=4, help="Number of workers")
     parser.add_argument("-p", dest="port", type=int, default=80, help="Port to bind")
+    parser.add_argument("--engine", choices=["prefork", "epoll"], default="prefork",
+                        help="prefork: blocking accept() per worker, "
+                             "epoll: event loop with non-blocking sockets per worker")
+    parser.add_argument("--cache-size", type=int, default=64,
+                        help="MiB of small files each worker keeps in memory, 0 disables the cache")
+    parser.add_argument("--cache-file-size", type=int, default=256,
+                        help="KiB, larger files are always sent from disk")
+    parser.add_argument("--cache-check", type=float, default=1.0,
+                        help="Seconds between stat() checks of a cached file")
     return parser.parse_args()
 
-def start_worker(server_socket, document_root):
+def start_worker(server_socket, document_root, cache=None):
     """Starts worker"""
     while True:
         client_socket, _ = server_socket.accept()
-        handle_client(client_socket, document_root)
+        handle_client(client_socket, document_root, cache)
 
-def handle_client(client_socket, document_root):
-    """Handle request"""
+def handle_client(client_socket, document_root, cache=None):
+    """Serve one request and close the connection.
+    A worker serves one connection at a time, so an idle keep-alive client would hold
+    the whole worker; keep-alive is left to the epoll engine"""
+    client_socket.settimeout(IDLE_TIMEOUT)
+    buffer = b""
+    served = 0
     try:
-        request = client_socket.recv(4096).decode('utf-8', errors='ignore')
-        if not request:
-            client_socket.close()
-            return
+        while True:
+            split = next_request(buffer)
+            if split is None:
+                if len(buffer) > MAX_REQUEST_SIZE:
+                    send_parts(client_socket, [format_response(400)])
+                    return
+                data = client_socket.recv(4096)
+                if not data:
+                    return
+                buffer += data
+                continue
+            request, buffer = split
+            served += 1
+            response, keep_alive = serve_request(request, document_root, served, cache,
+                                                 max_requests=1)
+            send_parts(client_socket, response)
+            if not keep_alive:
+                return
+    except OSError:
+        pass
+    finally:
+        client_socket.close()
+
+def send_parts(client_socket, parts):
+    """Send response parts from a blocking socket, file bodies with sendfile.
+    The socket is corked meanwhile so the headers share a segment with the body"""
+    set_cork(client_socket, True)
+    try:
+        for part in parts:
+            if isinstance(part, FileBody):
+                if part.remaining:
+                    client_socket.sendfile(part.file, part.offset, part.remaining)
+            else:
+                client_socket.sendall(part)
+    finally:
+        for part in parts:
+            if isinstance(part, FileBody):
+                part.file.close()
+        set_cork(client_socket, False)
+
+def set_cork(client_socket, corked):
+    """Hold back partial segments while corked, uncorking sends what is pending"""
+    if hasattr(socket, "TCP_CORK"):
+        client_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_CORK, int(corked))
 
-        lines = request.splitlines()
-        if not lines:
-            client_socket.close()
-            return
+class FileBody:
+    """Part of an open file still to be sent with sendfile"""
 
-        request_line = lines[0]
-        parts = request_line.split()
-        if len(parts) < 3:
-            send_response(client_socket, 400, "Bad Request")
-            return
+    def __init__(self, file, size, offset=0):
+        self.file = file
+        self.offset = offset
+        self.remaining = size
 
-        method, raw_path, _ = parts
-        path = urllib.parse.unquote(raw_path.split("?")[0])
+def next_request(buffer):
+    """Split the first complete request off the buffer: (request text, rest of the buffer),
+    None while the request is incomplete. Bodies are skipped by Content-Length"""
+    buffer = buffer.lstrip(b"\r\n")
+    ends = [(buffer.find(separator), len(separator)) for separator in (b"\r\n\r\n", b"\n\n")]
+    found = [(end, size) for end, size in ends if end != -1]
+    if not found:
+        return None
+    end, size = min(found)
+    head = buffer[:end].decode('utf-8', errors='ignore')
+    request_end = end + size + content_length(head)
+    if len(buffer) < request_end:
+        return None
+    return head, buffer[request_end:]
 
-        if not path.startswith("/"):
-            send_response(client_socket, 400, "Bad Request")
-            return
+def header_values(request):
+    """Request headers by lower-case name"""
+    headers = {}
+    for line in request.splitlines()[1:]:
+        name, _, value = line.partition(":")
+        headers[name.strip().lower()] = value.strip()
+    return headers
 
-        fs_path = os.path.normpath(os.path.join(document_root, path.lstrip("/")))
+def content_length(request):
+    """Length of the request body, 0 when absent or malformed"""
+    try:
+        return max(int(header_values(request).get("content-length", 0)), 0)
+    except ValueError:
+        return 0
 
-        if not fs_path.startswith(os.path.abspath(document_root)):
-            send_response(client_socket, 403, "Forbidden")
-            return
+def wants_keep_alive(request):
+    """HTTP/1.1 keeps connections open unless asked to close, HTTP/1.0 only when asked to"""
+    lines = request.splitlines()
+    parts = lines[0].split() if lines else []
+    if len(parts) != 3:
+        return False
+    connection = header_values(request).get("connection", "").lower()
+    if parts[2] == "HTTP/1.1":
+        return connection != "close"
+    return connection == "keep-alive"
 
-        if raw_path.endswith("/") and not os.path.isdir(fs_path):
-            send_response(client_socket, 404, "Not Found")
-            return
+def serve_request(request, document_root, served, cache=None,
+                  max_requests=MAX_KEEPALIVE_REQUESTS):
+    """Response to the served-th request of a connection and whether to keep the connection.
+    A file that cannot be read (unreadable, removed meanwhile) gets an error response
+    and closes the connection instead of failing the worker"""
+    keep_alive = served < max_requests and wants_keep_alive(request)
+    try:
+        return build_response(request, document_root, keep_alive, cache), keep_alive
+    except PermissionError:
+        return [format_response(403)], False
+    except FileNotFoundError:
+        return [format_response(404)], False
+    except OSError:
+        return [format_response(500)], False
 
-        if os.path.isdir(fs_path):
-            fs_path = os.path.join(fs_path, "index.html")
+class Request(NamedTuple):
+    """Method, decoded path and headers of a request"""
+    method: str
+    path: str
+    headers: dict
+    keep_alive: bool
 
-        if not os.path.exists(fs_path):
-            send_response(client_socket, 404, "Not Found")
-            return
+def build_response(request, document_root, keep_alive=False, cache=None):
+    """Response parts for a request: head bytes, then the body as bytes or a FileBody"""
+    request_line = request.splitlines()[0] if request else ""
+    parts = request_line.split()
+    if len(parts) < 3:
+        return [format_response(400)]
 
+    method, raw_path, _ = parts
+    path = urllib.parse.unquote(raw_path.split("?")[0])
 
-        if method not in ["GET", "HEAD"]:
-            send_response(client_socket, 405, "Method Not Allowed")
-            return
+    if not path.startswith("/"):
+        return [format_response(400, keep_alive)]
 
-        with open(fs_path, "rb") as f:
-            content = f.read()
+    parsed = Request(method, path, header_values(request), keep_alive)
+    cached = cache.get(path) if cache is not None and method in ("GET", "HEAD") else None
+    if cached is not None:
+        return file_parts(parsed, negotiate(parsed, cached, cache) or cached)
 
-        send_response(client_socket, 200, "OK", content, fs_path, head_only=(method == "HEAD"))
-    finally:
-        client_socket.close()
+    fs_path = os.path.normpath(os.path.join(document_root, path.lstrip("/")))
+
+    if not fs_path.startswith(os.path.abspath(document_root)):
+        return [format_response(403, keep_alive)]
+
+    if raw_path.endswith("/") and not os.path.isdir(fs_path):
+        return [format_response(404, keep_alive)]
+
+    if os.path.isdir(fs_path):
+        fs_path = os.path.join(fs_path, "index.html")
+
+    if not os.path.exists(fs_path):
+        return [format_response(404, keep_alive)]
+
+    if method not in ["GET", "HEAD"]:
+        return [format_response(405, keep_alive)]
+
+    return file_response(parsed, fs_path, cache)
+
+def file_response(request, fs_path, cache):
+    """Response parts for an existing file, small files are read into the cache"""
+    static = StaticFile(fs_path, os.stat(fs_path))
+    if cache is not None and request.method == "GET" and static.size <= cache.max_file_size:
+        static = cache.put(request.path, read_static(fs_path))
+    return file_parts(request, negotiate(request, static, cache) or static)
+
+def read_static(fs_path, identity=None):
+    """StaticFile with the content of the file in memory"""
+    with open(fs_path, "rb") as file:
+        return StaticFile(fs_path, os.fstat(file.fileno()), file.read(), identity)
+
+def negotiate(request, static, cache):
+    """gzip variant of a text file for a client accepting it, None if there is none.
+    A precompressed file.gz next to the file is preferred, otherwise the file is
+    compressed once and the result kept in the cache next to the plain one"""
+    if not compressible(static.content_type) or not accepts_gzip(request.headers):
+        return None
+    key = (request.path, "gzip")
+    variant = cache.get(key) if cache is not None else None
+    if variant is not None:
+        return variant
+    try:
+        stat = os.stat(static.fs_path + ".gz")
+    except OSError:
+        stat = None
+    if stat is not None and (cache is None or stat.st_size > cache.max_file_size):
+        return StaticFile(static.fs_path + ".gz", stat, identity=static)
+    if stat is not None:
+        variant = read_static(static.fs_path + ".gz", static)
+    elif cache is not None and MIN_GZIP_SIZE <= static.size <= MAX_GZIP_SIZE:
+        source = static if static.body is not None else read_static(static.fs_path)
+        variant = StaticFile(source.fs_path, source.stat,
+                             gzip.compress(source.body, compresslevel=9, mtime=0), source)
+    else:
+        return None
+    return cache.put(key, variant)
+
+def compressible(content_type):
+    """Whether a type is text worth compressing"""
+    return content_type.startswith("text/") or content_type in COMPRESSIBLE_TYPES
+
+def accepts_gzip(headers):
+    """Whether Accept-Encoding allows gzip, explicitly or through *, with a q above 0"""
+    weights = {}
+    for coding in headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.partition(";")
+        weight = params.strip()
+        try:
+            weights[name.strip().lower()] = float(weight[2:]) if weight[:2] == "q=" else 1.0
+        except ValueError:
+            weights[name.strip().lower()] = 0.0
+    return weights.get("gzip", weights.get("x-gzip", weights.get("*", 0.0))) > 0
+
+def file_parts(request, static):
+    """Answer with a 304, a 206 for a single satisfiable range, a 416 or the whole file.
+    The body comes from static.body or is sent from disk with sendfile"""
+    if not_modified(request.headers, static):
+        code, start, length = 304, 0, 0
+        head = status_head(304) + static.validators
+    else:
+        code, start, length = requested_range(request.headers, static)
+        if code == 200:
+            head = status_head(200) + static.headers
+        elif code == 206:
+            content_range = (start, start + length - 1, static.size)
+            head = (status_head(206) + static.encoding + entity_headers(length, static.content_type)
+                    + b"Content-Range: bytes %d-%d/%d\r\n" % content_range + static.validators)
+        else:
+            head = (status_head(416) + entity_headers(0, "text/plain")
+                    + b"Content-Range: bytes */%d\r\n" % static.size)
+    parts = [head + connection_header(request.keep_alive)]
+    if request.method == "HEAD" or not length:
+        return parts
+    if static.body is None:
+        # large files are never read into memory, the file is closed once sent
+        file = open(static.fs_path, "rb")  # pylint: disable=consider-using-with
+        parts.append(FileBody(file, length, start))
+    else:
+        parts.append(memoryview(static.body)[start:start + length] if code == 206 else static.body)
+    return parts
+
+def not_modified(headers, static):
+    """If-None-Match wins over If-Modified-Since, as RFC 9110 asks"""
+    if "if-none-match" in headers:
+        tags = [tag.strip().removeprefix("W/") for tag in headers["if-none-match"].split(",")]
+        return "*" in tags or static.etag in tags
+    if "if-modified-since" in headers:
+        try:
+            since = email.utils.parsedate_to_datetime(headers["if-modified-since"])
+        except (TypeError, ValueError):
+            return False
+        return int(static.stat.st_mtime) <= since.timestamp()
+    return False
 
-def send_response(client_socket, code, status, body=b"", fs_path=None, head_only=False):
-    """Send response formatted for http"""
-    headers = [
-        f"HTTP/1.1 {code} {status}",
-        f"Date: {http_date()}",
-        "Server: httpd/0.1",
-        f"Content-Length: {len(body)}",
-        f"Content-Type: {get_mime_type(fs_path)}" if fs_path else "Content-Type: text/plain",
-        "Connection: close",
-        ""
-    ]
-    response_headers = CRLF.join(headers) + CRLF
-
-    if head_only:
-        client_socket.sendall(response_headers.encode())
+def requested_range(headers, static):
+    """(status, first byte, length) for the Range header. Multiple ranges, malformed
+    ranges and ranges of a changed entity (If-Range) are ignored, giving the whole file"""
+    whole = (200, 0, static.size)
+    unit, _, spec = headers.get("range", "").partition("=")
+    if unit.strip() != "bytes" or "," in spec:
+        return whole
+    if_range = headers.get("if-range")
+    if if_range is not None and if_range not in (static.etag, static.last_modified):
+        return whole
+    first, dash, last = spec.strip().partition("-")
+    if not dash or not (first or last) or not (first + last).isdigit():
+        return whole
+    if not first:
+        # suffix range: the last n bytes
+        start, end = max(static.size - int(last), 0), static.size - 1
     else:
-        client_socket.sendall(response_headers.encode() + body)
+        start = int(first)
+        end = min(int(last), static.size - 1) if last else static.size - 1
+        if last and int(last) < start:
+            return whole
+    if start >= static.size or end < start:
+        return 416, 0, 0
+    return 206, start, end - start + 1
+
+def format_head(code, length, content_type="text/plain", keep_alive=False):
+    """Status line and headers formatted for http"""
+    return (status_head(code) + entity_headers(length, content_type)
+            + connection_header(keep_alive))
+
+def status_head(code):
+    """Status line and the headers every response has"""
+    return STATUS_LINES[code] + date_header(int(time.time())) + SERVER_HEADER
+
+def entity_headers(length, content_type):
+    """Headers describing the body"""
+    return b"Content-Length: %d\r\nContent-Type: %s\r\n" % (length, content_type.encode())
+
+def connection_header(keep_alive):
+    """Connection header and the empty line ending the head"""
+    return KEEP_ALIVE_END if keep_alive else CLOSE_END
+
+def format_response(code, keep_alive=False):
+    """Response without body formatted for http"""
+    return format_head(code, 0, keep_alive=keep_alive)
+
+class StaticFile:
+    """A file to serve, with its prebuilt headers and the stat data they were built from.
+    body holds the content of files kept in the cache. A gzip variant names the plain
+    file it encodes as identity; its body may be compressed from that file's content"""
+    __slots__ = ("fs_path", "stat", "content_type", "body", "size", "encoding", "etag",
+                 "last_modified", "validators", "headers", "checked_at")
+
+    def __init__(self, fs_path, stat, body=None, identity=None):
+        self.fs_path = fs_path
+        self.stat = stat
+        self.content_type = identity.content_type if identity else get_mime_type(fs_path)
+        self.body = body
+        self.size = stat.st_size if body is None else len(body)
+        self.encoding = GZIP_HEADER if identity else b""
+        self.etag = f'"{stat.st_mtime_ns:x}-{self.size:x}{"-gz" if identity else ""}"'
+        self.last_modified = http_date(stat.st_mtime)
+        self.validators = (f"ETag: {self.etag}{CRLF}Last-Modified: {self.last_modified}{CRLF}"
+                           f"Accept-Ranges: bytes{CRLF}").encode()
+        if compressible(self.content_type):
+            self.validators += VARY_HEADER
+        self.headers = (self.encoding + entity_headers(self.size, self.content_type)
+                        + self.validators)
+        self.checked_at = time.monotonic()
+
+class FileCache:
+    """Per-worker LRU cache of small files by request path, and of their gzip variants.
+    An entry is checked against os.stat() at most every check_interval seconds
+    and dropped once the file changed or is gone"""
+
+    def __init__(self, max_bytes=64 * 2**20, max_file_size=256 * 2**10, check_interval=1.0):
+        self.max_bytes = max_bytes
+        self.max_file_size = max_file_size
+        self.check_interval = check_interval
+        self.entries = collections.OrderedDict()
+        self.size = 0
+
+    def get(self, path):
+        """Fresh entry for a request path or None"""
+        entry = self.entries.get(path)
+        if entry is None:
+            return None
+        now = time.monotonic()
+        if now - entry.checked_at >= self.check_interval:
+            try:
+                stat = os.stat(entry.fs_path)
+            except OSError:
+                stat = None
+            if stat is None or (stat.st_mtime_ns, stat.st_size) != (
+                    entry.stat.st_mtime_ns, entry.stat.st_size):
+                self.discard(path)
+                return None
+            entry.checked_at = now
+        self.entries.move_to_end(path)
+        return entry
+
+    def put(self, path, entry):
+        """Remember a file read for path, evicting the least recently used ones"""
+        self.discard(path)
+        self.entries[path] = entry
+        self.size += len(entry.body)
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= len(evicted.body)
+        return entry
+
+    def discard(self, path):
+        """Forget the entry for path if there is one"""
+        entry = self.entries.pop(path, None)
+        if entry is not None:
+            self.size -= len(entry.body)
+
+class Connection:
+    """State of one client socket in the event loop.
+    Reads until complete requests are buffered, writes their responses, then reads again
+    unless the last response closes the connection"""
+
+    def __init__(self, client_socket):
+        self.socket = client_socket
+        self.inbox = b""
+        # head bytes and FileBody parts of the queued responses
+        self.outbox = collections.deque()
+        self.corked = False
+        self.served = 0
+        self.closing = False
+        self.last_active = time.monotonic()
+
+    def on_readable(self, document_root, cache=None):
+        """Read what arrived and queue responses for the complete requests.
+        Returns False when the client has gone"""
+        try:
+            data = self.socket.recv(4096)
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        if not data:
+            return False
+        self.last_active = time.monotonic()
+        self.inbox += data
+        self.process(document_root, cache)
+        return True
+
+    def process(self, document_root, cache=None):
+        """Answer every complete request in the inbox, pipelined requests included"""
+        while not self.closing:
+            split = next_request(self.inbox)
+            if split is None:
+                if len(self.inbox) > MAX_REQUEST_SIZE:
+                    self.outbox.append(format_response(400))
+                    self.closing = True
+                return
+            request, self.inbox = split
+            self.served += 1
+            response, keep_alive = serve_request(request, document_root, self.served, cache)
+            self.outbox.extend(response)
+            self.closing = not keep_alive
+
+    def on_writable(self):
+        """Send as much of the queued responses as the socket takes.
+        Returns False once everything is sent and the connection is to be closed"""
+        if not self.corked:
+            set_cork(self.socket, True)
+            self.corked = True
+        try:
+            while self.outbox:
+                if not self.send_part(self.outbox[0]):
+                    return False
+                self.last_active = time.monotonic()
+        except BlockingIOError:
+            return True
+        except OSError:
+            return False
+        set_cork(self.socket, False)
+        self.corked = False
+        return not self.closing
+
+    def send_part(self, part):
+        """Send from the first queued part, drop it once sent. False if the file came up short"""
+        if isinstance(part, FileBody):
+            if part.remaining:
+                sent = os.sendfile(self.socket.fileno(), part.file.fileno(),
+                                   part.offset, part.remaining)
+                if not sent:
+                    return False
+                part.offset += sent
+                part.remaining -= sent
+            if not part.remaining:
+                part.file.close()
+                self.outbox.popleft()
+        else:
+            sent = self.socket.send(part)
+            if sent < len(part):
+                self.outbox[0] = memoryview(part)[sent:]
+            else:
+                self.outbox.popleft()
+        return True
+
+    def close(self):
+        """Close the socket and the files of responses not sent yet"""
+        for part in self.outbox:
+            if isinstance(part, FileBody):
+                part.file.close()
+        self.outbox.clear()
+        self.socket.close()
+
+def start_event_loop(server_socket, document_root, cache=None):
+    """Starts worker serving every connection from one epoll event loop"""
+    server_socket.setblocking(False)
+    selector = selectors.DefaultSelector()
+    selector.register(server_socket, selectors.EVENT_READ)
+    connections = {}
+    # while out of descriptors the listener stays readable, so it is taken out of the
+    # selector for a moment instead of waking the loop over and over
+    accept_paused_until = None
+
+    def close(connection):
+        selector.unregister(connection.socket)
+        del connections[connection.socket.fileno()]
+        connection.close()
+
+    while True:
+        if accept_paused_until is not None and time.monotonic() >= accept_paused_until:
+            selector.register(server_socket, selectors.EVENT_READ)
+            accept_paused_until = None
+        for key, events in selector.select(timeout=1 if accept_paused_until is None
+                                           else ACCEPT_BACKOFF):
+            if key.fileobj is server_socket:
+                if not accept_clients(server_socket, selector, connections):
+                    selector.unregister(server_socket)
+                    accept_paused_until = time.monotonic() + ACCEPT_BACKOFF
+                continue
+            connection = key.data
+            readable = events & selectors.EVENT_READ
+            if readable and not connection.on_readable(document_root, cache):
+                close(connection)
+                continue
+            if events & selectors.EVENT_WRITE and not connection.on_writable():
+                close(connection)
+                continue
+            # no reading while responses are queued, a client reading slowly is not buffered for
+            wanted = selectors.EVENT_WRITE if connection.outbox else selectors.EVENT_READ
+            if wanted != key.events:
+                selector.modify(connection.socket, wanted, connection)
+        # slow, silent or idle keep-alive clients only hold a socket until the idle timeout
+        deadline = time.monotonic() - IDLE_TIMEOUT
+        for connection in list(connections.values()):
+            if connection.last_active < deadline:
+                close(connection)
+
+def accept_clients(server_socket, selector, connections):
+    """Accept every pending connection, other workers may have taken them already.
+    Returns False when out of file descriptors"""
+    while True:
+        try:
+            client_socket, _ = server_socket.accept()
+        except BlockingIOError:
+            return True
+        except OSError as e:
+            if e.errno in (errno.EMFILE, errno.ENFILE):
+                return False
+            raise
+        client_socket.setblocking(False)
+        connection = Connection(client_socket)
+        connections[client_socket.fileno()] = connection
+        selector.register(client_socket, selectors.EVENT_READ, connection)
 
 def get_mime_type(path):
     """Mime-type of files for http"""
-    mime, _ = mimetypes.guess_type(path)
-    return mime or "application/octet-stream"
+    return MIME_TYPES.get(os.path.splitext(path)[1].lower(), "application/octet-stream")
+
+@functools.lru_cache(maxsize=1)
+def date_header(second):
+    """Date header for a unix time, formatted once per second"""
+    return f"Date: {http_date(second)}{CRLF}".encode()
 
-def http_date():
+def http_date(timestamp=None):
     """Date formatted"""
-    return datetime.now().strftime("%a, %d %b %Y %H:%M:%S GMT")
+    return email.utils.formatdate(timestamp, usegmt=True)
 
 def main():
     """Main execution"""
@@ -116,11 +617,17 @@ def main():
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
 
     server_socket.bind(('0.0.0.0', args.port))
-    server_socket.listen(128)
+    server_socket.listen(1024)
+
+    # every forked worker gets a copy of the empty cache and fills its own
+    cache = None
+    if args.cache_size > 0:
+        cache = FileCache(args.cache_size * 2**20, args.cache_file_size * 2**10, args.cache_check)
 
+    target = start_event_loop if args.engine == "epoll" else start_worker
     workers = []
     for _ in range(args.workers):
-        p = multiprocessing.Process(target=start_worker, args=(server_socket, document_root))
+        p = multiprocessing.Process(target=target, args=(server_socket, document_root, cache))
         p.start()
         workers.append(p)
 
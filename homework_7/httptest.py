@@ -326,6 +326,25 @@ class HttpServer(unittest.TestCase):
         self.assertEqual(len(data), 35344)
         self.assertEqual(ctype, "application/x-shockwave-flash")
 
+    def test_idle_keepalive_connections(self):
+        """idle keep-alive clients do not hold up new ones"""
+        idle = []
+        for _ in range(16):
+            conn = httplib.HTTPConnection(self.host, self.port, timeout=10)
+            conn.request("GET", "/httptest/dir2/page.html")
+            conn.getresponse().read()
+            idle.append(conn)
+        try:
+            s = socket.create_connection((self.host, self.port), timeout=2)
+            try:
+                s.sendall(b"GET /httptest/dir2/page.html HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                self.assertTrue(s.recv(1024).startswith(b"HTTP/1.1 200"))
+            finally:
+                s.close()
+        finally:
+            for conn in idle:
+                conn.close()
+
 
 loader = unittest.TestLoader()
 suite = unittest.TestSuite()